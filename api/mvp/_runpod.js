@@ -0,0 +1,52 @@
+// Shared RunPod client for the api/mvp functions (the leading underscore
+// keeps Vercel from routing it). Requests go through module-level keep-alive
+// agents, so a warm function instance reuses its TLS connection to RunPod
+// instead of opening one per call. RUNPOD_API_BASE points it elsewhere, e.g.
+// at mock_runpod.py (http://127.0.0.1:9092/v2).
+import http from 'node:http';
+import https from 'node:https';
+
+const agents = {
+  'http:': new http.Agent({ keepAlive: true, maxSockets: 64 }),
+  'https:': new https.Agent({ keepAlive: true, maxSockets: 64 }),
+};
+
+const TIMEOUT_MS = 30000;
+
+export function runpodConfig() {
+  const endpointId = process.env.RUNPOD_ENDPOINT_ID;
+  const apiKey = process.env.RUNPOD_API_KEY;
+  const base = (process.env.RUNPOD_API_BASE || 'https://api.runpod.ai/v2').replace(/\/+$/, '');
+  return endpointId && apiKey ? { endpointId, apiKey, base } : null;
+}
+
+// -> { status, json }; json is {} when the body is not JSON
+export function runpodRequest(config, method, path, body) {
+  const url = new URL(`${config.base}/${config.endpointId}${path}`);
+  const data = body === undefined ? null : Buffer.from(JSON.stringify(body));
+  const client = url.protocol === 'http:' ? http : https;
+  return new Promise((resolve, reject) => {
+    const req = client.request(url, {
+      method,
+      agent: agents[url.protocol],
+      headers: {
+        'Authorization': `Bearer ${config.apiKey}`,
+        ...(data ? { 'Content-Type': 'application/json', 'Content-Length': data.length } : {}),
+      },
+      timeout: TIMEOUT_MS,
+    }, (resp) => {
+      const chunks = [];
+      resp.on('data', (chunk) => chunks.push(chunk));
+      resp.on('end', () => {
+        let json = {};
+        try { json = JSON.parse(Buffer.concat(chunks).toString('utf8')); } catch (_) {}
+        resolve({ status: resp.statusCode, json });
+      });
+      resp.on('error', reject);
+    });
+    req.on('timeout', () => req.destroy(new Error(`RunPod ${method} ${path} timed out`)));
+    req.on('error', reject);
+    if (data) req.write(data);
+    req.end();
+  });
+}
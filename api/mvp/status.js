@@ -1,30 +1,93 @@
+import { runpodConfig, runpodRequest } from './_runpod.js';
+
+// Per-instance state, shared by every request a warm function serves:
+// concurrent polls for the same job share one RunPod call, and a
+// non-terminal status is reused for CACHE_TTL_MS. Terminal states are never
+// served from the cache, so a finished job is always seen fresh.
+const CACHE_TTL_MS = Number(process.env.STATUS_CACHE_MS ?? 1000);
+const CACHE_MAX = 1000;
+const MAX_IDS = 50;
+const TERMINAL = new Set(['COMPLETED', 'FAILED', 'CANCELLED', 'TIMED_OUT']);
+
+const inflight = new Map();  // id -> Promise<{ status, json }>
+const cache = new Map();     // id -> { at, status, json }, oldest first
+
+function cached(id, now) {
+  const entry = cache.get(id);
+  if (!entry) return null;
+  if (now - entry.at > CACHE_TTL_MS || TERMINAL.has(entry.json?.status)) {
+    cache.delete(id);
+    return null;
+  }
+  return entry;
+}
+
+function remember(id, result) {
+  if (!CACHE_TTL_MS || result.status !== 200 || TERMINAL.has(result.json?.status)) return;
+  cache.delete(id);
+  cache.set(id, { at: Date.now(), ...result });
+  while (cache.size > CACHE_MAX) cache.delete(cache.keys().next().value);
+}
+
+function lookup(config, id) {
+  const hit = cached(id, Date.now());
+  if (hit) return Promise.resolve(hit);
+  let pending = inflight.get(id);
+  if (!pending) {
+    pending = runpodRequest(config, 'GET', `/status/${encodeURIComponent(id)}`)
+      .then((result) => { remember(id, result); return result; })
+      .finally(() => inflight.delete(id));
+    inflight.set(id, pending);
+  }
+  return pending;
+}
+
+// ?id=a (single, response is RunPod's JSON as before), ?ids=a,b,c or ?id=a&id=b (batch)
+function requestedIds(query) {
+  const raw = [].concat(query.ids ?? [], query.id ?? []);
+  const ids = raw.flatMap((v) => String(v).split(',')).map((v) => v.trim()).filter(Boolean);
+  return { ids: [...new Set(ids)], batch: query.ids !== undefined || Array.isArray(query.id) };
+}
+
 export default async function handler(req, res) {
   if (req.method !== 'GET') {
     res.setHeader('Allow', 'GET');
     return res.status(405).json({ error: 'METHOD_NOT_ALLOWED' });
   }
   try {
-    const endpointId = process.env.RUNPOD_ENDPOINT_ID;
-    const apiKey = process.env.RUNPOD_API_KEY;
-    const id = req.query.id;
-    if (!endpointId || !apiKey) {
+    const config = runpodConfig();
+    const { ids, batch } = requestedIds(req.query || {});
+    if (!config) {
       return res.status(500).json({ error: 'RUNPOD credentials missing' });
     }
-    if (!id) {
+    if (!ids.length) {
       return res.status(400).json({ error: 'id_required' });
     }
+    if (ids.length > MAX_IDS) {
+      return res.status(400).json({ error: 'too_many_ids', max: MAX_IDS });
+    }
 
-    const r = await fetch(`https://api.runpod.ai/v2/${endpointId}/status/${encodeURIComponent(id)}`, {
-      headers: {
-        'Authorization': `Bearer ${apiKey}`
+    res.setHeader('Cache-Control', 'no-store');
+    if (!batch) {
+      const { status, json } = await lookup(config, ids[0]);
+      return res.status(status >= 200 && status < 300 ? 200 : status).json(json);
+    }
+
+    // Batch: one entry per id; a failed lookup doesn't fail the others
+    const settled = await Promise.allSettled(ids.map((id) => lookup(config, id)));
+    const results = {};
+    settled.forEach((outcome, i) => {
+      if (outcome.status === 'rejected') {
+        results[ids[i]] = { error: String(outcome.reason), httpStatus: 502 };
+      } else if (outcome.value.status >= 200 && outcome.value.status < 300) {
+        results[ids[i]] = outcome.value.json;
+      } else {
+        results[ids[i]] = { ...outcome.value.json, httpStatus: outcome.value.status };
       }
     });
-    const j = await r.json().catch(() => ({}));
-    res.setHeader('Cache-Control', 'no-store');
-    return res.status(r.ok ? 200 : r.status).json(j);
+    return res.status(200).json({ results });
   } catch (e) {
     return res.status(500).json({ error: String(e) });
   }
 }
 
-
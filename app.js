@@ -1,47 +1,11 @@
 // Minimal interactivity: upload previews, mock generation, FAQ accordion
+import { preprocess } from './sdk/imagePipeline.js';
+
 const DOWNLOAD_ICON = new URL('./assets/download.svg', import.meta.url).href;
 
-// Image compression helper
+// Image compression helper (runs in the preprocessing worker)
 async function compressImage(file, targetPixels = 1024 * 1024) {
-  return new Promise((resolve, reject) => {
-    const reader = new FileReader();
-    reader.onload = (e) => {
-      const img = new Image();
-      img.onload = () => {
-        const width = img.width;
-        const height = img.height;
-        const currentPixels = width * height;
-        
-        let newWidth = width;
-        let newHeight = height;
-
-        // Calculate new dimensions if larger than target
-        if (currentPixels > targetPixels) {
-          const ratio = Math.sqrt(targetPixels / currentPixels);
-          newWidth = Math.floor(width * ratio);
-          newHeight = Math.floor(height * ratio);
-        }
-
-        const canvas = document.createElement('canvas');
-        canvas.width = newWidth;
-        canvas.height = newHeight;
-        
-        const ctx = canvas.getContext('2d');
-        // High quality scaling
-        ctx.imageSmoothingEnabled = true;
-        ctx.imageSmoothingQuality = 'high';
-        ctx.drawImage(img, 0, 0, newWidth, newHeight);
-        
-        // Compress to jpeg with 0.85 quality
-        const dataUrl = canvas.toDataURL('image/jpeg', 0.85);
-        resolve({ dataUrl, width: newWidth, height: newHeight });
-      };
-      img.onerror = reject;
-      img.src = e.target.result;
-    };
-    reader.onerror = reject;
-    reader.readAsDataURL(file);
-  });
+  return await preprocess('resize', file, { targetPixels, type: 'image/jpeg', quality: 0.85 });
 }
 
 function initApp() {
@@ -82,8 +46,9 @@ function initApp() {
       
       // Compress image before display
       try {
-        const { dataUrl } = await compressImage(file);
-        img.src = dataUrl; 
+        const { blob } = await compressImage(file);
+        if (img.src.startsWith('blob:')) URL.revokeObjectURL(img.src);
+        img.src = URL.createObjectURL(blob);
         img.hidden = false;
         up.querySelector('.drop-area').style.display = 'none';
       } catch (e) {
@@ -0,0 +1,169 @@
+// Client-side batch runner for batch.html: every character × outfit pair goes
+// through the handleGenerate stages (generate-stages.js) on the FluxKontext SDK.
+//
+// Each stage has its own bounded pool, so items pipeline: while item N waits
+// for its Nano result, item N+1 already holds the Flux slot. Multipart POSTs
+// (the Flux upload, the Nano submit) additionally share an upload pool, and at
+// most `flux + nano + 1` items are admitted at a time so padded garments and
+// half images are not all held in memory at once. Work shared between pairs
+// runs once: one Flux per distinct character, one padding per distinct outfit
+// and character size. Items report every change through onUpdate, so results
+// stream out as they land; running the same items again only reruns the ones
+// that did not finish.
+import { FluxKontext } from './sdk/apiClient.js';
+import { imageCache } from './image-cache.js';
+import { FLUX_PROMPT, FLUX_STEPS, halfImageKey, computePaddedGarment } from './generate-stages.js';
+import { startSpan } from './tracing.js';
+
+export const BATCH_DEFAULTS = { flux: 1, nano: 2, uploads: 2 };
+
+// FIFO pool: pool(n)(task) runs task() once fewer than n tasks are running
+function pool(size) {
+  let active = 0;
+  const waiting = [];
+  const next = () => {
+    if (active >= size || !waiting.length) return;
+    active += 1;
+    const { task, resolve, reject } = waiting.shift();
+    Promise.resolve().then(task).then(resolve, reject).finally(() => { active -= 1; next(); });
+  };
+  return (task) => new Promise((resolve, reject) => { waiting.push({ task, resolve, reject }); next(); });
+}
+
+const baseName = (file, fallback) => String(file?.name || fallback).replace(/\.[^.]+$/, '');
+
+// One item per pair, characters outermost; items carry their own progress
+export function pairsOf(characters, outfits) {
+  const items = [];
+  characters.forEach((character, c) => outfits.forEach((outfit, o) => items.push({
+    id: `${c}:${o}`,
+    label: `${baseName(character, `character-${c + 1}`)} × ${baseName(outfit, `outfit-${o + 1}`)}`,
+    character,
+    outfit,
+    status: 'queued',  // queued | flux | padding | nano-submit | nano-poll | done | failed | cancelled
+    detail: '',
+    result: null,      // imageBase64 of the Nano result (data URL or URL)
+    error: null,
+    ms: null,
+    cached: {},        // { half, padding }: reused instead of recomputed
+  })));
+  return items;
+}
+
+async function halfBlobOf(fluxRes) {
+  const src = fluxRes?.halfImageUrl || fluxRes?.halfImageBase64;
+  if (!src) throw new Error('Flux did not return half image');
+  const resp = await fetch(src);
+  if (!resp.ok) throw new Error(`fetch ${src} failed: ${resp.status}`);
+  return await resp.blob();
+}
+
+export class BatchEngine {
+  constructor({ flux, nano, uploads, onUpdate } = {}) {
+    this.limits = { ...BATCH_DEFAULTS };
+    Object.entries({ flux, nano, uploads }).forEach(([k, v]) => { if (v > 0) this.limits[k] = Math.floor(v); });
+    this.onUpdate = onUpdate || (() => {});
+    this.cancelled = false;
+  }
+
+  // Items still queued fail as 'cancelled'; requests in flight finish
+  cancel() {
+    this.cancelled = true;
+  }
+
+  // -> the same items, once every one of them is done, failed or cancelled
+  async run(items) {
+    this.cancelled = false;
+    const { flux, nano, uploads } = this.limits;
+    const ctx = {
+      admit: pool(flux + nano + 1),
+      flux: pool(flux),
+      nano: pool(nano),
+      upload: pool(uploads),
+      halves: new Map(),  // character File -> Promise<{ blob, cached }>
+    };
+    const todo = items.filter((item) => item.status !== 'done');
+    const span = startSpan('batch', { attrs: { items: todo.length, flux, nano, uploads } });
+    todo.forEach((item) => this.update(item, 'queued', ''));
+    await Promise.all(todo.map((item) => ctx.admit(() => this.runItem(item, ctx, span))));
+    const failed = todo.filter((item) => item.status !== 'done').length;
+    span.end(failed ? 'error' : 'ok', { failed });
+    return items;
+  }
+
+  update(item, status, detail = item.detail) {
+    item.status = status;
+    item.detail = detail;
+    try { this.onUpdate(item); } catch (e) { console.warn('[batch] onUpdate failed:', e); }
+  }
+
+  checkCancelled() {
+    if (this.cancelled) throw new Error('Cancelled');
+  }
+
+  // Half image of the item's character: cached, shared with a pair already running it, or one Flux run
+  halfImage(item, ctx) {
+    let half = ctx.halves.get(item.character);
+    if (half) {
+      this.update(item, 'flux', 'shared');
+      return half.then(({ blob }) => ({ blob, cached: true }));
+    }
+    half = (async () => {
+      const key = await halfImageKey(item.character);
+      const cached = await imageCache.get(key);
+      if (cached) return { blob: cached, cached: true };
+      const blob = await ctx.flux(async () => {
+        this.checkCancelled();
+        this.update(item, 'flux', 'uploading');
+        const fluxRes = await ctx.upload(() => FluxKontext.runFlux(item.character, FLUX_PROMPT, { steps: FLUX_STEPS }));
+        this.update(item, 'flux', 'fetching half image');
+        return await halfBlobOf(fluxRes);
+      });
+      imageCache.set(key, blob);
+      return { blob, cached: false };
+    })();
+    ctx.halves.set(item.character, half);
+    half.catch(() => ctx.halves.delete(item.character));  // a later pair retries
+    return half;
+  }
+
+  async runItem(item, ctx, parent) {
+    const span = startSpan('batch-item', { parent });
+    const t0 = performance.now();
+    item.error = null;
+    item.cached = {};
+    try {
+      this.checkCancelled();
+      // padding needs only the two uploads: it runs in the image worker while Flux is busy
+      const padding = computePaddedGarment(item.character, item.outfit);
+      padding.catch(() => {});  // reported when awaited
+      this.update(item, 'flux', '');
+      const half = await this.halfImage(item, ctx);
+      item.cached.half = half.cached;
+      this.update(item, 'padding', '');
+      const garment = await padding;
+      item.cached.padding = garment.cached;
+
+      item.result = await ctx.nano(async () => {
+        this.checkCancelled();
+        this.update(item, 'nano-submit', '');
+        const { task_id } = await ctx.upload(() => FluxKontext.startNanoProcess(half.blob, [garment.blob], ''));
+        this.update(item, 'nano-poll', '');
+        const r = await FluxKontext.pollNanoResult(task_id, (j) => {
+          if (j?.status && j.status !== item.detail) this.update(item, 'nano-poll', j.status);
+        });
+        if (!r?.imageBase64) throw new Error(r?.error || 'No image from NanoBanana');
+        return r.imageBase64;
+      });
+      item.ms = Math.round(performance.now() - t0);
+      span.end('ok', { half_cached: half.cached, padding_cached: garment.cached });
+      this.update(item, 'done', '');
+    } catch (e) {
+      item.error = e?.message || String(e);
+      item.ms = Math.round(performance.now() - t0);
+      const cancelled = item.error === 'Cancelled';
+      span.end(cancelled ? 'cancelled' : 'error');
+      this.update(item, cancelled ? 'cancelled' : 'failed', item.error);
+    }
+  }
+}
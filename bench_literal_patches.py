@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+"""Benchmark literal (token-stream) patching against the old re.sub chain
+
+Usage:
+  python bench_literal_patches.py            # 1, 10 and 40 MB inputs
+  python bench_literal_patches.py 5 50       # custom sizes in MB
+
+Inputs are built from user-flow.js.bak (which still carries the original
+anchors) with the console-logging functions replaced, tiled up to the requested size, plus a "near-miss" variant made of
+anchors whose last token was changed so every candidate fails late. Two
+regex baselines are timed: one re.sub per patch with the escaped snippet
+(what the hand-escaped patterns in the fix_* scripts compiled to) and the
+same escaped patterns run through the engine's combined alternation.
+"""
+
+import re
+import sys
+import time
+
+import fix_console_logging
+import fix_downloads
+import fix_triple_timers
+from patch_engine import Patch, apply_patches
+
+# fix_triple_timers anchors on what fix_console_logging (function patches,
+# applied once up front) produced; the literal sets then run as consecutive
+# stages in every approach.
+SETUP = fix_console_logging.PATCHES
+STAGES = [fix_triple_timers.PATCHES, fix_downloads.PATCHES]
+SOURCE = 'user-flow.js.bak'
+
+
+def _tile(unit, size):
+    return unit * max(1, size // len(unit))
+
+
+def _near_miss(size):
+    misses = []
+    for patch in (p for stage in STAGES for p in stage):
+        body = patch.pattern.rstrip()
+        misses.append(body[:-1] + '#\n')  # same text up to the very last character
+    return _tile(''.join(misses), size)
+
+
+def _resub_chain(content):
+    for stage in STAGES:
+        for patch in stage:
+            content = re.sub(re.escape(patch.pattern), lambda m, r=patch.replacement: r, content, flags=re.MULTILINE)
+    return content
+
+
+def _alternation(content):
+    for stage in STAGES:
+        content, _ = apply_patches(content, [Patch(p.name, re.escape(p.pattern), p.replacement, re.MULTILINE) for p in stage])
+    return content
+
+
+def _literal(content):
+    for stage in STAGES:
+        content, _ = apply_patches(content, stage)
+    return content
+
+
+def _time(fn, content):
+    start = time.perf_counter()
+    result = fn(content)
+    return time.perf_counter() - start, result
+
+
+def main(sizes_mb):
+    with open(SOURCE, 'r', encoding='utf-8') as f:
+        source, _ = apply_patches(f.read(), SETUP)
+
+    print(f"{'input':<18} {'MB':>6} {'re.sub':>9} {'combined':>9} {'literal':>9} {'speedup':>8}")
+    for mb in sizes_mb:
+        size = int(mb * 1024 * 1024)
+        for label, content in (('user-flow tiled', _tile(source, size)), ('near-miss', _near_miss(size))):
+            old_s, old_out = _time(_resub_chain, content)
+            alt_s, alt_out = _time(_alternation, content)
+            new_s, new_out = _time(_literal, content)
+            same = '' if old_out == alt_out == new_out else '  (outputs differ)'
+            print(f"{label:<18} {len(content) / 1e6:>6.1f} {old_s:>8.2f}s {alt_s:>8.2f}s {new_s:>8.2f}s "
+                  f"{old_s / new_s:>7.1f}x{same}")
+
+
+if __name__ == '__main__':
+    main([float(a) for a in sys.argv[1:]] or [1, 10, 40])
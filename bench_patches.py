@@ -0,0 +1,208 @@
+#!/usr/bin/env python3
+"""Benchmark every fix_* patch set over synthetic large inputs
+
+Usage:
+  python bench_patches.py                    # run, print table
+  python bench_patches.py --save             # run and write bench_baseline.json
+  python bench_patches.py --check            # run and fail (exit 1) on regressions
+  python bench_patches.py --sizes 0.1 1 --check
+
+Inputs are shaped like each script's target: the unpatched source (for
+user-flow.js: user-flow.js.bak with the earlier sets of the chain applied;
+for other targets: the current file with the set's replacements swapped
+back to their anchors), tiled to 100 KB .. 50 MB. Each size comes in four
+variants:
+
+  match        unpatched source, every anchor present
+  nomatch      the set's own output, so every anchor is already gone
+  match-min    "match" with whitespace collapsed, like minified output
+  nomatch-min  "nomatch" with whitespace collapsed
+
+For each variant every patch is run on its own, plus the whole set in one
+apply_patches() call. Wall time is the best of --repeat runs (a single
+run above 10 MB); peak memory comes from a separate tracemalloc run.
+Results are keyed script/patch/variant/size, and --check flags any entry
+that got slower or hungrier than the baseline by more than the tolerance,
+as well as any entry the baseline does not have yet: a new patch (or
+script) fails the gate until it is measured with --save. --save replaces
+the entries of the scripts it ran and keeps the rest, so
+
+  python bench_patches.py --scripts fix_downloads --save
+
+baselines one changed set without re-measuring the others. Baselines are
+machine-specific: re-save them when the runner changes.
+"""
+
+import argparse
+import importlib
+import json
+import sys
+import time
+import tracemalloc
+
+import js_index
+from patch_engine import apply_patches
+
+# Order matters: each user-flow.js set anchors on what the previous ones produced
+SCRIPTS = ['fix_console_logging', 'fix_triple_timers', 'fix_downloads', 'remove_ui_elements', 'fix_retry_logic',
+           'fix_polling', 'fix_upscale_polling']
+CHAIN_SOURCES = {'user-flow.js': 'user-flow.js.bak'}
+BASELINE = 'bench_baseline.json'
+SIZES_MB = [0.1, 1, 10, 50]
+SINGLE_RUN_MB = 10
+SET = '(set)'
+
+# A run regresses when it is this much slower / bigger than the baseline,
+# beyond an absolute allowance that absorbs timer noise on small inputs.
+TIME_TOLERANCE = 0.5
+TIME_SLACK = 0.05
+MEMORY_TOLERANCE = 0.25
+MEMORY_SLACK_MB = 1.0
+
+
+def _read(path):
+    with open(path, 'r', encoding='utf-8') as f:
+        return f.read()
+
+
+def _load(path):
+    """Saved baseline entries, or None without a readable baseline."""
+    try:
+        return json.loads(_read(path))
+    except (OSError, ValueError):
+        return None
+
+
+def _unpatch(content, patches):
+    for patch in patches:
+        anchor = patch.expect if patch.function else patch.pattern
+        if patch.replacement and (patch.literal or patch.function):
+            content = content.replace(patch.replacement, anchor)
+    return content
+
+
+def _sources(modules):
+    """script name -> (matching source, already-patched source)."""
+    chains, sources = {}, {}
+    for module in modules:
+        target = module.TARGET
+        if target in CHAIN_SOURCES:
+            if target not in chains:
+                chains[target] = _read(CHAIN_SOURCES[target])
+            before = chains[target]
+        else:
+            before = _unpatch(_read(target), module.PATCHES)
+        after, _ = apply_patches(before, module.PATCHES)
+        if target in CHAIN_SOURCES:
+            chains[target] = after
+        sources[module.__name__] = (before, after)
+    return sources
+
+
+def _tile(unit, size):
+    return unit * max(1, round(size / len(unit)))
+
+
+def _minify(text):
+    return ' '.join(text.split())
+
+
+def _variants(before, after, size):
+    match, nomatch = _tile(before, size), _tile(after, size)
+    return [('match', match), ('nomatch', nomatch), ('match-min', _minify(match)), ('nomatch-min', _minify(nomatch))]
+
+
+def _run(content, patches):
+    js_index.clear_cache()  # measure the function-index scan, not a cache hit
+    return apply_patches(content, patches)
+
+
+def _measure(content, patches, repeat):
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        _run(content, patches)
+        best = min(best, time.perf_counter() - start)
+    tracemalloc.start()
+    try:
+        _run(content, patches)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return best, peak / 2 ** 20
+
+
+def run(scripts, sizes_mb, repeat):
+    modules = [importlib.import_module(name) for name in scripts]
+    # Chains are always built from every script, so a subset (--scripts) is
+    # measured on the same text as a full run
+    sources = _sources([importlib.import_module(name) for name in SCRIPTS + [n for n in scripts if n not in SCRIPTS]])
+    results = {}
+    for mb in sizes_mb:
+        for module in modules:
+            before, after = sources[module.__name__]
+            for variant, content in _variants(before, after, int(mb * 2 ** 20)):
+                runs = [(p.name, (p,)) for p in module.PATCHES] + [(SET, tuple(module.PATCHES))]
+                for name, patches in runs:
+                    seconds, peak = _measure(content, patches, repeat if mb <= SINGLE_RUN_MB else 1)
+                    key = f'{module.__name__}/{name}/{variant}/{mb:g}MB'
+                    results[key] = {'seconds': round(seconds, 4), 'peak_mb': round(peak, 2)}
+                    print(f'{key:<64} {seconds:>8.3f}s {peak:>9.1f} MB', flush=True)
+    return results
+
+
+def check(results, baseline):
+    """Return a list of human-readable regressions against `baseline`."""
+    problems = []
+    for key, now in results.items():
+        was = baseline.get(key)
+        if not was:
+            problems.append(f'{key}: not in the baseline (measure it with --save)')
+            continue
+        limit = was['seconds'] * (1 + TIME_TOLERANCE) + TIME_SLACK
+        if now['seconds'] > limit:
+            problems.append(f"{key}: {now['seconds']:.3f}s (baseline {was['seconds']:.3f}s)")
+        limit = was['peak_mb'] * (1 + MEMORY_TOLERANCE) + MEMORY_SLACK_MB
+        if now['peak_mb'] > limit:
+            problems.append(f"{key}: {now['peak_mb']:.1f} MB peak (baseline {was['peak_mb']:.1f} MB)")
+    return problems
+
+
+def main(argv):
+    parser = argparse.ArgumentParser(description='Benchmark the fix_* patch sets.')
+    parser.add_argument('--sizes', nargs='+', type=float, default=SIZES_MB, help='input sizes in MB')
+    parser.add_argument('--scripts', nargs='+', default=SCRIPTS, help='patch set modules, in chain order')
+    parser.add_argument('--repeat', type=int, default=3, help='timed runs per entry (best is kept)')
+    parser.add_argument('--baseline', default=BASELINE)
+    parser.add_argument('--save', action='store_true', help='write results as the new baseline')
+    parser.add_argument('--check', action='store_true', help='exit 1 if anything regressed')
+    args = parser.parse_args(argv)
+
+    results = run(args.scripts, args.sizes, args.repeat)
+
+    if args.save:
+        saved = _load(args.baseline) or {}
+        saved = {key: value for key, value in saved.items() if key.split('/', 1)[0] not in args.scripts}
+        saved.update(results)
+        with open(args.baseline, 'w', encoding='utf-8') as f:
+            json.dump(saved, f, indent=2, sort_keys=True)
+            f.write('\n')
+        print(f'Baseline written to {args.baseline} ({len(results)} of {len(saved)} entries updated)')
+
+    if args.check:
+        baseline = _load(args.baseline)
+        if baseline is None:
+            print(f'No baseline at {args.baseline}; run with --save first.')
+            return 1
+        problems = check(results, baseline)
+        if problems:
+            print('Regressions:')
+            for line in problems:
+                print(f'  - {line}')
+            return 1
+        print(f'No regressions against {args.baseline}.')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv[1:]))
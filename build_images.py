@@ -0,0 +1,212 @@
+#!/usr/bin/env python3
+"""Build responsive AVIF/WebP variants of the hero and showcase images
+
+Usage:
+  python3 build_images.py            # run by `npm run build` before vite build
+  python3 build_images.py --report   # byte sizes of the last build, writes nothing
+  python3 build_images.py --strict   # fail instead of skipping without Pillow
+
+Every source in GROUPS is encoded as AVIF and WebP at each of the group's
+widths (capped at the source width); the source itself, renamed, is the
+fallback for browsers without either. Files go to public/img/ (served as /img/, copied to dist by Vite)
+named <slug>-<width>.<hash>.<ext>. The hash covers the source bytes and the
+encoder settings, so unchanged images are not re-encoded and cache forever.
+Files no longer referenced are removed.
+
+public/img/manifest.json maps each source path to
+  {group, width, height, sizes, fallback, sources: {mime: srcset}, bytes: {url: n}}
+The index.html hero is rewritten from it at build time (heroImages() in
+vite.config.js); hero-carousel.js and showcase-editor.js read the srcsets.
+
+Pillow is needed (AVIF: Pillow >= 11.3 or pillow-avif-plugin). Without it
+the step prints a warning and leaves the previous output alone, so the
+site still builds with the original images.
+"""
+
+import argparse
+import glob
+import hashlib
+import io
+import json
+import os
+import re
+import sys
+from concurrent.futures import ThreadPoolExecutor
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+OUT_DIR = os.path.join(ROOT, 'public', 'img')
+OUT_URL = '/img'
+MANIFEST = os.path.join(OUT_DIR, 'manifest.json')
+
+# widths are CSS px x DPR of the slot each group is shown in (styles.css)
+GROUPS = {
+    'hero': {
+        'sources': 'assets/bg_*.png',
+        'widths': [480, 720, 960, 1280],
+        'sizes': '(max-width: 768px) 100vw, 60vw',
+        'report_width': 960,
+    },
+    'showcase': {
+        'sources': 'public/showcase/*.jpg',
+        'widths': [320, 540, 800],
+        'sizes': '(max-width: 768px) 45vw, 263px',
+        'report_width': 540,
+    },
+}
+
+# (mime, extension, Pillow save options); order is the <picture> source order
+FORMATS = [
+    ('image/avif', 'avif', {'quality': 50, 'speed': 6}),
+    ('image/webp', 'webp', {'quality': 76, 'method': 4}),
+]
+SETTINGS_VERSION = 1  # bump to re-encode everything after changing the options above
+
+
+def _slug(path):
+    name = os.path.splitext(os.path.basename(path))[0]
+    return re.sub(r'[^a-z0-9]+', '-', name.lower()).strip('-')
+
+
+def _digest(source_bytes, *parts):
+    h = hashlib.sha256(source_bytes)
+    h.update(json.dumps([SETTINGS_VERSION, *parts], sort_keys=True).encode('utf-8'))
+    return h.hexdigest()[:10]
+
+
+def _encode(image, fmt, options):
+    buf = io.BytesIO()
+    image.save(buf, fmt, **options)
+    return buf.getvalue()
+
+
+def _write(name, encode, written):
+    """Write public/img/<name> unless it already exists (the hash is in the name)."""
+    path = os.path.join(OUT_DIR, name)
+    if not os.path.exists(path):
+        data = encode()
+        with open(path + '.tmp', 'wb') as f:
+            f.write(data)
+        os.replace(path + '.tmp', path)
+        written.append(name)
+    return f'{OUT_URL}/{name}', os.path.getsize(path)
+
+
+def build_image(Image, source, group, written):
+    with open(source, 'rb') as f:
+        source_bytes = f.read()
+    image = Image.open(io.BytesIO(source_bytes))
+    image.load()
+    alpha = image.mode in ('RGBA', 'LA') or (image.mode == 'P' and 'transparency' in image.info)
+    image = image.convert('RGBA' if alpha else 'RGB')  # both encoders keep the alpha channel
+    width, height = image.size
+    slug = _slug(source)
+
+    widths = sorted({min(w, width) for w in group['widths']})
+    resized = {}
+
+    def at(w):
+        if w not in resized:
+            resized[w] = image if w == width else image.resize((w, round(height * w / width)), Image.LANCZOS)
+        return resized[w]
+
+    entry = {'width': width, 'height': height, 'sizes': group['sizes'], 'sources': {}, 'bytes': {}}
+    for mime, ext, options in FORMATS:
+        srcset = []
+        for w in widths:
+            name = f'{slug}-{w}.{_digest(source_bytes, ext, w, options)}.{ext}'
+            url, size = _write(name, lambda: _encode(at(w), ext.upper(), options), written)
+            srcset.append(f'{url} {w}w')
+            entry['bytes'][url] = size
+        entry['sources'][mime] = ', '.join(srcset)
+
+    # the fallback is the source itself, renamed: re-encoding it never made it smaller
+    ext = os.path.splitext(source)[1].lstrip('.').lower()
+    name = f'{slug}.{_digest(source_bytes, ext)}.{ext}'
+    url, size = _write(name, lambda: source_bytes, written)
+    entry['fallback'] = url
+    entry['bytes'][url] = size
+    entry['bytes']['source'] = len(source_bytes)
+    return entry
+
+
+def build(strict=False):
+    try:
+        from PIL import Image, features
+    except ImportError:
+        if strict:
+            raise SystemExit('build_images.py: Pillow is not installed (pip install pillow)')
+        print('build_images.py: Pillow not installed, keeping the original images', file=sys.stderr)
+        return None
+    global FORMATS
+    if not features.check('avif'):
+        try:
+            import pillow_avif  # noqa: F401  registers the AVIF plugin on older Pillow
+        except ImportError:
+            if strict:
+                raise SystemExit('build_images.py: this Pillow cannot write AVIF (Pillow >= 11.3 or pillow-avif-plugin)')
+            print('build_images.py: no AVIF encoder, building WebP only', file=sys.stderr)
+            FORMATS = [f for f in FORMATS if f[1] != 'avif']
+
+    os.makedirs(OUT_DIR, exist_ok=True)
+    jobs = [(group_name, group, source) for group_name, group in GROUPS.items()
+            for source in sorted(glob.glob(os.path.join(ROOT, group['sources'])))]
+    written = []
+    # Pillow releases the GIL while encoding, so threads use every core
+    with ThreadPoolExecutor(max_workers=os.cpu_count() or 4) as pool:
+        entries = pool.map(lambda job: dict(build_image(Image, job[2], job[1], written), group=job[0]), jobs)
+        images = {os.path.relpath(source, ROOT).replace(os.sep, '/'): entry
+                  for (_, _, source), entry in zip(jobs, entries)}
+
+    manifest = {'version': 1, 'images': images}
+    with open(MANIFEST + '.tmp', 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, indent=1, ensure_ascii=False)
+        f.write('\n')
+    os.replace(MANIFEST + '.tmp', MANIFEST)
+
+    keep = {url.rsplit('/', 1)[1] for entry in images.values() for url in entry['bytes'] if url != 'source'}
+    keep.add(os.path.basename(MANIFEST))
+    stale = [name for name in os.listdir(OUT_DIR) if name not in keep]
+    for name in stale:
+        os.remove(os.path.join(OUT_DIR, name))
+    print(f'build_images.py: {len(images)} images, {len(written)} files encoded, {len(stale)} stale removed')
+    return manifest
+
+
+def report(manifest):
+    """Bytes of each source against the variant a 1600px-wide DPR 1 desktop picks."""
+    print(f"{'image':<40} {'source':>9} {'webp':>9} {'avif':>9}   width")
+    totals = [0, 0, 0]
+    for key, entry in manifest['images'].items():
+        target = GROUPS[entry['group']]['report_width']
+        sizes, picked = entry['bytes'], []
+        for mime in ('image/webp', 'image/avif'):
+            candidates = [(url, int(w[:-1])) for url, w in
+                          (c.rsplit(' ', 1) for c in entry['sources'].get(mime, '').split(', ') if c)]
+            fits = [c for c in candidates if c[1] >= min(target, entry['width'])]
+            picked.append((fits or candidates[-1:] or [(None, 0)])[0])
+        row = [sizes['source']] + [sizes.get(url, 0) for url, _ in picked]
+        totals = [a + b for a, b in zip(totals, row)]
+        print(f'{key:<40} ' + ' '.join(f'{n / 1024:>8.0f}K' for n in row) + f'   {picked[0][1]}')
+    print(f"{'total':<40} " + ' '.join(f'{n / 1024:>8.0f}K' for n in totals))
+
+
+def main(argv):
+    parser = argparse.ArgumentParser(description='Build responsive image variants and public/img/manifest.json.')
+    parser.add_argument('--report', action='store_true', help='print byte sizes from the existing manifest')
+    parser.add_argument('--strict', action='store_true', help='fail when Pillow or its AVIF encoder is missing')
+    args = parser.parse_args(argv)
+
+    if args.report:
+        try:
+            with open(MANIFEST, encoding='utf-8') as f:
+                manifest = json.load(f)
+        except FileNotFoundError:
+            raise SystemExit('build_images.py: no manifest yet, run without --report first')
+        report(manifest)
+        return 0
+    build(strict=args.strict)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,249 @@
+#!/usr/bin/env python3
+"""Split translations.js into per-locale JSON chunks for language-switcher.js
+
+Usage:
+  python3 build_locales.py           # run by `npm run build` before vite build
+  python3 build_locales.py --check   # exit 1 if the outputs are out of date
+  python3 build_locales.py --report  # bytes per locale vs the whole translations.js
+
+translations.js stays the file to edit. This step reads its object literal
+(string keys and values, comments allowed) and writes
+
+  public/locales/<lang>.<hash>.json   one flat {key: text} object per locale;
+                                      the hash covers the content, so the
+                                      chunks can be cached forever
+  locales.js                          LOCALE_CHUNKS {lang: url} and
+                                      FIRST_PAINT, the English strings whose
+                                      keys start with FIRST_PAINT_PREFIXES
+
+language-switcher.js imports locales.js only: it fetches the chunk of the
+active locale, prefetches the others when the language picker is hovered,
+and falls back to FIRST_PAINT until a chunk has arrived. The outputs are
+committed so the dev server works without running this step; chunks that
+are no longer referenced are removed.
+
+Only the standard library is used.
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import re
+import sys
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+SOURCE = os.path.join(ROOT, 'translations.js')
+OUT_DIR = os.path.join(ROOT, 'public', 'locales')
+OUT_URL = '/locales'
+MODULE = os.path.join(ROOT, 'locales.js')
+
+FALLBACK_LOCALE = 'en'
+# Header and hero of index.html, plus the strings step3-upscale.js renders at startup
+FIRST_PAINT_PREFIXES = ('nav.', 'hero.', 'step3.readyTitle', 'step3.readyDesc')
+
+ESCAPES = {'n': '\n', 't': '\t', 'r': '\r', 'b': '\b', 'f': '\f', 'v': '\v', '0': '\0'}
+TOKEN = re.compile(r'''
+    (?P<space>\s+|//[^\n]*|/\*.*?\*/)
+  | (?P<string>'(?:[^'\\\n]|\\.)*'|"(?:[^"\\\n]|\\.)*"|`(?:[^`\\$]|\\.|\$(?!\{))*`)
+  | (?P<name>[A-Za-z_$][\w$]*)
+  | (?P<punct>[{}:,;=\[\]])
+''', re.VERBOSE | re.DOTALL)
+
+
+class TranslationsError(ValueError):
+    pass
+
+
+def _unquote(literal):
+    body, out, i = literal[1:-1], [], 0
+    while i < len(body):
+        ch = body[i]
+        if ch != '\\':
+            out.append(ch)
+            i += 1
+            continue
+        nxt = body[i + 1]
+        if nxt == 'u' and body[i + 2] == '{':
+            end = body.index('}', i)
+            out.append(chr(int(body[i + 3:end], 16)))
+            i = end + 1
+        elif nxt == 'u':
+            out.append(chr(int(body[i + 2:i + 6], 16)))
+            i += 6
+        elif nxt == 'x':
+            out.append(chr(int(body[i + 2:i + 4], 16)))
+            i += 4
+        elif nxt == '\n':
+            i += 2  # line continuation
+        else:
+            out.append(ESCAPES.get(nxt, nxt))
+            i += 2
+    return ''.join(out)
+
+
+def _tokens(text):
+    pos = 0
+    while pos < len(text):
+        m = TOKEN.match(text, pos)
+        if not m:
+            line = text.count('\n', 0, pos) + 1
+            raise TranslationsError(f'translations.js:{line}: unexpected {text[pos:pos + 20]!r}')
+        pos = m.end()
+        if m.lastgroup != 'space':
+            yield m.lastgroup, m.group(), text.count('\n', 0, m.start()) + 1
+
+
+def parse_translations(text):
+    """The `translations` object literal of translations.js as {lang: {key: text}}."""
+    tokens = list(_tokens(text))
+    for i in range(len(tokens) - 2):
+        if tokens[i][1] == 'translations' and tokens[i + 1][1] == '=':
+            break
+    else:
+        raise TranslationsError('translations.js: no `translations = {...}`')
+    pos = i + 2
+
+    def expect(value):
+        nonlocal pos
+        kind, tok, line = tokens[pos]
+        if tok != value:
+            raise TranslationsError(f'translations.js:{line}: expected {value!r}, got {tok!r}')
+        pos += 1
+
+    def parse_value(depth):
+        nonlocal pos
+        kind, tok, line = tokens[pos]
+        if kind == 'string':
+            pos += 1
+            return _unquote(tok)
+        if tok == '{' and depth < 2:
+            return parse_object(depth + 1)
+        raise TranslationsError(f'translations.js:{line}: unsupported value {tok!r}')
+
+    def parse_object(depth):
+        nonlocal pos
+        expect('{')
+        out = {}
+        while tokens[pos][1] != '}':
+            kind, tok, line = tokens[pos]
+            if kind not in ('string', 'name'):
+                raise TranslationsError(f'translations.js:{line}: expected a key, got {tok!r}')
+            key = _unquote(tok) if kind == 'string' else tok
+            pos += 1
+            expect(':')
+            if key in out:
+                raise TranslationsError(f'translations.js:{line}: duplicate key {key!r}')
+            out[key] = parse_value(depth)
+            if tokens[pos][1] == ',':
+                pos += 1
+            elif tokens[pos][1] != '}':
+                raise TranslationsError(f'translations.js:{tokens[pos][2]}: expected , or }}')
+        pos += 1
+        return out
+
+    translations = parse_object(0)
+    for lang, strings in translations.items():
+        if not isinstance(strings, dict):
+            raise TranslationsError(f'translations.js: locale {lang!r} is not an object')
+    return translations
+
+
+def _json(value):
+    return json.dumps(value, ensure_ascii=False, separators=(',', ':'), sort_keys=True)
+
+
+def plan(translations):
+    """{path: bytes} of every output."""
+    if FALLBACK_LOCALE not in translations:
+        raise TranslationsError(f'translations.js: no {FALLBACK_LOCALE!r} locale')
+    outputs, chunks = {}, {}
+    for lang, strings in translations.items():
+        data = (_json(strings) + '\n').encode('utf-8')
+        name = f'{lang}.{hashlib.sha256(data).hexdigest()[:10]}.json'
+        outputs[os.path.join(OUT_DIR, name)] = data
+        chunks[lang] = f'{OUT_URL}/{name}'
+    first_paint = {key: text for key, text in translations[FALLBACK_LOCALE].items()
+                   if key.startswith(FIRST_PAINT_PREFIXES)}
+    module = (
+        '// Generated by build_locales.py from translations.js; do not edit.\n'
+        '// Per-locale chunks (content-hashed) and the English first-paint strings.\n'
+        f'export const LOCALE_CHUNKS = {json.dumps(chunks, indent=2)};\n\n'
+        f'export const FALLBACK_LOCALE = {json.dumps(FALLBACK_LOCALE)};\n\n'
+        f'export const FIRST_PAINT = {json.dumps(first_paint, ensure_ascii=False, indent=2, sort_keys=True)};\n'
+    )
+    outputs[MODULE] = module.encode('utf-8')
+    return outputs
+
+
+def _read(path):
+    try:
+        with open(path, 'rb') as f:
+            return f.read()
+    except FileNotFoundError:
+        return None
+
+
+def _stale_chunks(outputs):
+    if not os.path.isdir(OUT_DIR):
+        return []
+    return [os.path.join(OUT_DIR, name) for name in os.listdir(OUT_DIR)
+            if name.endswith('.json') and os.path.join(OUT_DIR, name) not in outputs]
+
+
+def build(outputs):
+    os.makedirs(OUT_DIR, exist_ok=True)
+    written = 0
+    for path, data in outputs.items():
+        if _read(path) != data:
+            with open(path + '.tmp', 'wb') as f:
+                f.write(data)
+            os.replace(path + '.tmp', path)
+            written += 1
+    stale = _stale_chunks(outputs)
+    for path in stale:
+        os.remove(path)
+    print(f'build_locales.py: {len(outputs) - 1} locales, {written} files written, {len(stale)} stale removed')
+
+
+def report(translations, outputs, source_bytes):
+    print(f"{'startup download':<34} {'bytes':>8}")
+    print(f"{'translations.js (every locale)':<34} {source_bytes:>8}")
+    module = len(outputs[MODULE])
+    for lang in translations:
+        chunk = next(len(data) for path, data in outputs.items()
+                     if os.path.basename(path).startswith(f'{lang}.'))
+        print(f"{f'locales.js + {lang} chunk':<34} {module + chunk:>8}   (locales.js {module}, chunk {chunk})")
+
+
+def main(argv):
+    parser = argparse.ArgumentParser(description='Split translations.js into per-locale JSON chunks.')
+    parser.add_argument('--check', action='store_true', help='exit 1 if any output is out of date')
+    parser.add_argument('--report', action='store_true', help='print startup bytes, write nothing')
+    args = parser.parse_args(argv)
+
+    source = _read(SOURCE)
+    try:
+        translations = parse_translations(source.decode('utf-8'))
+        outputs = plan(translations)
+    except TranslationsError as e:
+        print(f'build_locales.py: {e}', file=sys.stderr)
+        return 1
+
+    if args.report:
+        report(translations, outputs, len(source))
+        return 0
+    if args.check:
+        outdated = [os.path.relpath(p, ROOT) for p, data in outputs.items() if _read(p) != data]
+        outdated += [os.path.relpath(p, ROOT) for p in _stale_chunks(outputs)]
+        for path in outdated:
+            print(f'out of date: {path}', file=sys.stderr)
+        if outdated:
+            print('run python3 build_locales.py', file=sys.stderr)
+        return 1 if outdated else 0
+    build(outputs)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,80 @@
+// Shared download helper for every result download button
+// Results are fetched into a Blob once per source: when the preview finishes
+// loading (primeDownload) or on the first click. Later clicks are served from
+// memory through a cached object URL. The cache is a small LRU bounded by
+// entry count and bytes; evicted entries have their object URL revoked.
+// Data URLs and Blobs never hit the network (see preview.js resultBlob).
+import { resultBlob, needsBlob } from './preview.js';
+
+const MAX_ENTRIES = 8;
+const MAX_BYTES = 200 * 1024 * 1024;
+
+const entries = new Map();  // src -> { blob: Promise<Blob>, size, url }, most recently used last
+
+function evict() {
+  let bytes = 0;
+  entries.forEach((entry) => { bytes += entry.size; });
+  for (const [src, entry] of entries) {
+    if (entries.size <= MAX_ENTRIES && bytes <= MAX_BYTES) break;
+    if (entry.url) URL.revokeObjectURL(entry.url);
+    bytes -= entry.size;
+    entries.delete(src);
+  }
+}
+
+async function load(src) {
+  if (needsBlob(src)) return await resultBlob(src);
+  // The preview just loaded this URL, so prefer the HTTP cache over a new download
+  const response = await fetch(src, { cache: 'force-cache' });
+  if (!response.ok) throw new Error(`Download failed: ${response.status}`);
+  return await response.blob();
+}
+
+function lookup(src) {
+  let entry = entries.get(src);
+  if (entry) {
+    entries.delete(src);
+  } else {
+    entry = { blob: null, size: 0, url: null };
+    entry.blob = load(src).then((blob) => {
+      entry.size = blob.size;
+      evict();
+      return blob;
+    });
+    entry.blob.catch(() => { if (entries.get(src) === entry) entries.delete(src); });
+  }
+  entries.set(src, entry);
+  return entry;
+}
+
+// Start fetching `src` in the background (call once its preview has loaded)
+export function primeDownload(src) {
+  if (!src || (src instanceof Blob)) return;
+  lookup(src).blob.catch((e) => console.warn('[download] Prefetch failed:', e));
+}
+
+// Save `src` as `filename`; served from the cache when the preview already loaded it
+export async function downloadResult(src, filename) {
+  try {
+    const entry = lookup(src);
+    const blob = await entry.blob;
+    if (!entry.url && entries.get(src) === entry) entry.url = URL.createObjectURL(blob);
+    const url = entry.url || URL.createObjectURL(blob);
+    const a = document.createElement('a');
+    a.href = url;
+    a.download = filename;
+    document.body.appendChild(a);
+    a.click();
+    a.remove();
+    if (url !== entry.url) setTimeout(() => URL.revokeObjectURL(url), 100);  // entry evicted meanwhile
+  } catch (error) {
+    console.error('[download] Failed:', error);
+    alert('Download failed. Please try again.');
+  }
+}
+
+// `<prefix>-<ISO timestamp>.png`, the name the result buttons always used
+export function timestampedName(prefix) {
+  const ts = new Date().toISOString().replace(/[:.]/g, '-');
+  return `${prefix}-${ts}.png`;
+}
@@ -1,27 +1,25 @@
 #!/usr/bin/env python3
-"""Move progress info and timer from canvas overlay to F12 console"""
+"""Move progress info and timer from canvas overlay to F12 console and the status log"""
 
-import re
+from patch_engine import add_import, literal, patch_file, replace_function, report
 
-# Read the file
-with open('user-flow.js', 'r', encoding='utf-8') as f:
-    content = f.read()
+TARGET = 'user-flow.js'
 
 # Pattern 1: startTimer function
-old_startTimer = r'''function startTimer\(sel\) \{
-  const panel = \$\(sel\);
-  if \(!panel\) return;
-  const timerEl = panel\.querySelector\('\.status-timer'\);
-  if \(!timerEl\) return;
+old_startTimer = '''function startTimer(sel) {
+  const panel = $(sel);
+  if (!panel) return;
+  const timerEl = panel.querySelector('.status-timer');
+  if (!timerEl) return;
   // clear old
-  if \(panel\._timer\) \{ clearInterval\(panel\._timer\); panel\._timer = null; \}
-  const start = Date\.now\(\);
-  startTimes\.set\(panel, start\);
-  panel\._timer = setInterval\(\(\) => \{
-    const elapsed = \(Date\.now\(\) - start\) / 1000;
-    timerEl\.textContent = `Elapsed: \$\{elapsed\.toFixed\(1\)\} s`;
-  \}, 100\);
-\}'''
+  if (panel._timer) { clearInterval(panel._timer); panel._timer = null; }
+  const start = Date.now();
+  startTimes.set(panel, start);
+  panel._timer = setInterval(() => {
+    const elapsed = (Date.now() - start) / 1000;
+    timerEl.textContent = `Elapsed: ${elapsed.toFixed(1)} s`;
+  }, 100);
+}'''
 
 new_startTimer = '''function startTimer(sel) {
   const panel = $(sel);
@@ -48,17 +46,17 @@ new_startTimer = '''function startTimer(sel) {
 }'''
 
 # Pattern 2: stopTimer function
-old_stopTimer = r'''function stopTimer\(sel, label\) \{
-  const panel = \$\(sel\);
-  if \(!panel\) return;
-  if \(panel\._timer\) \{ clearInterval\(panel\._timer\); panel\._timer = null; \}
-  const timerEl = panel\.querySelector\('\.status-timer'\);
-  const start = startTimes\.get\(panel\);
-  if \(timerEl && start\) \{
-    const elapsed = \(\(Date\.now\(\) - start\) / 1000\)\.toFixed\(1\);
-    timerEl\.textContent = label \? `\$\{label\} \(\$\{elapsed\} s\)` : `Elapsed: \$\{elapsed\} s`;
-  \}
-\}'''
+old_stopTimer = '''function stopTimer(sel, label) {
+  const panel = $(sel);
+  if (!panel) return;
+  if (panel._timer) { clearInterval(panel._timer); panel._timer = null; }
+  const timerEl = panel.querySelector('.status-timer');
+  const start = startTimes.get(panel);
+  if (timerEl && start) {
+    const elapsed = ((Date.now() - start) / 1000).toFixed(1);
+    timerEl.textContent = label ? `${label} (${elapsed} s)` : `Elapsed: ${elapsed} s`;
+  }
+}'''
 
 new_stopTimer = '''function stopTimer(sel, label) {
   const panel = $(sel);
@@ -79,37 +77,40 @@ new_stopTimer = '''function stopTimer(sel, label) {
   }
 }'''
 
-# Pattern 3: logStatus function
-old_logStatus = r'''function logStatus\(sel, msg, opts\) \{
-  const withTime = !opts \|\| opts\.withTime !== false;
-  const panel = \$\(sel\);
-  if \(!panel\) return;
-  let log = panel\.querySelector\('\.status-log'\);
-  if \(!log\) \{
-    log = document\.createElement\('div'\);
-    log\.className = 'status-log';
-    log\.style\.marginTop = '12px';
-    log\.style\.maxHeight = '180px';
-    log\.style\.overflow = 'auto';
-    log\.style\.borderTop = '1px dashed rgba\(255,255,255,\.18\)';
-    log\.style\.paddingTop = '8px';
-    log\.style\.color = '#a3aec2';
-    log\.style\.fontSize = '12px';
-    log\.style\.textAlign = 'left';
-    panel\.appendChild\(log\);
-  \}
-  const line = document\.createElement\('div'\);
-  if \(withTime\) \{
-    const ts = new Date\(\)\.toLocaleTimeString\(\);
-    line\.textContent = `\$\{ts\} \u00b7 \$\{msg\}`;
-  \} else \{
-    line\.textContent = `\$\{msg\}`;
-  \}
-  log\.appendChild\(line\);
-  log\.scrollTop = log\.scrollHeight;
-\}'''
-
-new_logStatus = '''function logStatus(sel, msg, opts) {
+# Pattern 3: logStatus and setAttempt go away; calls move to the levelled
+# ring-buffer logger of status-log.js. Both definitions are removed in their
+# DOM and their earlier console form. These are literals rather than function
+# patches so the blank line before each definition goes with it.
+old_logStatus = '''function logStatus(sel, msg, opts) {
+  const withTime = !opts || opts.withTime !== false;
+  const panel = $(sel);
+  if (!panel) return;
+  let log = panel.querySelector('.status-log');
+  if (!log) {
+    log = document.createElement('div');
+    log.className = 'status-log';
+    log.style.marginTop = '12px';
+    log.style.maxHeight = '180px';
+    log.style.overflow = 'auto';
+    log.style.borderTop = '1px dashed rgba(255,255,255,.18)';
+    log.style.paddingTop = '8px';
+    log.style.color = '#a3aec2';
+    log.style.fontSize = '12px';
+    log.style.textAlign = 'left';
+    panel.appendChild(log);
+  }
+  const line = document.createElement('div');
+  if (withTime) {
+    const ts = new Date().toLocaleTimeString();
+    line.textContent = `${ts} · ${msg}`;
+  } else {
+    line.textContent = `${msg}`;
+  }
+  log.appendChild(line);
+  log.scrollTop = log.scrollHeight;
+}'''
+
+console_logStatus = '''function logStatus(sel, msg, opts) {
   const withTime = !opts || opts.withTime !== false;
   const stepName = sel.includes('canvas1') ? 'Step1' : 'Step2';
 
@@ -122,22 +123,83 @@ new_logStatus = '''function logStatus(sel, msg, opts) {
   }
 }'''
 
-# Apply replacements
-content = re.sub(old_startTimer, new_startTimer, content, flags=re.MULTILINE)
-content = re.sub(old_stopTimer, new_stopTimer, content, flags=re.MULTILINE)
-content = re.sub(old_logStatus, new_logStatus, content, flags=re.MULTILINE)
-
-# Write back
-with open('user-flow.js', 'w', encoding='utf-8') as f:
-    f.write(content)
-
-print("Console logging updated successfully!")
-print("Modified functions:")
-print("  - startTimer(): Now logs to console instead of updating DOM")
-print("  - stopTimer(): Now logs to console instead of updating DOM")
-print("  - logStatus(): Now logs to console instead of creating DOM elements")
-print("")
-print("Changes:")
-print("  - Timer updates now appear in F12 console every 5 seconds")
-print("  - Status messages appear in F12 console with step labels [Step1] or [Step2]")
-print("  - All DOM manipulation code removed from these functions")
+old_setAttempt = '''function setAttempt(sel, current, max) {
+  const panel = $(sel);
+  if (!panel) return;
+  const el = panel.querySelector('.status-attempt');
+  if (el) el.textContent = `Attempt: ${current}/${max}`;
+}'''
+
+console_setAttempt = '''function setAttempt(sel, current, max) {  const stepName = sel.includes('canvas1') ? 'Step1' : 'Step2';  console.log(`[${stepName}] Attempt: ${current}/${max}`);}'''
+
+api_import = "import { FluxKontext } from './sdk/apiClient.js';"
+log_import = "import { log } from './status-log.js';"
+
+# The attempt counter is already part of the "Submitting ... (attempt n/max)" line
+attempt_calls = {sel: f'\nsetAttempt({sel}, attempt, maxRetries);' for sel in ('finalSel', 'targetSel')}
+
+# Nano debug payloads: the logger truncates `data` itself, and only when it is shown
+debug_blocks = [
+    (name, x, sel, f'''{{ try {{ const dbg = typeof {x}.debug==='string'? {x}.debug : JSON.stringify({x}.debug); '''
+             f'''logStatus({sel}, `debug: ${{String(dbg).slice(0,600)}}${{String(dbg).length>600?' …':''}}`{opts}); }} catch {{}} }}''')
+    for name, x, sel, opts in [('debug (nano)', 'e', 'finalSel', ''),
+                               ('debug (generate poll)', 'j', 'targetSel', ', { withTime: false }'),
+                               ('debug (generate error)', 'e', 'targetSel', ', { withTime:false }'),
+                               ('debug (refine poll)', 'j', 'targetSel', ', { withTime:false }')]
+]
+
+# Prompt previews become lazy messages, built only when the entry is shown
+nano_preview = r'''const preview = (nanoPrompt||'').replace(/\s+/g,' ').slice(0,120);'''
+nano_message = '''`Nano prompt: "${preview}${preview.length===120?'…':''}"`'''
+refine_preview = r'''const pvw = promptText.replace(/\s+/g,' ').slice(0,120);'''
+refine_message = '''`Refine prompt: "${pvw}${pvw.length===120?'…':''}"`'''
+preview_blocks = [
+    ('prompt (nano)', f'try {{ {nano_preview} logStatus(finalSel, {nano_message}); }} catch {{}}',
+     f'log.info(finalSel, () => {{ {nano_preview} return {nano_message}; }});'),
+    ('prompt (generate)', f'try {{ {nano_preview} logStatus(targetSel, {nano_message}, {{ withTime:false }}); }} catch {{}}',
+     f'log.info(targetSel, () => {{ {nano_preview} return {nano_message}; }});'),
+    ('prompt (refine)', f'if (promptText) {{ try {{ {refine_preview} logStatus(targetSel, {refine_message}, {{ withTime:false }}); }} catch {{}} }}',
+     f'if (promptText) log.info(targetSel, () => {{ {refine_preview} return {refine_message}; }});'),
+]
+
+# Calls that are not plain progress info; every other logStatus becomes log.info
+levelled_calls = [
+    ('Nano status', 'logStatus(finalSel, `Nano status:', 'log.debug(finalSel, `Nano status:'),
+    ('status', 'logStatus(targetSel, `status:', 'log.debug(targetSel, `status:'),
+    ('task error', 'logStatus(targetSel, `error: ${j.error}`', 'log.warn(targetSel, `error: ${j.error}`'),
+    ('attempt failed', 'logStatus(finalSel, `Attempt ${attempt} failed:', 'log.warn(finalSel, `Attempt ${attempt} failed:'),
+    ('request error', 'logStatus(targetSel, `error: ${e?.message', 'log.error(targetSel, `error: ${e?.message'),
+    ('final status', "logStatus(targetSel, 'Final status: failed", "log.error(targetSel, 'Final status: failed"),
+]
+
+# Overlapping matches go to the one that starts first, so the blocks above win
+# over the generic call rewrites below that fall inside them.
+PATCHES = [
+    add_import('import', api_import, log_import),
+    replace_function('startTimer', 'startTimer', new_startTimer, expect=old_startTimer),
+    replace_function('stopTimer', 'stopTimer', new_stopTimer, expect=old_stopTimer),
+    literal('logStatus', '\n\n' + old_logStatus, ''),
+    literal('logStatus (console)', '\n\n' + console_logStatus, ''),
+    literal('setAttempt', '\n\n' + old_setAttempt, ''),
+    literal('setAttempt (console)', '\n\n' + console_setAttempt, ''),
+    *(literal(f'setAttempt call ({sel})', call, '') for sel, call in attempt_calls.items()),
+    *(literal(name, block, f"log.debug({sel}, 'debug:', {x}.debug);") for name, x, sel, block in debug_blocks),
+    *(literal(name, old, new) for name, old, new in preview_blocks),
+    *(literal(name, old, new) for name, old, new in levelled_calls),
+    literal('withTime option', ', { withTime:false })', ')'),
+    literal('withTime option (spaced)', ', { withTime: false })', ')'),
+    literal('logStatus call (finalSel)', 'logStatus(finalSel,', 'log.info(finalSel,'),
+    literal('logStatus call (targetSel)', 'logStatus(targetSel,', 'log.info(targetSel,'),
+]
+
+if __name__ == '__main__':
+    counts = patch_file(TARGET, PATCHES)
+
+    print("Console logging updated successfully!")
+    print("Patches:")
+    report(counts)
+    print("")
+    print("Changes:")
+    print("  - Timer updates now appear in F12 console every 5 seconds")
+    print("  - Status messages go to the status-log.js ring buffer (log.debug/info/warn/error)")
+    print("  - logStatus and setAttempt removed; the attempt is part of the submit message")
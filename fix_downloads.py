@@ -1,23 +1,55 @@
 #!/usr/bin/env python3
-"""Fix download buttons to use fetch blob method"""
+"""Route the result download buttons through the shared download.js helper"""
 
-import re
+from patch_engine import add_import, literal, patch_file, report
 
-# Read the file
-with open('user-flow.js', 'r', encoding='utf-8') as f:
-    content = f.read()
+TARGET = 'user-flow.js'
 
-# Pattern to match the simple download onclick handler
-old_pattern = r'''btn\.onclick = \(\) => \{
-        const a = document\.createElement\('a'\);
-        a\.href = dataUrl;
-        const ts = new Date\(\)\.toISOString\(\)\.replace\(/\[:\.\]/g,'-'\);
-        a\.download = `final-\$\{ts\}\.png`;
-        document\.body\.appendChild\(a\); a\.click\(\); a\.remove\(\);
-      \};'''
+# Step 1: Import the helper after the preview.js import, or after the
+# apiClient import in versions that predate preview.js; skipped once
+# download.js is imported
+preview_import = ("import { resultBlob, needsBlob, previewSrc, thumbnailSrc, releasePreviews, ownsPreview } "
+                  "from './preview.js';")
+api_import = "import { FluxKontext } from './sdk/apiClient.js';"
+download_import = "import { downloadResult, timestampedName, primeDownload } from './download.js';"
 
-# Replacement with async fetch
-new_pattern = '''btn.onclick = async () => {
+# Step 1b: Prime the download cache once a preview has loaded, so the first
+# click is served from memory. Remote results only: blob: URLs are previews
+# of data URL results, whose Blob download.js gets from preview.js.
+old_loaded = """cleanup();
+
+    console.log('[DEBUG] Image loaded successfully:', {"""
+
+new_loaded = """cleanup();
+    // remote results: fill the download cache now, while the image is in the HTTP cache
+    if (!src.startsWith('blob:')) primeDownload(src);
+
+    console.log('[DEBUG] Image loaded successfully:', {"""
+
+# The original setCanvasImage has no load handler yet
+old_append = """  img.style.objectFit = 'contain';
+  panel.appendChild(img);"""
+
+new_append = """  img.style.objectFit = 'contain';
+  // fill the download cache once the preview has loaded
+  img.onload = () => { if (!src.startsWith('blob:')) primeDownload(src); };
+  panel.appendChild(img);"""
+
+prime_call = "primeDownload(src);"
+
+# Step 2: Canvas1 final (resend path). The button used to link the data URL
+# directly, then grew an inlined fetch -> blob -> object URL handler that
+# re-downloaded the image on every click; both become a helper call, which
+# serves the Blob cached when the preview loaded.
+old_pattern = '''btn.onclick = () => {
+        const a = document.createElement('a');
+        a.href = dataUrl;
+        const ts = new Date().toISOString().replace(/[:.]/g,'-');
+        a.download = `final-${ts}.png`;
+        document.body.appendChild(a); a.click(); a.remove();
+      };'''
+
+fetch_pattern = '''btn.onclick = async () => {
         try {
           let blobUrl = dataUrl;
           if (!dataUrl.startsWith('data:')) {
@@ -39,29 +71,38 @@ new_pattern = '''btn.onclick = async () => {
         }
       };'''
 
-# Replace all occurrences
-content = re.sub(old_pattern, new_pattern, content, flags=re.MULTILINE)
+new_pattern = """btn.onclick = () => downloadResult(dataUrl, timestampedName('final'));"""
+
+# Step 3: The compressed step1 handler in handleGenerate
+old_compressed = "btn.onclick=()=>{ const a=document.createElement('a'); a.href=r.imageBase64; const ts=new Date().toISOString().replace(/[:.]/g,'-'); a.download=`final-${ts}.png`; document.body.appendChild(a); a.click(); a.remove(); }"
 
-# Also handle the compressed version on line 479
-old_compressed = r"btn\.onclick=\(\)=>{ const a=document\.createElement\('a'\); a\.href=r\.imageBase64; const ts=new Date\(\)\.toISOString\(\)\.replace\(/\[:\.\]/g,'-'\); a\.download=`final-\$\{ts\}\.png`; document\.body\.appendChild\(a\); a\.click\(\); a\.remove\(\); }"
+fetch_compressed = "btn.onclick=async()=>{try{let blobUrl=r.imageBase64;if(!r.imageBase64.startsWith('data:')){const response=await fetch(r.imageBase64);const blob=await response.blob();blobUrl=URL.createObjectURL(blob);}const a=document.createElement('a');a.href=blobUrl;const ts=new Date().toISOString().replace(/[:.]/g,'-');a.download=`final-${ts}.png`;document.body.appendChild(a);a.click();a.remove();if(!r.imageBase64.startsWith('data:')){setTimeout(()=>URL.revokeObjectURL(blobUrl),100);}}catch(error){console.error('[download] Failed:',error);alert('Download failed. Please try again.');}}"
 
-new_compressed = "btn.onclick=async()=>{try{let blobUrl=r.imageBase64;if(!r.imageBase64.startsWith('data:')){const response=await fetch(r.imageBase64);const blob=await response.blob();blobUrl=URL.createObjectURL(blob);}const a=document.createElement('a');a.href=blobUrl;const ts=new Date().toISOString().replace(/[:.]/g,'-');a.download=`final-${ts}.png`;document.body.appendChild(a);a.click();a.remove();if(!r.imageBase64.startsWith('data:')){setTimeout(()=>URL.revokeObjectURL(blobUrl),100);}}catch(error){console.error('[download] Failed:',error);alert('Download failed. Please try again.');}}"
+new_compressed = "btn.onclick=()=>downloadResult(r.imageBase64,timestampedName('final'))"
 
-content = re.sub(old_compressed, new_compressed, content)
+# Step 4: The step2 refine download button
+old_step2 = "btn.onclick=()=>{ const a=document.createElement('a'); a.href=result.imageBase64; const ts=new Date().toISOString().replace(/[:.]/g,'-'); a.download=`refined-${ts}.png`; document.body.appendChild(a); a.click(); a.remove(); }"
 
-# Also handle the step2 refine download button on line 997
-old_step2 = r"btn\.onclick=\(\)=>{ const a=document\.createElement\('a'\); a\.href=result\.imageBase64; const ts=new Date\(\)\.toISOString\(\)\.replace\(/\[:\.\]/g,'-'\); a\.download=`refined-\$\{ts\}\.png`; document\.body\.appendChild\(a\); a\.click\(\); a\.remove\(\); }"
+fetch_step2 = "btn.onclick=async()=>{try{let blobUrl=result.imageBase64;if(!result.imageBase64.startsWith('data:')){const response=await fetch(result.imageBase64);const blob=await response.blob();blobUrl=URL.createObjectURL(blob);}const a=document.createElement('a');a.href=blobUrl;const ts=new Date().toISOString().replace(/[:.]/g,'-');a.download=`refined-${ts}.png`;document.body.appendChild(a);a.click();a.remove();if(!result.imageBase64.startsWith('data:')){setTimeout(()=>URL.revokeObjectURL(blobUrl),100);}}catch(error){console.error('[download] Failed:',error);alert('Download failed. Please try again.');}}"
 
-new_step2 = "btn.onclick=async()=>{try{let blobUrl=result.imageBase64;if(!result.imageBase64.startsWith('data:')){const response=await fetch(result.imageBase64);const blob=await response.blob();blobUrl=URL.createObjectURL(blob);}const a=document.createElement('a');a.href=blobUrl;const ts=new Date().toISOString().replace(/[:.]/g,'-');a.download=`refined-${ts}.png`;document.body.appendChild(a);a.click();a.remove();if(!result.imageBase64.startsWith('data:')){setTimeout(()=>URL.revokeObjectURL(blobUrl),100);}}catch(error){console.error('[download] Failed:',error);alert('Download failed. Please try again.');}}"
+new_step2 = "btn.onclick=()=>downloadResult(result.imageBase64,timestampedName('refined'))"
 
-content = re.sub(old_step2, new_step2, content)
+PATCHES = [
+    add_import('import', preview_import, download_import),
+    add_import('import (before preview.js)', api_import, download_import, unless=['./preview.js']),
+    literal('prime', old_loaded, new_loaded, present=prime_call),
+    literal('prime (plain)', old_append, new_append, present=prime_call),
+    literal('download', old_pattern, new_pattern),
+    literal('download (fetch)', fetch_pattern, new_pattern),
+    literal('compressed', old_compressed, new_compressed),
+    literal('compressed (fetch)', fetch_compressed, new_compressed),
+    literal('step2', old_step2, new_step2),
+    literal('step2 (fetch)', fetch_step2, new_step2),
+]
 
-# Write back
-with open('user-flow.js', 'w', encoding='utf-8') as f:
-    f.write(content)
+if __name__ == '__main__':
+    counts = patch_file(TARGET, PATCHES)
 
-print("Download functions updated successfully!")
-print("Modified locations:")
-print("  - Line ~309-315: async download with fetch")
-print("  - Line ~479: async download with fetch (compressed)")
-print("  - Line ~997: step2 refine async download with fetch")
+    print("Download buttons now use download.js (step3-upscale.js imports it directly)")
+    print("Patches:")
+    report(counts)
@@ -0,0 +1,135 @@
+#!/usr/bin/env python3
+"""Replace fixed-interval result polling with adaptive backoff and long-poll"""
+
+from patch_engine import literal, patch_file, report
+
+TARGET = 'sdk/apiClient.js'
+
+# Step 1: Add the shared polling helper after httpGet. The anchor runs on into
+# the FluxKontext header, which the helper then separates from httpGet, so a
+# second run (e.g. a fresh checkout without .patch-manifest.json) finds
+# nothing to insert.
+httpGet = '''async function httpGet(path) {
+  const url = `${DEFAULTS.baseUrl}${path}`;
+  const resp = await fetch(url, { credentials: 'include' });
+  if (!resp.ok) {
+    const text = await resp.text().catch(() => '');
+    throw new Error(`GET ${path} failed: ${resp.status} ${text}`);
+  }
+  return await resp.json();
+}'''
+
+old_httpGet = httpGet + '''
+
+export const FluxKontext = {'''
+
+new_httpGet = httpGet + '''
+
+// Adaptive result polling: check early, then back off (x factor, +/- jitter)
+// up to maxMs. A Retry-After header overrides the next delay. Every request
+// carries wait=<waitSec>; a server that long-polls holds the answer until the
+// task changes and says so with X-Long-Poll, after which we re-poll at once.
+// Servers that ignore wait= just get the backoff schedule. Cross-origin
+// backends must list Retry-After and X-Long-Poll in Access-Control-Expose-Headers.
+const POLL_DEFAULTS = {
+  initialMs: 500, maxMs: 5000, factor: 1.6, jitter: 0.2, waitSec: 20,
+  timeoutMs: 300000, maxAttempts: Infinity, timeoutMessage: 'poll timeout',
+};
+
+function retryAfterMs(resp) {
+  const value = resp.headers.get('retry-after');
+  if (!value) return null;
+  const seconds = Number(value);
+  if (Number.isFinite(seconds)) return Math.max(0, seconds * 1000);
+  const date = Date.parse(value);
+  return Number.isNaN(date) ? null : Math.max(0, date - Date.now());
+}
+
+export async function pollWithBackoff(url, isDone, options = {}) {
+  const opts = { ...POLL_DEFAULTS, ...options };
+  const start = Date.now();
+  let delay = opts.initialMs;
+  let longPoll = opts.waitSec > 0 ? undefined : false;  // undefined: not known yet
+  for (let attempt = 0; attempt < opts.maxAttempts; attempt++) {
+    const target = longPoll === false ? url : `${url}${url.includes('?') ? '&' : '?'}wait=${opts.waitSec}`;
+    const resp = await fetch(target, opts.fetchOptions);
+    const hinted = retryAfterMs(resp);
+    if (resp.ok) {
+      const j = await resp.json();
+      if (typeof opts.onProgress === 'function') {
+        try { opts.onProgress(j, attempt); } catch {}
+      }
+      if (isDone(j)) return j;  // may throw for failed tasks
+      if (longPoll === undefined) longPoll = resp.headers.has('x-long-poll');
+    } else if (!(hinted !== null || resp.status === 429 || resp.status === 503)) {
+      const text = await resp.text().catch(() => '');
+      throw new Error(`Poll failed: ${resp.status} ${text}`);
+    }
+    if (Date.now() - start > opts.timeoutMs) break;
+    let wait = hinted;
+    if (wait === null && !(longPoll && resp.ok)) {
+      wait = delay * (1 + opts.jitter * (2 * Math.random() - 1));
+      delay = Math.min(opts.maxMs, delay * opts.factor);
+    }
+    if (wait) await new Promise(r => setTimeout(r, Math.min(wait, Math.max(0, opts.timeoutMs - (Date.now() - start)))));
+  }
+  throw new Error(opts.timeoutMessage);
+}
+
+export const FluxKontext = {'''
+
+# Step 2: pollNanoResult goes through the helper; an explicit intervalMs keeps the old fixed interval
+old_pollNano = '''  async pollNanoResult(taskId, onProgress, { intervalMs = 3000, timeoutMs = 300000 } = {}) {
+    assert(taskId, 'taskId is required');
+    const start = Date.now();
+    while (true) {
+      const j = await httpGet(`/nano/result?task_id=${encodeURIComponent(taskId)}`);
+      if (typeof onProgress === 'function') {
+        try { onProgress(j); } catch {}
+      }
+      if (j && (j.imageBase64 || j.status === 'succeeded')) return j;
+      if (j && (j.status === 'failed' || j.status === 'error')) {
+        const err = new Error(j.error || 'nano process failed');
+        if (j.debug !== undefined) err.debug = j.debug;
+        throw err;
+      }
+      if (Date.now() - start > timeoutMs) throw new Error('nano result timeout');
+      await new Promise(r => setTimeout(r, intervalMs));
+    }
+  },'''
+
+new_pollNano = '''  async pollNanoResult(taskId, onProgress, { intervalMs, timeoutMs = 300000, ...backoff } = {}) {
+    assert(taskId, 'taskId is required');
+    const fixed = intervalMs ? { initialMs: intervalMs, maxMs: intervalMs, jitter: 0 } : {};
+    return await pollWithBackoff(`${DEFAULTS.baseUrl}/nano/result?task_id=${encodeURIComponent(taskId)}`, (j) => {
+      if (j && (j.imageBase64 || j.status === 'succeeded')) return true;
+      if (j && (j.status === 'failed' || j.status === 'error')) {
+        const err = new Error(j.error || 'nano process failed');
+        if (j.debug !== undefined) err.debug = j.debug;
+        throw err;
+      }
+      return false;
+    }, {
+      ...backoff, ...fixed, timeoutMs, onProgress,
+      timeoutMessage: 'nano result timeout',
+      fetchOptions: { credentials: 'include' },
+    });
+  },'''
+
+PATCHES = [
+    literal('pollWithBackoff', old_httpGet, new_httpGet),
+    literal('pollNanoResult', old_pollNano, new_pollNano),
+]
+
+if __name__ == '__main__':
+    counts = patch_file(TARGET, PATCHES)
+
+    print("Adaptive polling added successfully!")
+    print("Modified: sdk/apiClient.js - pollWithBackoff helper, pollNanoResult")
+    print("- First poll at once, then 0.5s x1.6 backoff with +/-20% jitter, capped at 5s")
+    print("- Sends wait=20 for long-poll servers (X-Long-Poll), honors Retry-After")
+    print("- pollNanoResult(..., { intervalMs }) still forces the old fixed interval")
+    print("Run fix_upscale_polling.py to switch step3-upscale.js over as well.")
+    print("")
+    print("Patches:")
+    report(counts)
@@ -1,26 +1,29 @@
 #!/usr/bin/env python3
-"""Add retry logic to API client for handling Render cold starts"""
+"""Add retry logic to API client for handling Render cold starts
 
-import re
+Applies to the original httpPost and upgrades the earlier 5s/10s retry
+version in place; one of the two patches always reports its anchor missing.
+"""
 
-# Read the file
-with open('sdk/apiClient.js', 'r', encoding='utf-8') as f:
-    content = f.read()
+from patch_engine import add_import, literal, patch_file, report
+
+TARGET = 'sdk/apiClient.js'
 
 # Pattern to match the httpPost function
-old_httpPost = r'''async function httpPost\(path, form\) \{
-  const url = `\$\{DEFAULTS\.baseUrl\}\$\{path\}`;
-  const resp = await fetch\(url, \{ method: 'POST', body: form, credentials: 'include' \}\);
-  if \(!resp\.ok\) \{
-    const text = await resp\.text\(\)\.catch\(\(\) => ''\);
-    throw new Error\(`POST \$\{path\} failed: \$\{resp\.status\} \$\{text\}`\);
-  \}
-  const contentType = resp\.headers\.get\('content-type'\) \|\| '';
-  if \(contentType\.includes\('application/json'\)\) return await resp\.json\(\);
-  return await resp\.text\(\);
-\}'''
-
-new_httpPost = '''async function httpPost(path, form, retries = 0) {
+old_httpPost = '''async function httpPost(path, form) {
+  const url = `${DEFAULTS.baseUrl}${path}`;
+  const resp = await fetch(url, { method: 'POST', body: form, credentials: 'include' });
+  if (!resp.ok) {
+    const text = await resp.text().catch(() => '');
+    throw new Error(`POST ${path} failed: ${resp.status} ${text}`);
+  }
+  const contentType = resp.headers.get('content-type') || '';
+  if (contentType.includes('application/json')) return await resp.json();
+  return await resp.text();
+}'''
+
+# The first version of the retry: fixed 5s/10s delays, full re-upload each time
+retry_httpPost = '''async function httpPost(path, form, retries = 0) {
   const url = `${DEFAULTS.baseUrl}${path}`;
   const MAX_RETRIES = 2;
   const RETRY_DELAYS = [5000, 10000]; // 5s, 10s
@@ -58,15 +61,137 @@ new_httpPost = '''async function httpPost(path, form, retries = 0) {
   }
 }'''
 
-# Replace
-content = re.sub(old_httpPost, new_httpPost, content, flags=re.MULTILINE)
+new_httpPost = '''// Cold starts (Render sleeps when idle): before a POST to a backend not seen
+// alive within WARMUP.ttlMs, a cheap GET probe waits for it to wake instead
+// of uploading megabytes into a 502. If a POST still fails with 404/502/503
+// or a network error, file parts of STAGE_MIN_BYTES or more go up once to
+// /uploads under their SHA-256 and the retry sends only `<field>_sha256`
+// references. Backends without /uploads get the full form again. A
+// Retry-After on the failed POST is waited out before retrying.
+const WARMUP = { path: '/me', ttlMs: 5 * 60 * 1000, maxWaitMs: 60000 };
+const COLD_STATUSES = [404, 502, 503];
+const STAGE_MIN_BYTES = 64 * 1024;
+const stagedHashes = new Set();
+let stagingSupported = true;
+let lastAliveAt = 0;
+
+async function waitForBackend() {
+  const start = Date.now();
+  let delay = 1000;
+  while (Date.now() - start < WARMUP.maxWaitMs) {
+    let hinted = 0;
+    try {
+      const resp = await fetch(`${DEFAULTS.baseUrl}${WARMUP.path}`, { credentials: 'include' });
+      if (!COLD_STATUSES.includes(resp.status)) {
+        lastAliveAt = Date.now();
+        return true;
+      }
+      hinted = Number(resp.headers.get('retry-after')) * 1000 || 0;
+    } catch {
+      // network error: still waking up
+    }
+    const wait = hinted || delay;
+    console.warn(`[API] backend not ready, probing again in ${(wait/1000).toFixed(1)}s...`);
+    await new Promise(resolve => setTimeout(resolve, wait));
+    delay = Math.min(5000, delay * 1.6);
+  }
+  return false;
+}
+
+async function stageForm(form) {
+  if (!stagingSupported) return form;
+  const staged = new FormData();
+  for (const [key, value] of form.entries()) {
+    if (!(value instanceof Blob) || value.size < STAGE_MIN_BYTES) {
+      staged.append(key, value);
+      continue;
+    }
+    const hash = await sha256Hex(value);
+    if (!hash) return form; // no crypto.subtle: send the form as is
+    if (!stagedHashes.has(hash)) {
+      const upload = new FormData();
+      upload.append('file', value, value.name || 'upload.bin');
+      upload.append('sha256', hash);
+      const resp = await fetch(`${DEFAULTS.baseUrl}/uploads`, { method: 'POST', body: upload, credentials: 'include' });
+      if (resp.status === 404 || resp.status === 405 || resp.status === 501) stagingSupported = false;
+      if (!resp.ok) return form;
+      stagedHashes.add(hash);
+    }
+    staged.append(`${key}_sha256`, hash);
+  }
+  return staged;
+}
+
+async function retryStaged(path, form, retries, retryAfterMs = 0) {
+  if (retryAfterMs) await new Promise(resolve => setTimeout(resolve, retryAfterMs));
+  let body = form;
+  if (await waitForBackend()) {
+    try { body = await stageForm(form); } catch { body = form; }
+  }
+  return httpPost(path, body, retries, form);
+}
+
+async function httpPost(path, form, retries = 0, fullForm = form) {
+  const url = `${DEFAULTS.baseUrl}${path}`;
+  const MAX_RETRIES = 2;
+
+  if (retries === 0 && Date.now() - lastAliveAt > WARMUP.ttlMs) await waitForBackend();
+
+  try {
+    const resp = await fetch(url, { method: 'POST', body: form, credentials: 'include' });
+    if (!resp.ok) {
+      const text = await resp.text().catch(() => '');
+      const status = resp.status;
+
+      // The backend lost a staged upload (e.g. restarted): send everything again
+      if (status === 409 && form !== fullForm && retries < MAX_RETRIES) {
+        stagedHashes.clear();
+        return httpPost(path, fullForm, retries + 1);
+      }
+
+      // Retry on cold start errors (404, 502, 503) but not auth errors (401, 403)
+      const shouldRetry = COLD_STATUSES.includes(status) && retries < MAX_RETRIES;
+
+      if (shouldRetry) {
+        console.warn(`[API] ${path} failed with ${status}, waiting for backend... (${retries + 1}/${MAX_RETRIES})`);
+        return retryStaged(path, fullForm, retries + 1, Number(resp.headers.get('retry-after')) * 1000 || 0);
+      }
+
+      throw new Error(`POST ${path} failed: ${status} ${text}`);
+    }
+    lastAliveAt = Date.now();
+    const contentType = resp.headers.get('content-type') || '';
+    if (contentType.includes('application/json')) return await resp.json();
+    return await resp.text();
+  } catch (error) {
+    // Network errors (fetch failed completely)
+    if (error.message && error.message.includes('Failed to fetch') && retries < MAX_RETRIES) {
+      console.warn(`[API] ${path} network error, waiting for backend... (${retries + 1}/${MAX_RETRIES})`);
+      return retryStaged(path, fullForm, retries + 1);
+    }
+    throw error;
+  }
+}'''
+
+# stageForm hashes with the memoised helper of sdk/hash.js (null without crypto.subtle)
+header_end = '// const result = await FluxKontext.pollNanoResult(task_id);'
+sha256_import = "\nimport { sha256Hex } from './hash.js';"  # after a blank line
+
+PATCHES = [
+    add_import('import', header_end, sha256_import),
+    literal('httpPost', old_httpPost, new_httpPost),
+    literal('httpPost (5s/10s retry)', retry_httpPost, new_httpPost),
+]
 
-# Write back
-with open('sdk/apiClient.js', 'w', encoding='utf-8') as f:
-    f.write(content)
+if __name__ == '__main__':
+    counts = patch_file(TARGET, PATCHES)
 
-print("API retry logic added successfully!")
-print("Modified: sdk/apiClient.js - httpPost function")
-print("- Automatically retries on 404, 502, 503 errors (Render cold start)")
-print("- Max 2 retries with 5s and 10s delays")
-print("- Does not retry on auth errors (401, 403)")
+    print("API retry logic added successfully!")
+    print("Modified: sdk/apiClient.js - httpPost function")
+    print("- Automatically retries on 404, 502, 503 errors (Render cold start)")
+    print("- Probes GET /me until the backend is awake before uploading (cached 5 min)")
+    print("- Max 2 retries; large files are staged once at /uploads by SHA-256")
+    print("- Does not retry on auth errors (401, 403)")
+    print("")
+    print("Patches:")
+    report(counts)
@@ -1,59 +1,57 @@
 #!/usr/bin/env python3
 """Add three independent timers: Total, Flux, and Nano"""
 
-import re
+from patch_engine import add_import, literal, patch_file, report
 
-# Read the file
-with open('user-flow.js', 'r', encoding='utf-8') as f:
-    content = f.read()
+TARGET = 'user-flow.js'
 
-# Step 1: Replace the timer helper section with new multi-timer system
-old_timer_section = r'''// ---- timer helpers ----
-const startTimes = new WeakMap\(\);
+# Step 1: Replace the timer helper section with the span-based multi-timer system
+old_timer_section = '''// ---- timer helpers ----
+const startTimes = new WeakMap();
 let currentCancel = null; // function to cancel current flow
-function startTimer\(sel\) \{
-  const panel = \$\(sel\);
-  if \(!panel\) return;
+function startTimer(sel) {
+  const panel = $(sel);
+  if (!panel) return;
 
   // Clear old timer if exists
-  if \(panel\._timer\) \{
-    clearInterval\(panel\._timer\);
-    panel\._timer = null;
-  \}
+  if (panel._timer) {
+    clearInterval(panel._timer);
+    panel._timer = null;
+  }
 
-  const start = Date\.now\(\);
-  startTimes\.set\(panel, start\);
+  const start = Date.now();
+  startTimes.set(panel, start);
 
   // Log to console instead of DOM
-  const stepName = sel\.includes\('canvas1'\) \? 'Step1' : 'Step2';
-  console\.log\(`\[\$\{stepName\}\] Timer started`\);
-
-  // Periodic console updates \(every 5 seconds to avoid spam\)
-  panel\._timer = setInterval\(\(\) => \{
-    const elapsed = \(Date\.now\(\) - start\) / 1000;
-    console\.log\(`\[\$\{stepName\}\] Elapsed: \$\{elapsed\.toFixed\(1\)\}s`\);
-  \}, 5000\);
-\}
-function stopTimer\(sel, label\) \{
-  const panel = \$\(sel\);
-  if \(!panel\) return;
+  const stepName = sel.includes('canvas1') ? 'Step1' : 'Step2';
+  console.log(`[${stepName}] Timer started`);
+
+  // Periodic console updates (every 5 seconds to avoid spam)
+  panel._timer = setInterval(() => {
+    const elapsed = (Date.now() - start) / 1000;
+    console.log(`[${stepName}] Elapsed: ${elapsed.toFixed(1)}s`);
+  }, 5000);
+}
+function stopTimer(sel, label) {
+  const panel = $(sel);
+  if (!panel) return;
 
   // Clear timer
-  if \(panel\._timer\) \{
-    clearInterval\(panel\._timer\);
-    panel\._timer = null;
-  \}
-
-  const start = startTimes\.get\(panel\);
-  if \(start\) \{
-    const elapsed = \(\(Date\.now\(\) - start\) / 1000\)\.toFixed\(1\);
-    const stepName = sel\.includes\('canvas1'\) \? 'Step1' : 'Step2';
-    const message = label \? `\$\{label\} \(\$\{elapsed\}s\)` : `Elapsed: \$\{elapsed\}s`;
-    console\.log\(`\[\$\{stepName\}\] \$\{message\}`\);
-  \}
-\}'''
-
-new_timer_section = '''// ---- timer helpers (multi-timer system) ----
+  if (panel._timer) {
+    clearInterval(panel._timer);
+    panel._timer = null;
+  }
+
+  const start = startTimes.get(panel);
+  if (start) {
+    const elapsed = ((Date.now() - start) / 1000).toFixed(1);
+    const stepName = sel.includes('canvas1') ? 'Step1' : 'Step2';
+    const message = label ? `${label} (${elapsed}s)` : `Elapsed: ${elapsed}s`;
+    console.log(`[${stepName}] ${message}`);
+  }
+}'''
+
+interval_timer_section = '''// ---- timer helpers (multi-timer system) ----
 const timerData = new WeakMap(); // stores { total, flux, nano } for each panel
 let currentCancel = null; // function to cancel current flow
 
@@ -118,46 +116,77 @@ function stopTimer(sel, type = 'total', label) {
   }
 }'''
 
-content = re.sub(old_timer_section, new_timer_section, content, flags=re.MULTILINE | re.DOTALL)
-
-# Step 2: Update onGenerateLook to start total timer at the beginning
-# Find the function and add total timer start
-old_generate_start = r'''async function onGenerateLook\(\) \{
-  if \(currentCancel\) \{ alert\('A generation is already running'\); return; \}
-  const mainFile = __mainFile;
-  const refFile = __garmentOriginal;
-  if \(!mainFile \|\| !refFile\) \{ alert\('Please upload both images first'\); return; \}
-  resetCanvas\(targetSel\);
-  resetCanvas\(finalSel\);
-  __lastMainFile = mainFile;
-  __lastGarmentFile = refFile;
-  try \{
-    setCanvasLoading\(targetSel, 'Running Flux \(half image\)…'\);
-    startTimer\(targetSel\);'''
-
-new_generate_start = '''async function onGenerateLook() {
-  if (currentCancel) { alert('A generation is already running'); return; }
-  const mainFile = __mainFile;
-  const refFile = __garmentOriginal;
-  if (!mainFile || !refFile) { alert('Please upload both images first'); return; }
-  resetCanvas(targetSel);
-  resetCanvas(finalSel);
-  __lastMainFile = mainFile;
-  __lastGarmentFile = refFile;
-  try {
-    // Start total timer for entire workflow
-    startTimer(targetSel, 'total');
-    setCanvasLoading(targetSel, 'Running Flux (half image)…');
-    startTimer(targetSel, 'flux');'''
-
-content = re.sub(old_generate_start, new_generate_start, content, flags=re.MULTILINE)
-
-# Step 3: Update Flux completion to stop Flux timer
-old_flux_complete = r'''__lastHalfBlob = halfBlob;
+# The interval version above logged elapsed seconds every 5s per timer and
+# measured nothing else; timers are now tracing.js spans (performance.mark /
+# measure, batched to the collector) and stages get child spans via startStage
+new_timer_section = '''// ---- timer helpers (tracing spans, see tracing.js) ----
+const timerData = new WeakMap(); // stores the { total, flux, nano } spans of each panel
+let currentCancel = null; // function to cancel current flow
+
+function startTimer(sel, type = 'total') {
+  const panel = $(sel);
+  if (!panel) return;
+
+  let timers = timerData.get(panel);
+  if (!timers) {
+    timers = { total: null, flux: null, nano: null };
+    timerData.set(panel, timers);
+  }
+
+  // A restarted timer abandons the previous run's span
+  const timerKey = type.toLowerCase();
+  timers[timerKey]?.end('cancelled');
+
+  const stepName = sel.includes('canvas1') ? 'Step1' : 'Step2';
+  const parent = timerKey === 'total' ? null : timers.total;
+  timers[timerKey] = startSpan(timerKey, { parent, attrs: { step: stepName } });
+
+  const timerLabel = type.charAt(0).toUpperCase() + type.slice(1);
+  console.log(`[${stepName}] ${timerLabel} timer started`);
+}
+
+function stopTimer(sel, type = 'total', label) {
+  const panel = $(sel);
+  if (!panel) return;
+
+  const timers = timerData.get(panel);
+  if (!timers) return;
+
+  const timerKey = type.toLowerCase();
+  const span = timers[timerKey];
+  if (!span) return;
+
+  // Ended spans stay in place so later stages (e.g. preview) keep the trace id
+  const status = label === 'failed' ? 'error' : label === 'cached' ? 'cached' : 'ok';
+  const done = span.end(status);
+  if (done) {
+    const elapsed = (done.ms / 1000).toFixed(1);
+    const stepName = sel.includes('canvas1') ? 'Step1' : 'Step2';
+    const timerLabel = type.charAt(0).toUpperCase() + type.slice(1);
+    const message = label ? `${timerLabel} ${label} (${elapsed}s)` : `${timerLabel}: ${elapsed}s`;
+    console.log(`[${stepName}] ${message}`);
+  }
+}
+
+// Span for one stage of the panel's current run (flux-fetch, padding, nano-submit, nano-poll, preview)
+function startStage(sel, name) {
+  const panel = $(sel);
+  const timers = panel ? timerData.get(panel) : null;
+  const stepName = sel.includes('canvas1') ? 'Step1' : 'Step2';
+  return startSpan(name, { parent: timers?.total || null, attrs: { step: stepName } });
+}'''
+
+# The spans come from tracing.js, imported after the apiClient import (present
+# in every version of user-flow.js) unless it is imported already
+api_import = "import { FluxKontext } from './sdk/apiClient.js';"
+tracing_import = "import { startSpan } from './tracing.js';"
+
+# Step 2: Update Flux completion to stop Flux timer
+old_flux_complete = '''__lastHalfBlob = halfBlob;
       __lastMainSig = currSig;
-      logStatus\(targetSel, `Flux done\. Half-image size: \$\{halfBlob\.size\} bytes`\);
-    \}
-    stopTimer\(targetSel, 'Done'\);'''
+      logStatus(targetSel, `Flux done. Half-image size: ${halfBlob.size} bytes`);
+    }
+    stopTimer(targetSel, 'Done');'''
 
 new_flux_complete = '''__lastHalfBlob = halfBlob;
       __lastMainSig = currSig;
@@ -165,92 +194,72 @@ new_flux_complete = '''__lastHalfBlob = halfBlob;
     }
     stopTimer(targetSel, 'flux', 'completed');'''
 
-content = re.sub(old_flux_complete, new_flux_complete, content)
+# The same block once fix_console_logging.py has moved logStatus to status-log.js,
+# so this set works before or after it
+def _migrated(snippet):
+    return snippet.replace('logStatus(targetSel,', 'log.info(targetSel,')
 
-# Step 4: Update step2 NanoBanana to start Nano timer
-old_nano_start = r'''if \(!lastHalfBlob\) \{ setCanvasError\(finalSel, 'Half image not ready'\); return; \}
-  setCanvasLoading\(finalSel, 'Sending to NanoBanana…'\);
-  startTimer\(finalSel\);'''
+# Step 3: Update step2 NanoBanana to start Nano timer
+old_nano_start = '''if (!lastHalfBlob) { setCanvasError(finalSel, 'Half image not ready'); return; }
+  setCanvasLoading(finalSel, 'Sending to NanoBanana…');
+  startTimer(finalSel);'''
 
 new_nano_start = '''if (!lastHalfBlob) { setCanvasError(finalSel, 'Half image not ready'); return; }
   setCanvasLoading(finalSel, 'Sending to NanoBanana…');
   startTimer(targetSel, 'nano');'''
 
-content = re.sub(old_nano_start, new_nano_start, content)
-
-# Step 5: Update Nano completion to stop Nano timer and Total timer
-old_nano_complete = r'''if \(result\?\.imageBase64\) \{
-    stopTimer\(finalSel, 'Done'\);
-    setCanvasImage\(finalSel, result\.imageBase64\);'''
+# Step 4: Update Nano completion to stop Nano timer and Total timer
+old_nano_complete = '''if (result?.imageBase64) {
+    stopTimer(finalSel, 'Done');
+    setCanvasImage(finalSel, result.imageBase64);'''
 
 new_nano_complete = '''if (result?.imageBase64) {
     stopTimer(targetSel, 'nano', 'completed');
     stopTimer(targetSel, 'total', 'completed');
     setCanvasImage(finalSel, result.imageBase64);'''
 
-content = re.sub(old_nano_complete, new_nano_complete, content)
-
-# Step 6: Update error handlers to stop timers
+# Step 5: Update error handlers to stop timers
 # Flux error handler
-old_flux_error = r'''\} catch \(e\) \{ const msg = e\?\.message \|\| String\(e\); stopTimer\(targetSel, 'Failed'\);'''
+old_flux_error = '''} catch (e) { const msg = e?.message || String(e); stopTimer(targetSel, 'Failed');'''
 
 new_flux_error = '''} catch (e) { const msg = e?.message || String(e); stopTimer(targetSel, 'flux', 'failed'); stopTimer(targetSel, 'total', 'failed');'''
 
-content = re.sub(old_flux_error, new_flux_error, content)
-
 # Nano error handler
-old_nano_error = r'''stopTimer\(finalSel, 'Failed'\); setCanvasError\(finalSel, `Generation failed: \$\{lastError\?\.message'''
+old_nano_error = '''stopTimer(finalSel, 'Failed'); setCanvasError(finalSel, `Generation failed: ${lastError?.message'''
 
 new_nano_error = '''stopTimer(targetSel, 'nano', 'failed'); stopTimer(targetSel, 'total', 'failed'); setCanvasError(finalSel, `Generation failed: ${lastError?.message'''
 
-content = re.sub(old_nano_error, new_nano_error, content)
-
-# Step 7: Update step2 refine function timer calls
-old_refine_start = r'''async function onRefineStep2\(\) \{
-  if \(!step2Result\) \{ alert\('No step2 image to refine'\); return; \}
-  const targetSel = '#canvas2';
-  try \{
-    setCanvasLoading\(targetSel, 'Refining…'\);
-    startTimer\(targetSel\);'''
-
-new_refine_start = '''async function onRefineStep2() {
-  if (!step2Result) { alert('No step2 image to refine'); return; }
-  const targetSel = '#canvas2';
-  try {
-    setCanvasLoading(targetSel, 'Refining…');
-    startTimer(targetSel, 'total');'''
-
-content = re.sub(old_refine_start, new_refine_start, content, flags=re.MULTILINE)
-
-old_refine_complete = r'''const result = await FluxKontext\.refineFlux\(blob, refineOpts\);
-    stopTimer\(targetSel, 'Done'\);'''
-
-new_refine_complete = '''const result = await FluxKontext.refineFlux(blob, refineOpts);
-    stopTimer(targetSel, 'total', 'completed');'''
-
-content = re.sub(old_refine_complete, new_refine_complete, content)
-
-old_refine_error = r'''\} catch \(e\) \{ const msg = e\?\.message \|\| String\(e\); stopTimer\(targetSel, 'Failed'\); setCanvasError\(targetSel, `Refine failed: \$\{msg\}`\); \}'''
-
-new_refine_error = '''} catch (e) { const msg = e?.message || String(e); stopTimer(targetSel, 'total', 'failed'); setCanvasError(targetSel, `Refine failed: ${msg}`); }'''
-
-content = re.sub(old_refine_error, new_refine_error, content)
-
-# Write back
-with open('user-flow.js', 'w', encoding='utf-8') as f:
-    f.write(content)
-
-print("Triple timer system implemented successfully!")
-print("")
-print("Timer types:")
-print("  1. Total - From clicking Generate Look to final completion")
-print("  2. Flux - Flux processing time (step1)")
-print("  3. Nano - NanoBanana processing time (step2)")
-print("")
-print("Console output format:")
-print("  [Step1] Total timer started")
-print("  [Step1] Flux timer started")
-print("  [Step1] Flux completed (8.5s)")
-print("  [Step1] Nano timer started")
-print("  [Step1] Nano completed (15.2s)")
-print("  [Step1] Total completed (23.7s)")
+PATCHES = [
+    add_import('import', api_import, tracing_import),
+    literal('timer_section', old_timer_section, new_timer_section),
+    literal('timer_section (intervals)', interval_timer_section, new_timer_section),
+    literal('flux_complete', old_flux_complete, new_flux_complete),
+    literal('flux_complete (log)', _migrated(old_flux_complete), _migrated(new_flux_complete)),
+    literal('nano_start', old_nano_start, new_nano_start),
+    literal('nano_complete', old_nano_complete, new_nano_complete),
+    literal('flux_error', old_flux_error, new_flux_error),
+    literal('nano_error', old_nano_error, new_nano_error),
+]
+
+if __name__ == '__main__':
+    counts = patch_file(TARGET, PATCHES)
+
+    print("Triple timer system implemented successfully!")
+    print("")
+    print("Timer types:")
+    print("  1. Total - From clicking Generate Look to final completion")
+    print("  2. Flux - Flux processing time (step1)")
+    print("  3. Nano - NanoBanana processing time (step2)")
+    print("")
+    print("Each timer is a tracing.js span (performance.measure + /telemetry beacon)")
+    print("")
+    print("Console output format:")
+    print("  [Step1] Total timer started")
+    print("  [Step1] Flux timer started")
+    print("  [Step1] Flux completed (8.5s)")
+    print("  [Step1] Nano timer started")
+    print("  [Step1] Nano completed (15.2s)")
+    print("  [Step1] Total completed (23.7s)")
+    print("")
+    print("Patches:")
+    report(counts)
@@ -0,0 +1,144 @@
+#!/usr/bin/env python3
+"""Switch step3 upscale polling to the shared adaptive poller (run fix_polling.py first)"""
+
+from patch_engine import literal, patch_file, replace_function, report
+
+TARGET = 'step3-upscale.js'
+
+# Step 1: Import the helper fix_polling.py adds to the SDK
+old_import = '''import { FluxKontext } from './sdk/apiClient.js';'''
+
+new_import = '''import { FluxKontext, pollWithBackoff } from './sdk/apiClient.js';'''
+
+# Step 2: pollResult slept a fixed 5s before every poll, so a finished job
+# waited up to 5s more; now it polls at once and backs off to 5s
+old_pollResult = '''async function pollResult(taskId) {
+    const apiBase = getApiBase();
+    const maxAttempts = 120; // 最多轮询120次 (10分钟)
+    const interval = 5000; // 每5秒轮询一次
+
+    for (let i = 0; i < maxAttempts; i++) {
+      await new Promise(resolve => setTimeout(resolve, interval));
+
+      try {
+        const response = await fetch(`${apiBase}/upscale/result?task_id=${taskId}`);
+
+        if (!response.ok) {
+          throw new Error(`Poll failed: ${response.status}`);
+        }
+
+        const data = await response.json();
+        console.log(`[step3] Poll ${i + 1}:`, data.status, data.stage || '');
+
+        if (data.status === 'done') {
+          // 成功
+          const resultUrl = data.result_url;
+
+          if (!resultUrl) {
+            throw new Error('No result URL in response');
+          }
+
+          // 构造完整URL
+          const fullUrl = resultUrl.startsWith('http')
+            ? resultUrl
+            : `${apiBase}${resultUrl}`;
+
+          console.log('[step3] Success! URL:', fullUrl);
+
+          showResult(fullUrl);
+
+          upscaleBtn.disabled = false;
+          upscaleBtn.textContent = 'Upscale Image';
+          return;
+        } else if (data.status === 'error') {
+          // 失败
+          throw new Error(data.error || 'Upscale failed');
+        }
+
+        // 继续轮询（status === 'pending' 或 'running'）
+        // 只更新文本，不重新创建进度条
+        const stage = data.stage || 'processing';
+        updateLoadingText(`${stage.replace(/_/g, ' ')}...`);
+
+      } catch (error) {
+        console.error(`[step3] Poll error:`, error);
+        showError(error.message || 'Failed to check status');
+        upscaleBtn.disabled = false;
+        upscaleBtn.textContent = 'Upscale Image';
+        return;
+      }
+    }
+
+    // 超时
+    showError('Upscale timed out. Please try again.');
+    upscaleBtn.disabled = false;
+    upscaleBtn.textContent = 'Upscale Image';
+  }'''
+
+new_pollResult = '''async function pollResult(taskId) {
+    const apiBase = getApiBase();
+
+    try {
+      // 自适应轮询：先快后慢（最长5秒一次），支持长轮询和 Retry-After，最多10分钟
+      const data = await pollWithBackoff(`${apiBase}/upscale/result?task_id=${taskId}`, (data) => {
+        if (data.status === 'error') {
+          // 失败
+          throw new Error(data.error || 'Upscale failed');
+        }
+        return data.status === 'done';
+      }, {
+        initialMs: 1000,
+        maxMs: 5000,
+        timeoutMs: 600000,
+        timeoutMessage: 'Upscale timed out. Please try again.',
+        onProgress: (data, i) => {
+          console.log(`[step3] Poll ${i + 1}:`, data.status, data.stage || '');
+          // 继续轮询（status === 'pending' 或 'running'）
+          // 只更新文本，不重新创建进度条
+          if (data.status !== 'done' && data.status !== 'error') {
+            const stage = data.stage || 'processing';
+            updateLoadingText(`${stage.replace(/_/g, ' ')}...`);
+          }
+        },
+      });
+
+      // 成功
+      const resultUrl = data.result_url;
+
+      if (!resultUrl) {
+        throw new Error('No result URL in response');
+      }
+
+      // 构造完整URL
+      const fullUrl = resultUrl.startsWith('http')
+        ? resultUrl
+        : `${apiBase}${resultUrl}`;
+
+      console.log('[step3] Success! URL:', fullUrl);
+
+      showResult(fullUrl);
+    } catch (error) {
+      console.error(`[step3] Poll error:`, error);
+      showError(error.message || 'Failed to check status');
+    }
+
+    upscaleBtn.disabled = false;
+    upscaleBtn.textContent = 'Upscale Image';
+  }'''
+
+PATCHES = [
+    literal('import', old_import, new_import),
+    replace_function('pollResult', 'pollResult', new_pollResult, expect=old_pollResult),
+]
+
+if __name__ == '__main__':
+    counts = patch_file(TARGET, PATCHES)
+
+    print("Step3 adaptive polling added successfully!")
+    print("Modified: step3-upscale.js - pollResult")
+    print("- First poll right away, then 1s backing off to 5s (was: 5s sleep before every poll)")
+    print("- Long-poll and Retry-After support via pollWithBackoff from sdk/apiClient.js")
+    print("- Same 10 minute limit and error messages as before")
+    print("")
+    print("Patches:")
+    report(counts)
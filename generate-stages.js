@@ -0,0 +1,51 @@
+// Stages of handleGenerate shared with the batch engine (batch-engine.js)
+// Half images and padded garments are cached in IndexedDB by content hash
+// (image-cache.js), so identical inputs skip Flux / padding even after a reload.
+import { FluxKontext } from './sdk/apiClient.js';
+import { preprocess } from './sdk/imagePipeline.js';
+import { imageCache, sha256Hex } from './image-cache.js';
+
+export const FLUX_PROMPT = 'remove clothes';
+export const FLUX_STEPS = 8;
+
+// Pixel size of an uploaded File: decoded once (createImageBitmap in the image
+// worker) and shared by every stage and retry that needs it
+const imageSizes = new WeakMap();
+export function getImageSizeFromFile(file) {
+  if (!imageSizes.has(file)) {
+    const probe = preprocess('probe', file);
+    probe.catch(() => imageSizes.delete(file));  // let a later call retry
+    imageSizes.set(file, probe);
+  }
+  return imageSizes.get(file);
+}
+
+export async function halfImageKey(mainFile) {
+  const hash = await sha256Hex(mainFile);
+  return hash && `flux-half:${hash}:${FLUX_STEPS}:${FLUX_PROMPT}`;
+}
+
+// Concurrent requests for the same padded garment (a batch pairing one outfit
+// with many characters of the same size) share one padding; the entry stays
+// until the cache write lands so the next request finds it there.
+const paddings = new Map();  // cache key -> Promise<{ blob, cached }>
+
+// returns { blob, cached }
+export async function computePaddedGarment(mainFile, garmentOriginal) {
+  if (!mainFile || !garmentOriginal) return null;
+  const [mainSize, hash] = await Promise.all([getImageSizeFromFile(mainFile), sha256Hex(garmentOriginal)]);
+  const key = hash && `garment-padded:${hash}:${mainSize.width}x${mainSize.height}`;
+  if (key && paddings.has(key)) return { blob: (await paddings.get(key)).blob, cached: true };
+  const task = (async () => {
+    const cached = await imageCache.get(key);
+    if (cached) return { blob: cached, cached: true };
+    const padded = await FluxKontext.resizeImageWithPadding(garmentOriginal, mainSize.width, mainSize.height, '#ffffff');
+    return { blob: padded, cached: false };
+  })();
+  if (!key) return task;
+  paddings.set(key, task);
+  task.then(
+    ({ blob, cached }) => (cached ? null : imageCache.set(key, blob)),  // never delays the Nano submit
+  ).catch(() => {}).finally(() => paddings.delete(key));
+  return task;
+}
@@ -1,4 +1,9 @@
 // Hero Background Carousel
+// With the responsive build (build_images.py) only the first slide is in the
+// HTML with a real src; the others carry data-srcset / data-src and are
+// loaded one slide ahead: the second after the page has loaded, each next
+// one when its predecessor shows. A slide that has not loaded yet is skipped
+// for a tick rather than faded in half-decoded.
 (function() {
   const images = document.querySelectorAll('.hero-bg-image');
 
@@ -11,9 +16,31 @@
   const totalImages = images.length;
   const interval = 4000; // 4 seconds
 
+  // Move data-srcset / data-src onto the slide's <source>s and <img>
+  function loadSlide(index) {
+    const img = images[index];
+    if (!img || !img.dataset.src) return;
+    img.parentElement.querySelectorAll('source[data-srcset]').forEach((source) => {
+      source.srcset = source.dataset.srcset;
+      source.removeAttribute('data-srcset');
+    });
+    img.src = img.dataset.src;
+    img.removeAttribute('data-src');
+  }
+
+  function isReady(img) {
+    return !img.dataset.src && img.complete;  // complete: loaded, or failed (shown as before)
+  }
+
   console.log(`[hero-carousel] Initialized with ${totalImages} images`);
 
   function showNextImage() {
+    const nextIndex = (currentIndex + 1) % totalImages;
+    if (!isReady(images[nextIndex])) {
+      loadSlide(nextIndex);
+      return;
+    }
+
     // Remove active class from current image
     images[currentIndex].classList.remove('active');
 
@@ -23,9 +50,19 @@
     // Add active class to next image
     images[currentIndex].classList.add('active');
 
+    // Fetch the slide after this one while this one shows
+    loadSlide((currentIndex + 1) % totalImages);
+
     console.log(`[hero-carousel] Showing image ${currentIndex + 1}/${totalImages}`);
   }
 
+  // The second slide waits until the first (the LCP image) and the page are done
+  if (document.readyState === 'complete') {
+    loadSlide(1);
+  } else {
+    window.addEventListener('load', () => loadSlide(1), { once: true });
+  }
+
   // Start carousel rotation
   setInterval(showNextImage, interval);
 
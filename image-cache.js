@@ -0,0 +1,132 @@
+// Persistent content-addressed cache for generation intermediates
+// (Flux half images, padded garments). Keys start with the SHA-256 of the
+// input bytes, values are Blobs in IndexedDB. Every read refreshes the
+// entry's lastUsed time; writes evict least recently used entries once the
+// store passes MAX_BYTES or MAX_ENTRIES. Set localStorage IMAGE_CACHE=off to
+// bypass it. Without IndexedDB or crypto.subtle (private mode, plain http)
+// every lookup misses and writes are dropped.
+
+// Keys are built with the SDK's memoised hash (shared with staged uploads)
+export { sha256Hex } from './sdk/hash.js';
+
+const DB_NAME = 'DressOnImageCache';
+const STORE_NAME = 'blobs';
+const DB_VERSION = 1;
+const MAX_BYTES = 150 * 1024 * 1024;
+const MAX_ENTRIES = 200;
+
+class ImageCache {
+  constructor({ maxBytes = MAX_BYTES, maxEntries = MAX_ENTRIES } = {}) {
+    this.maxBytes = maxBytes;
+    this.maxEntries = maxEntries;
+    this.db = null;
+    this.ready = null;
+  }
+
+  get enabled() {
+    try {
+      return typeof indexedDB !== 'undefined' && window.localStorage.getItem('IMAGE_CACHE') !== 'off';
+    } catch {
+      return typeof indexedDB !== 'undefined';
+    }
+  }
+
+  async init() {
+    return new Promise((resolve, reject) => {
+      const request = indexedDB.open(DB_NAME, DB_VERSION);
+
+      request.onerror = (event) => {
+        console.error('[image cache] IndexedDB error:', event.target.error);
+        reject(event.target.error);
+      };
+
+      request.onsuccess = (event) => {
+        this.db = event.target.result;
+        resolve(this.db);
+      };
+
+      request.onupgradeneeded = (event) => {
+        const db = event.target.result;
+        if (!db.objectStoreNames.contains(STORE_NAME)) {
+          const store = db.createObjectStore(STORE_NAME, { keyPath: 'key' });
+          store.createIndex('lastUsed', 'lastUsed');
+        }
+      };
+    });
+  }
+
+  async open() {
+    if (!this.enabled) return null;
+    if (!this.ready) this.ready = this.init().catch(() => null);
+    return await this.ready;
+  }
+
+  // Blob stored under `key`, or null
+  async get(key) {
+    const db = key && await this.open();
+    if (!db) return null;
+    return new Promise((resolve) => {
+      const transaction = db.transaction([STORE_NAME], 'readwrite');
+      const store = transaction.objectStore(STORE_NAME);
+      const request = store.get(key);
+
+      request.onsuccess = () => {
+        const entry = request.result;
+        if (!entry) return resolve(null);
+        entry.lastUsed = Date.now();
+        store.put(entry);
+        resolve(entry.blob);
+      };
+      request.onerror = () => resolve(null);
+    });
+  }
+
+  async set(key, blob) {
+    const db = key && blob && await this.open();
+    if (!db) return;
+    await new Promise((resolve) => {
+      const transaction = db.transaction([STORE_NAME], 'readwrite');
+      transaction.objectStore(STORE_NAME).put({ key, blob, size: blob.size, lastUsed: Date.now() });
+      transaction.oncomplete = () => resolve();
+      transaction.onerror = () => resolve();
+      transaction.onabort = () => resolve();  // e.g. QuotaExceededError: just don't cache
+    });
+    await this.evict();
+  }
+
+  // Walk entries newest first; everything past the size / count cap goes
+  async evict() {
+    const db = await this.open();
+    if (!db) return;
+    await new Promise((resolve) => {
+      const transaction = db.transaction([STORE_NAME], 'readwrite');
+      const cursor = transaction.objectStore(STORE_NAME).index('lastUsed').openCursor(null, 'prev');
+      let bytes = 0;
+      let count = 0;
+      cursor.onsuccess = () => {
+        const c = cursor.result;
+        if (!c) return;
+        bytes += c.value.size || 0;
+        count += 1;
+        if (bytes > this.maxBytes || count > this.maxEntries) c.delete();
+        c.continue();
+      };
+      transaction.oncomplete = () => resolve();
+      transaction.onerror = () => resolve();
+      transaction.onabort = () => resolve();
+    });
+  }
+
+  async clear() {
+    const db = await this.open();
+    if (!db) return;
+    await new Promise((resolve) => {
+      const transaction = db.transaction([STORE_NAME], 'readwrite');
+      transaction.objectStore(STORE_NAME).clear();
+      transaction.oncomplete = () => resolve();
+      transaction.onerror = () => resolve();
+    });
+  }
+}
+
+export const imageCache = new ImageCache();
@@ -0,0 +1,240 @@
+#!/usr/bin/env python3
+"""Function-boundary index for JavaScript sources
+
+One pass over the source that understands strings, template literals (with
+nested ${...} expressions), comments and regex literals, and pairs up every
+{} that sits in code. Named functions are then looked up from
+that: `function name(...) {...}` declarations (optionally async / exported)
+and `const|let|var name = function/arrow` assignments with a block body.
+
+  python js_index.py user-flow.js      # print name -> [start, end) offsets
+
+Indexes are cached per content hash, so patching several sets against the
+same text (or re-running on an unchanged file) scans it once.
+"""
+
+import hashlib
+import re
+import sys
+from bisect import bisect_right
+
+_IDENT = r'[A-Za-z_$][\w$]*'
+
+# Everything the scanner stops at; comments and strings are consumed whole
+_TOKEN = re.compile(r'''
+    //[^\n]* | /\*.*?(?:\*/|\Z)
+  | '(?:[^'\\\n]|\\.)*'? | "(?:[^"\\\n]|\\.)*"?
+  | [`/{}]
+''', re.S | re.X)
+# Same, plus parentheses, for the short walk over a parameter list
+_PAREN_TOKEN = re.compile(_TOKEN.pattern.replace('[`/{}]', '[`/{}()]'), re.S | re.X)
+_TEMPLATE = re.compile(r'(?:[^`\\$]|\\.|\$(?!\{))*', re.S)
+_REGEX = re.compile(r'(?:[^/\\\[\n]|\\.|\[(?:[^\]\\\n]|\\.)*\])*/[A-Za-z]*')
+_WORD_BEFORE = re.compile(r'(' + _IDENT + r')\s*$')
+
+# After these a '/' starts a regex literal, not a division
+_REGEX_KEYWORDS = frozenset((
+    'return', 'typeof', 'instanceof', 'in', 'of', 'new', 'delete', 'void',
+    'throw', 'case', 'do', 'else', 'yield', 'await',
+))
+
+_DECL = re.compile(r'''
+    (?:\bexport\s+(?:default\s+)?)?
+    (?:
+        (?:\basync\s+)?\bfunction\b\s*\*?\s*(?P<fname>''' + _IDENT + r''')\s*(?=\()
+      | \b(?:const|let|var)\s+(?P<vname>''' + _IDENT + r''')\s*=\s*(?:async\b\s*)?
+        (?:(?P<expr>function\b\s*\*?\s*(?:''' + _IDENT + r'''\s*)?)(?=\()
+          | (?=\()
+          | ''' + _IDENT + r'''\s*(?==>))
+    )''', re.X)
+_DECL_START = re.compile(r'(?<![\w$])(?:export|async|function|const|let|var)\b')
+_WS = re.compile(r'\s*')
+_INLINE_WS = re.compile(r'[ \t]*')
+
+_CACHE = {}
+_CACHE_SIZE = 32
+
+
+class Scan:
+    """Result of one pass: bracket pairs and the spans that are not code."""
+
+    def __init__(self, text):
+        self.text = text
+        self.pairs = {}  # offset of an opening brace -> offset of its match
+        self._skip_starts = []
+        self._skip_ends = []
+        self._scan()
+
+    def in_code(self, pos):
+        """True unless `pos` falls inside a string, comment or regex literal."""
+        i = bisect_right(self._skip_starts, pos) - 1
+        return i < 0 or pos >= self._skip_ends[i]
+
+    def _skip(self, start, end):
+        self._skip_starts.append(start)
+        self._skip_ends.append(end)
+        return end
+
+    def _regex_allowed(self, pos):
+        j = pos - 1
+        text = self.text
+        while j >= 0 and text[j].isspace():
+            j -= 1
+        if j < 0 or text[j] in '(,=:[!&|?{};+-*%<>~^':
+            return True
+        if text[j] in ')]}' or text[j] in '\'"`':
+            return False
+        word = _WORD_BEFORE.search(text, max(0, j - 16), j + 1)
+        return bool(word) and word.group(1) in _REGEX_KEYWORDS
+
+    def _scan(self):
+        text, pairs = self.text, self.pairs
+        stack = []  # offsets of open {; None marks a template ${
+        pos = 0
+        while True:
+            # finditer runs until a template or regex literal moves the
+            # position; it is then restarted from there.
+            for m in _TOKEN.finditer(text, pos):
+                start, end = m.span()
+                c = text[start]
+                if c == '{':
+                    stack.append(start)
+                elif c == '}':
+                    if stack:
+                        at = stack.pop()
+                        if at is None:
+                            # Back inside the template literal this expression belongs to
+                            pos = self._template(start, end, stack)
+                            break
+                        pairs[at] = start
+                elif c == '`':
+                    pos = self._template(start, end, stack)
+                    break
+                elif c == '/' and end - start == 1:
+                    if self._regex_allowed(start):
+                        literal = _REGEX.match(text, end)
+                        if literal:
+                            pos = self._skip(start, literal.end())
+                            break
+                else:
+                    self._skip(start, end)  # string or comment
+            else:
+                return
+
+    def close_paren(self, pos):
+        """Offset of the ) matching the ( at `pos`, or None.
+
+        Parameter lists are short, so they are walked on demand instead of
+        pairing every parenthesis in the file. Templates and regex literals
+        inside default values are not expected there and end the walk.
+        """
+        depth = 0
+        for m in _PAREN_TOKEN.finditer(self.text, pos):
+            c = self.text[m.start()]
+            if c == '(' or c == '{':
+                depth += 1
+            elif c == ')' or c == '}':
+                depth -= 1
+                if depth == 0:
+                    return m.start() if c == ')' else None
+            elif c == '`' or c == '/' and m.end() - m.start() == 1:
+                return None
+        return None
+
+    def _template(self, start, pos, stack):
+        """Skip template text from `pos`; returns where code resumes."""
+        text = self.text
+        end = _TEMPLATE.match(text, pos).end()
+        if text.startswith('${', end):
+            stack.append(None)
+            return self._skip(start, end + 2)
+        return self._skip(start, min(end + 1, len(text)))
+
+
+def _definition(scan, m):
+    """[start, end) of the function whose header `m` matched, or None."""
+    text, pairs = scan.text, scan.pairs
+    pos = m.end()
+    if text.startswith('(', pos):
+        close = scan.close_paren(pos)
+        if close is None:
+            return None
+        pos = close + 1
+    if m.group('vname') and not m.group('expr'):
+        # Arrow function: only block bodies have a well-defined end
+        pos = _WS.match(text, pos).end()
+        if not text.startswith('=>', pos):
+            return None
+        pos += 2
+    pos = _WS.match(text, pos).end()
+    if not text.startswith('{', pos) or pos not in pairs:
+        return None
+    end = pairs[pos] + 1
+    if m.group('vname'):
+        semi = _INLINE_WS.match(text, end).end()
+        if text.startswith(';', semi):
+            end = semi + 1
+    return m.start(), end
+
+
+def build_index(text):
+    """Map function name -> (start, end) character offsets in `text`.
+
+    Nested functions are indexed too; when a name is defined more than once
+    the first definition wins.
+    """
+    scan = Scan(text)
+    index = {}
+    match = _DECL.match
+    pos = 0
+    for hit in _DECL_START.finditer(text):
+        if hit.start() < pos:
+            continue  # inside the header matched just before
+        m = match(text, hit.start())
+        if not m:
+            continue
+        pos = m.end()
+        if not scan.in_code(m.start()):
+            continue
+        name = m.group('fname') or m.group('vname')
+        if name in index:
+            continue
+        span = _definition(scan, m)
+        if span:
+            index[name] = span
+    return index
+
+
+def content_hash(text):
+    return hashlib.sha256(text.encode('utf-8')).hexdigest()
+
+
+def function_index(text, digest=None):
+    """Cached build_index(): one scan per distinct content hash."""
+    digest = digest or content_hash(text)
+    index = _CACHE.get(digest)
+    if index is None:
+        index = remember(digest, build_index(text))
+    return index
+
+
+def clear_cache():
+    _CACHE.clear()
+
+
+def remember(digest, index):
+    """Seed the cache with an index computed earlier (e.g. from a manifest)."""
+    if len(_CACHE) >= _CACHE_SIZE:
+        _CACHE.pop(next(iter(_CACHE)))
+    _CACHE[digest] = {name: tuple(span) for name, span in index.items()}
+    return _CACHE[digest]
+
+
+if __name__ == '__main__':
+    for path in sys.argv[1:] or ['user-flow.js']:
+        with open(path, 'r', encoding='utf-8') as f:
+            source = f.read()
+        print(path)
+        for name, (start, end) in sorted(function_index(source).items(), key=lambda item: item[1]):
+            line = source.count('\n', 0, start) + 1
+            print(f'  {name:<32} line {line:>5}  [{start}, {end})')
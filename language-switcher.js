@@ -1,4 +1,10 @@
-import { translations } from './translations.js';
+import { LOCALE_CHUNKS, FALLBACK_LOCALE, FIRST_PAINT } from './locales.js';
+
+// Strings come in per-locale JSON chunks (build_locales.py splits
+// translations.js): only the active locale is fetched at startup, the others
+// when the language picker is hovered or focused. Until a chunk has arrived,
+// t() answers from FIRST_PAINT, the inlined English strings of the header,
+// hero and step 3 placeholder.
 
 // Language configuration
 const LANGUAGES = {
@@ -9,32 +15,74 @@ const LANGUAGES = {
 const DEFAULT_LANGUAGE = 'en';
 const STORAGE_KEY = 'preferred-language';
 
+const loaded = {};          // lang -> { key: text }
+const loading = new Map();  // lang -> Promise of the chunk
+let applied = 0;            // setLanguage calls so far; a slower, older one doesn't apply
+
+// Fetch (once) the chunk of a locale; a failed fetch can be retried
+function loadLocale(langCode, { priority = 'auto' } = {}) {
+  if (loaded[langCode]) return Promise.resolve(loaded[langCode]);
+  if (!loading.has(langCode)) {
+    const chunk = fetch(LOCALE_CHUNKS[langCode], { priority })
+      .then((resp) => {
+        if (!resp.ok) throw new Error(`${LOCALE_CHUNKS[langCode]}: ${resp.status}`);
+        return resp.json();
+      })
+      .then((strings) => (loaded[langCode] = strings))
+      .finally(() => loading.delete(langCode));
+    loading.set(langCode, chunk);
+  }
+  return loading.get(langCode);
+}
+
+// Warm the chunks of the other locales before a click needs them
+function prefetchLocales() {
+  Object.keys(LOCALE_CHUNKS).forEach((langCode) => {
+    if (langCode !== getCurrentLanguage()) loadLocale(langCode, { priority: 'low' }).catch(() => {});
+  });
+}
+
+// Translated text of `key` in the current language (English, then the key, if missing)
+function t(key) {
+  return loaded[getCurrentLanguage()]?.[key] || loaded[FALLBACK_LOCALE]?.[key] || FIRST_PAINT[key] || key;
+}
+
 // Get current language from localStorage or default
 function getCurrentLanguage() {
   const saved = localStorage.getItem(STORAGE_KEY);
-  return saved && translations[saved] ? saved : DEFAULT_LANGUAGE;
+  return saved && LOCALE_CHUNKS[saved] ? saved : DEFAULT_LANGUAGE;
 }
 
-// Set language and save to localStorage
-function setLanguage(langCode) {
-  if (!translations[langCode]) {
+// Set language and save to localStorage; resolves once its strings are applied
+async function setLanguage(langCode) {
+  if (!LOCALE_CHUNKS[langCode]) {
     console.error(`Language ${langCode} not supported`);
     return;
   }
 
   localStorage.setItem(STORAGE_KEY, langCode);
   document.documentElement.lang = langCode;
-  applyTranslations(langCode);
   updateLanguageButton(langCode);
+  const call = ++applied;
+  let strings;
+  try {
+    strings = await loadLocale(langCode);
+  } catch (e) {
+    console.warn(`[i18n] Failed to load ${langCode} strings:`, e);
+    return;
+  }
+  if (call !== applied) return;
+  applyTranslations(langCode, strings);
+  document.dispatchEvent(new CustomEvent('i18n:applied', { detail: { lang: langCode } }));
 }
 
 // Apply translations to all elements with data-i18n attribute
-function applyTranslations(langCode) {
+function applyTranslations(langCode, strings) {
   const elements = document.querySelectorAll('[data-i18n]');
 
   elements.forEach(element => {
     const key = element.getAttribute('data-i18n');
-    const translation = translations[langCode][key];
+    const translation = strings[key];
 
     if (translation) {
       // Check if element has specific content target
@@ -99,6 +147,10 @@ function initLanguageSwitcher() {
 
     // Make it look clickable
     languageButton.style.cursor = 'pointer';
+
+    // Hover or keyboard focus usually comes a few hundred ms before the click
+    languageButton.addEventListener('pointerenter', prefetchLocales, { once: true });
+    languageButton.addEventListener('focus', prefetchLocales, { once: true });
   } else {
     console.warn('Language button not found');
   }
@@ -112,4 +164,4 @@ if (document.readyState === 'loading') {
 }
 
 // Export for manual use if needed
-export { setLanguage, getCurrentLanguage, toggleLanguage };
+export { setLanguage, getCurrentLanguage, toggleLanguage, t };
@@ -0,0 +1,738 @@
+#!/usr/bin/env python3
+"""Replay the handleGenerate / step3 request sequences for N virtual users
+
+Usage:
+  python loadgen.py --mock --scale 0.05 --users 20          # against mock_backend.py in-process
+  python loadgen.py --base-url http://127.0.0.1:9091 --users 10 --jobs 3
+  python loadgen.py --mock --scale 0.05 --users 20 --upscale --json run.json
+  python loadgen.py --mock --scale 0.05 --upscale --polling fixed   # compare polling strategies
+  python loadgen.py --mock --scale 0.05 --batch 4x3 --batch-concurrency 1,2,4   # batch.html jobs/min
+  python loadgen.py --check-retry --scale 0.05                    # exit 1 unless the staged retry holds
+
+Each virtual user does what user-flow.js handleGenerate does:
+
+  flux        POST /flux/run (main_image, flux_prompt, steps), with the
+              warm-up probe and staged 404/502/503 retries of httpPost
+  half        GET halfImageUrl (or decode halfImageBase64)
+  nano_submit POST /nano/process_async (half_image, ref_images = padded garment, prompt)
+  nano_poll   GET /nano/result until imageBase64 / succeeded / failed
+
+and with --upscale what step3-upscale.js does afterwards:
+
+  upscale_submit POST /upscale/process_async (image, resolution)
+  upscale_poll   GET /upscale/result until done / error
+
+Polling follows pollWithBackoff (fix_polling.py): backoff with jitter,
+wait= long-poll and Retry-After. --polling fixed replays the loops it
+replaced instead (nano every 3 s; step3 sleeps 5 s before each of up to
+120 polls) so both can be compared on the same backend.
+
+Payload sizes follow the browser: the main photo and padded garment are
+--main-kb / --garment-kb, the half image is whatever the backend returned.
+--scale multiplies every client-side wait (poll intervals, probe delays) so
+runs against a scaled mock keep the same proportions.
+
+--batch CxO replays batch-engine.js instead (see BatchLoad): C characters
+times O outfits, first serially as the old one-pair-at-a-time flow, then
+pipelined at each --batch-concurrency nano pool size, reported as jobs/min.
+
+--check-retry drives one user through three cold starts of the mock and
+asserts what httpPost should cost each time: one POST /uploads and a small
+retry for a new image, no upload for an image already staged, and after the
+mock loses its uploads a 409 answered by re-sending the full form.
+
+Reported per stage: p50/p95/p99 latency; per run: requests per completed
+job and the polling overhead (share of requests that are polls and share
+of job time spent waiting in poll loops).
+"""
+
+import argparse
+import asyncio
+import base64
+import hashlib
+import json
+import math
+import os
+import random
+import ssl
+import sys
+import time
+import uuid
+from urllib.parse import quote, urlsplit
+
+STAGES = ['flux', 'half', 'nano_submit', 'nano_poll', 'upscale_submit', 'upscale_poll', 'total']
+POLL_STAGES = ('nano_poll', 'upscale_poll')
+
+# httpPost in sdk/apiClient.js (fix_retry_logic.py)
+COLD_STATUSES = (404, 502, 503)
+MAX_RETRIES = 2
+WARMUP_PATH = '/me'
+WARMUP_TTL = 300.0
+WARMUP_MAX_WAIT = 60.0
+STAGE_MIN_BYTES = 64 * 1024
+
+# POLL_DEFAULTS of pollWithBackoff in sdk/apiClient.js (fix_polling.py)
+POLL_MAX = 5.0
+POLL_FACTOR = 1.6
+POLL_JITTER = 0.2
+POLL_WAIT = 20
+
+
+class HTTPError(Exception):
+    def __init__(self, status, body):
+        super().__init__(f'HTTP {status}: {body[:200]!r}')
+        self.status = status
+
+
+class Client:
+    """Minimal keep-alive HTTP/1.1 client, one connection per origin (like one browser tab)."""
+
+    def __init__(self, stats):
+        self.stats = stats
+        self._conns = {}
+
+    async def close(self):
+        for _, writer in self._conns.values():
+            writer.close()
+            try:
+                await writer.wait_closed()
+            except OSError:
+                pass  # already reset by the server
+        self._conns.clear()
+
+    async def _connection(self, scheme, host, port):
+        key = (scheme, host, port)
+        if key not in self._conns:
+            context = ssl.create_default_context() if scheme == 'https' else None
+            self._conns[key] = await asyncio.open_connection(host, port, ssl=context, limit=2 ** 22)
+        return self._conns[key]
+
+    async def request(self, method, url, body=b'', content_type=None, poll=False):
+        parts = urlsplit(url)
+        port = parts.port or (443 if parts.scheme == 'https' else 80)
+        target = (parts.path or '/') + (f'?{parts.query}' if parts.query else '')
+        head = [f'{method} {target} HTTP/1.1', f'Host: {parts.netloc}', 'Connection: keep-alive',
+                f'Content-Length: {len(body)}']
+        if content_type:
+            head.append(f'Content-Type: {content_type}')
+        data = ('\r\n'.join(head) + '\r\n\r\n').encode('latin-1') + body
+
+        for attempt in range(2):  # a reused connection may have been closed by the server
+            reader, writer = await self._connection(parts.scheme, parts.hostname, port)
+            try:
+                writer.write(data)
+                await writer.drain()
+                status, headers, payload = await _read_response(reader)
+                break
+            except (ConnectionError, asyncio.IncompleteReadError):
+                self._conns.pop((parts.scheme, parts.hostname, port), None)
+                writer.close()
+                if attempt:
+                    raise
+        if headers.get('connection', '').lower() == 'close':
+            self._conns.pop((parts.scheme, parts.hostname, port), None)
+            writer.close()
+
+        self.stats['requests'] += 1
+        self.stats['bytes_out'] += len(data)
+        self.stats['bytes_in'] += len(payload)
+        if poll:
+            self.stats['polls'] += 1
+        return status, headers, payload
+
+
+async def _read_response(reader):
+    line = await reader.readline()
+    if not line:
+        raise ConnectionResetError('connection closed')
+    status = int(line.split()[1])
+    headers = {}
+    while True:
+        line = await reader.readline()
+        if line in (b'\r\n', b'\n', b''):
+            break
+        name, _, value = line.decode('latin-1').partition(':')
+        headers[name.strip().lower()] = value.strip()
+    if headers.get('transfer-encoding', '').lower() == 'chunked':
+        chunks = []
+        while True:
+            size = int((await reader.readline()).split(b';')[0], 16)
+            if not size:
+                await reader.readline()
+                break
+            chunks.append(await reader.readexactly(size))
+            await reader.readexactly(2)
+        return status, headers, b''.join(chunks)
+    return status, headers, await reader.readexactly(int(headers.get('content-length') or 0))
+
+
+def _retry_after(headers):
+    """Retry-After in seconds (delta form only), or None."""
+    try:
+        return max(0.0, float(headers['retry-after']))
+    except (KeyError, ValueError):
+        return None
+
+
+def multipart(fields):
+    """(body, content_type) for a list of (name, value, filename-or-None)."""
+    boundary = '----loadgen' + uuid.uuid4().hex
+    out = []
+    for name, value, filename in fields:
+        disposition = f'form-data; name="{name}"' + (f'; filename="{filename}"' if filename else '')
+        head = f'--{boundary}\r\nContent-Disposition: {disposition}\r\n'
+        if filename:
+            head += 'Content-Type: image/png\r\n'
+        out.append((head + '\r\n').encode('utf-8'))
+        out.append(value if isinstance(value, bytes) else str(value).encode('utf-8'))
+        out.append(b'\r\n')
+    out.append(f'--{boundary}--\r\n'.encode('utf-8'))
+    return b''.join(out), f'multipart/form-data; boundary={boundary}'
+
+
+class VirtualUser:
+    def __init__(self, run, index):
+        self.run = run
+        self.index = index
+        self.client = Client(run.stats)
+        self.alive_at = None
+        self.staged = set()
+        self.staging = True
+
+    async def _wait_for_backend(self):
+        """waitForBackend: probe WARMUP_PATH until it stops answering cold statuses."""
+        scale = self.run.scale
+        deadline = time.monotonic() + WARMUP_MAX_WAIT * scale
+        delay = 1.0
+        while time.monotonic() < deadline:
+            hinted = None
+            try:
+                status, headers, _ = await self.client.request('GET', self.run.base_url + WARMUP_PATH)
+                if status not in COLD_STATUSES:
+                    self.alive_at = time.monotonic()
+                    return True
+                hinted = _retry_after(headers)
+            except (ConnectionError, asyncio.IncompleteReadError):
+                pass
+            self.run.stats['probes'] += 1
+            await asyncio.sleep((hinted or delay) * scale)
+            delay = min(5.0, delay * 1.6)
+        return False
+
+    async def _stage(self, fields):
+        """stageForm: upload large file parts once to /uploads, return fields that reference them."""
+        if not self.staging:
+            return fields
+        staged = []
+        for name, value, filename in fields:
+            if not filename or len(value) < STAGE_MIN_BYTES:
+                staged.append((name, value, filename))
+                continue
+            digest = hashlib.sha256(value).hexdigest()
+            if digest not in self.staged:
+                body, ctype = multipart([('file', value, filename), ('sha256', digest, None)])
+                status, _, _ = await self.client.request('POST', self.run.base_url + '/uploads', body, ctype)
+                if status in (404, 405, 501):
+                    self.staging = False
+                if status >= 400:
+                    return fields
+                self.staged.add(digest)
+            staged.append((name + '_sha256', digest, None))
+        return staged
+
+    async def _json(self, method, path, fields=None, poll=False, retry=False):
+        """httpPost/httpGet: JSON response; POSTs with retry=True warm up, stage and retry like httpPost."""
+        run = self.run
+        url = path if path.startswith('http') else run.base_url + path
+        if retry and (self.alive_at is None or time.monotonic() - self.alive_at > WARMUP_TTL * run.scale):
+            await self._wait_for_backend()
+        sent = fields
+        for retries in range(MAX_RETRIES + 1):
+            body, ctype = multipart(sent) if sent is not None else (b'', None)
+            status, headers, payload = await self.client.request(method, url, body, ctype, poll=poll)
+            if status < 400:
+                if retry:
+                    self.alive_at = time.monotonic()
+                return json.loads(payload or b'{}')
+            if not retry or retries == MAX_RETRIES:
+                break
+            run.stats['retries'] += 1
+            if status == 409 and sent is not fields:
+                self.staged.clear()  # the backend lost a staged upload
+                sent = fields
+                continue
+            if status not in COLD_STATUSES:
+                break
+            await asyncio.sleep((_retry_after(headers) or 0) * run.scale)
+            sent = await self._stage(fields) if await self._wait_for_backend() else fields
+        raise HTTPError(status, payload)
+
+    async def _poll(self, path, done, interval, initial, timeout, message, sleep_first=False, attempts=None):
+        """pollWithBackoff from sdk/apiClient.js, or with --polling fixed the loops it replaced.
+
+        Fixed mode waits `interval` between polls (before each one with
+        sleep_first, like the old step3 pollResult) for at most `attempts`
+        polls; adaptive mode mirrors POLL_DEFAULTS with `initial` as initialMs.
+        """
+        run = self.run
+        adaptive = run.polling == 'adaptive'
+        deadline = time.monotonic() + timeout * run.scale
+        delay, long_poll = initial, None
+        attempt = 0
+        while adaptive or attempts is None or attempt < attempts:
+            attempt += 1
+            if sleep_first and not adaptive:
+                await asyncio.sleep(interval * run.scale)
+            url = run.base_url + path
+            if adaptive and long_poll is not False:
+                url += f'&wait={POLL_WAIT}'
+            status, headers, payload = await self.client.request('GET', url, poll=True)
+            hinted = _retry_after(headers) if adaptive else None
+            if status < 400:
+                j = json.loads(payload or b'{}')
+                if done(j):
+                    return j
+                if adaptive and long_poll is None:
+                    long_poll = 'x-long-poll' in headers
+            elif hinted is None and not (adaptive and status in (429, 503)):
+                raise HTTPError(status, payload)
+            if time.monotonic() > deadline:
+                break
+            if not adaptive:
+                wait = 0 if sleep_first else interval
+            elif hinted is not None:
+                wait = hinted
+            elif long_poll and status < 400:
+                wait = 0
+            else:
+                wait = delay * (1 + POLL_JITTER * (2 * random.random() - 1))
+                delay = min(POLL_MAX, delay * POLL_FACTOR)
+            if wait:
+                await asyncio.sleep(min(wait * run.scale, max(0.0, deadline - time.monotonic())))
+        raise TimeoutError(message)
+
+    async def flux(self, main_image):
+        """runFlux: POST /flux/run; returns the response JSON."""
+        return await self._json('POST', '/flux/run', [('main_image', main_image, 'main.png'),
+                                                      ('flux_prompt', 'remove clothes', None), ('steps', 8, None)],
+                                retry=True)
+
+    async def half_image(self, flux):
+        """Fetch halfImageUrl (or decode halfImageBase64); returns the bytes."""
+        if flux.get('halfImageUrl'):
+            status, _, half = await self.client.request('GET', flux['halfImageUrl'])
+            if status >= 400:
+                raise HTTPError(status, half)
+            return half
+        if flux.get('halfImageBase64'):
+            return base64.b64decode(flux['halfImageBase64'].split(',', 1)[-1])
+        raise RuntimeError('Flux did not return half image')
+
+    async def nano_submit(self, half, garment):
+        """startNanoProcess: POST /nano/process_async; returns the task id."""
+        task = await self._json('POST', '/nano/process_async', [('half_image', half, 'half.png'),
+                                                                ('ref_images', garment, 'ref_1.png'),
+                                                                ('prompt', '', None)], retry=True)
+        return task['task_id']
+
+    async def nano_poll(self, task_id):
+        """pollNanoResult until the result image; returns imageBase64."""
+        def nano_done(j):
+            if j.get('status') in ('failed', 'error'):
+                raise RuntimeError(j.get('error') or 'nano process failed')
+            return bool(j.get('imageBase64') or j.get('status') == 'succeeded')
+
+        j = await self._poll(f"/nano/result?task_id={quote(task_id)}", nano_done,
+                             interval=self.run.nano_interval, initial=0.5, timeout=300, message='nano result timeout')
+        return j['imageBase64']
+
+    async def generate(self):
+        """One handleGenerate (+ optional step3) job; returns {stage: seconds}."""
+        run, times = self.run, {}
+        t0 = time.monotonic()
+
+        start = time.monotonic()
+        flux = await self.flux(run.main_image)
+        times['flux'] = time.monotonic() - start
+
+        start = time.monotonic()
+        half = await self.half_image(flux)
+        times['half'] = time.monotonic() - start
+
+        start = time.monotonic()
+        task_id = await self.nano_submit(half, run.garment)
+        times['nano_submit'] = time.monotonic() - start
+
+        start = time.monotonic()
+        result = await self.nano_poll(task_id)
+        times['nano_poll'] = time.monotonic() - start
+
+        if run.upscale:
+            image = base64.b64decode(result.split(',', 1)[-1]) if result.startswith('data:') else half
+            start = time.monotonic()
+            task = await self._json('POST', '/upscale/process_async', [('image', image, 'final.png'),
+                                                                       ('resolution', '2k', None)])
+            times['upscale_submit'] = time.monotonic() - start
+
+            def upscale_done(j):
+                if j.get('status') == 'error':
+                    raise RuntimeError(j.get('error') or 'Upscale failed')
+                return j.get('status') == 'done'
+
+            start = time.monotonic()
+            await self._poll(f"/upscale/result?task_id={task['task_id']}", upscale_done, interval=run.upscale_interval,
+                             initial=1.0, timeout=600, message='upscale timeout', sleep_first=True, attempts=120)
+            times['upscale_poll'] = time.monotonic() - start
+
+        times['total'] = time.monotonic() - t0
+        return times
+
+    async def loop(self, jobs, delay):
+        await asyncio.sleep(delay)
+        try:
+            for _ in range(jobs):
+                try:
+                    self.run.record(await self.generate())
+                except Exception as e:  # one failed job should not stop the user
+                    self.run.fail(e)
+        finally:
+            await self.client.close()
+
+
+class BatchLoad:
+    """batch-engine.js: character x outfit pairs through bounded flux / nano / upload pools.
+
+    Every pair needs the half image of its character, produced once per
+    character under the flux pool; the Nano submit and poll of a pair run
+    under the nano pool, and both POSTs also take an upload slot. At most
+    flux + nano + 1 pairs are admitted at a time, in order, so Flux for
+    pair N+1 overlaps the Nano wait of pair N. Each pair gets its own
+    connection (VirtualUser); the warm-up state is shared like the SDK's.
+    Padding is client-side CPU only and is not replayed.
+    """
+
+    def __init__(self, run, characters, outfits, flux, nano, uploads):
+        self.run = run
+        self.characters = [os.urandom(len(run.main_image)) for _ in range(characters)]
+        self.outfits = [os.urandom(len(run.garment)) for _ in range(outfits)]
+        self.admit = asyncio.Semaphore(flux + nano + 1)
+        self.flux = asyncio.Semaphore(flux)
+        self.nano = asyncio.Semaphore(nano)
+        self.uploads = asyncio.Semaphore(uploads)
+        self.halves = {}  # character index -> Task[half bytes]
+        self.alive_at = None
+        self.flux_runs = 0
+
+    async def _half(self, user, c, times):
+        async with self.flux:
+            start = time.monotonic()
+            async with self.uploads:
+                flux = await user.flux(self.characters[c])
+            times['flux'] = time.monotonic() - start
+            self.flux_runs += 1
+            start = time.monotonic()
+            half = await user.half_image(flux)
+            times['half'] = time.monotonic() - start
+            return half
+
+    async def item(self, c, o):
+        async with self.admit:
+            user = VirtualUser(self.run, c * len(self.outfits) + o)
+            user.alive_at = self.alive_at
+            times = {}
+            t0 = time.monotonic()
+            try:
+                if c not in self.halves:
+                    self.halves[c] = asyncio.ensure_future(self._half(user, c, times))
+                half = await self.halves[c]
+                async with self.nano:
+                    start = time.monotonic()
+                    async with self.uploads:
+                        task_id = await user.nano_submit(half, self.outfits[o])
+                    times['nano_submit'] = time.monotonic() - start
+                    start = time.monotonic()
+                    await user.nano_poll(task_id)
+                    times['nano_poll'] = time.monotonic() - start
+                times['total'] = time.monotonic() - t0
+                self.run.record(times)
+            except Exception as e:  # one failed pair should not stop the batch
+                if c in self.halves and self.halves[c].done() and self.halves[c].exception():
+                    del self.halves[c]  # a later pair of this character retries Flux
+                self.run.fail(e)
+            finally:
+                self.alive_at = user.alive_at or self.alive_at
+                await user.client.close()
+
+    async def serial(self):
+        """The old flow: every pair end to end, one after the other, no sharing."""
+        user = VirtualUser(self.run, 0)
+        try:
+            for main_image in self.characters:
+                for garment in self.outfits:
+                    self.run.main_image, self.run.garment = main_image, garment
+                    try:
+                        self.run.record(await user.generate())
+                        self.flux_runs += 1
+                    except Exception as e:
+                        self.run.fail(e)
+        finally:
+            await user.client.close()
+
+    async def pipelined(self):
+        await asyncio.gather(*(self.item(c, o) for c in range(len(self.characters))
+                               for o in range(len(self.outfits))))
+
+
+class Run:
+    def __init__(self, args, base_url):
+        self.base_url = base_url.rstrip('/')
+        self.scale = args.scale
+        self.upscale = args.upscale
+        self.polling = args.polling
+        self.nano_interval = args.nano_interval
+        self.upscale_interval = args.upscale_interval
+        self.main_image = os.urandom(args.main_kb * 1024)
+        self.garment = os.urandom(args.garment_kb * 1024)
+        self.stats = {'requests': 0, 'polls': 0, 'retries': 0, 'probes': 0, 'bytes_out': 0, 'bytes_in': 0}
+        self.samples = {stage: [] for stage in STAGES}
+        self.completed = 0
+        self.errors = {}
+
+    def record(self, times):
+        self.completed += 1
+        for stage, seconds in times.items():
+            self.samples[stage].append(seconds)
+
+    def fail(self, error):
+        key = f'{type(error).__name__}: {error}'[:120]
+        self.errors[key] = self.errors.get(key, 0) + 1
+
+    def report(self, wall):
+        stages = {}
+        for stage in STAGES:
+            values = sorted(self.samples[stage])
+            if values:
+                stages[stage] = {'n': len(values), 'p50': _percentile(values, 50), 'p95': _percentile(values, 95),
+                                 'p99': _percentile(values, 99), 'mean': round(sum(values) / len(values), 4)}
+        total = sum(self.samples['total'])
+        poll_time = sum(sum(self.samples[s]) for s in POLL_STAGES)
+        jobs = self.completed or 1
+        return {
+            'wall_seconds': round(wall, 2),
+            'completed': self.completed,
+            'failed': sum(self.errors.values()),
+            'errors': self.errors,
+            'jobs_per_minute': round(self.completed / wall * 60, 2) if wall else None,
+            'requests_per_job': round(self.stats['requests'] / jobs, 2),
+            'polls_per_job': round(self.stats['polls'] / jobs, 2),
+            'poll_request_share': round(self.stats['polls'] / self.stats['requests'], 3) if self.stats['requests'] else None,
+            'poll_time_share': round(poll_time / total, 3) if total else None,
+            'retries': self.stats['retries'],
+            'cold_probes': self.stats['probes'],
+            'mb_out_per_job': round(self.stats['bytes_out'] / jobs / 2 ** 20, 2),
+            'mb_in_per_job': round(self.stats['bytes_in'] / jobs / 2 ** 20, 2),
+            'stages': stages,
+        }
+
+
+def _grid(value):
+    characters, _, outfits = value.lower().partition('x')
+    try:
+        grid = int(characters), int(outfits)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f'expected CxO, e.g. 4x3, not {value!r}')
+    if min(grid) < 1:
+        raise argparse.ArgumentTypeError('both sides of CxO must be at least 1')
+    return grid
+
+
+def _levels(value):
+    try:
+        levels = [int(v) for v in value.split(',') if v.strip()]
+    except ValueError:
+        raise argparse.ArgumentTypeError(f'expected e.g. 1,2,4, not {value!r}')
+    if not levels or min(levels) < 1:
+        raise argparse.ArgumentTypeError('levels must be positive integers')
+    return levels
+
+
+def _percentile(sorted_values, pct):
+    i = min(len(sorted_values) - 1, max(0, math.ceil(pct / 100 * len(sorted_values)) - 1))
+    return round(sorted_values[i], 4)
+
+
+def print_report(report, scale):
+    unit = f' (x{1 / scale:g} = real seconds)' if scale != 1 else ''
+    print(f"completed {report['completed']}  failed {report['failed']}  wall {report['wall_seconds']}s  "
+          f"{report['jobs_per_minute']} jobs/min")
+    print(f"{'stage':<16} {'n':>5} {'p50':>9} {'p95':>9} {'p99':>9}   seconds{unit}")
+    for stage, s in report['stages'].items():
+        print(f"{stage:<16} {s['n']:>5} {s['p50']:>9.3f} {s['p95']:>9.3f} {s['p99']:>9.3f}")
+    print(f"requests/job {report['requests_per_job']}  polls/job {report['polls_per_job']}  "
+          f"poll share: {report['poll_request_share']} of requests, {report['poll_time_share']} of job time  "
+          f"retries {report['retries']}  cold probes {report['cold_probes']}")
+    print(f"MB/job out {report['mb_out_per_job']}  in {report['mb_in_per_job']}")
+    for error, count in report['errors'].items():
+        print(f'  ! {count}x {error}')
+
+
+async def main_async(args):
+    server = None
+    base_url = args.base_url
+    if args.mock:
+        import mock_backend
+        config = dict(mock_backend.DEFAULTS, port=0, scale=args.scale, concurrency=args.mock_concurrency,
+                      image_kb=args.mock_image_kb, long_poll=args.mock_long_poll,
+                      cold_start=args.mock_cold_start, queue_limit=args.mock_queue_limit)
+        _, server = await mock_backend.start(config)
+        base_url = f"http://127.0.0.1:{server.sockets[0].getsockname()[1]}"
+    if not base_url:
+        raise SystemExit('--base-url or --mock is required')
+
+    if args.batch:
+        report = await batch_async(args, base_url)
+    else:
+        run = Run(args, base_url)
+        users = [VirtualUser(run, i) for i in range(args.users)]
+        start = time.monotonic()
+        await asyncio.gather(*(u.loop(args.jobs, args.ramp * i / max(1, args.users)) for i, u in enumerate(users)))
+        report = run.report(time.monotonic() - start)
+    if server:
+        server.close()
+    return report
+
+
+async def check_retry(args):
+    """--check-retry: the httpPost cold-start path against the in-process mock.
+
+    Each scenario puts the mock to sleep right before a POST /flux/run from a
+    user that believes the backend is awake, then compares the mock's
+    counters with what the staged retry should cost. Returns the failures.
+    """
+    import mock_backend
+    config = dict(mock_backend.DEFAULTS, port=0, scale=args.scale, cold_start=5.0, idle_timeout=1e9)
+    backend, server = await mock_backend.start(config)
+    run = Run(args, f"http://127.0.0.1:{server.sockets[0].getsockname()[1]}")
+    user = VirtualUser(run, 0)
+    full = len(multipart([('main_image', run.main_image, 'main.png')])[0])
+    failures = []
+
+    def counts():
+        flux, uploads = backend.stats.get('flux/run', {}), backend.stats.get('uploads', {})
+        return {'uploads': uploads.get('count', 0), 'flux_bytes': flux.get('in_bytes', 0),
+                'conflicts': flux.get('statuses', {}).get('409', 0)}
+
+    async def scenario(label, uploads, conflicts, full_bodies, lose_uploads=False):
+        if lose_uploads:
+            backend.uploads.clear()  # the backend restarted and lost its staged files
+            backend.upload_bytes = 0
+        before = counts()
+        user.alive_at = time.monotonic()
+        backend.awake_at = time.monotonic() + config['cold_start'] * config['scale']
+        try:
+            await user.flux(run.main_image)
+        except Exception as e:
+            failures.append(f'{label}: {type(e).__name__}: {e}')
+            return
+        after = counts()
+        delta = {key: after[key] - before[key] for key in after}
+        sent_full = round(delta['flux_bytes'] / full)
+        if delta['uploads'] != uploads:
+            failures.append(f"{label}: {delta['uploads']} POST /uploads, expected {uploads}")
+        if delta['conflicts'] != conflicts:
+            failures.append(f"{label}: {delta['conflicts']} 409 from /flux/run, expected {conflicts}")
+        if sent_full != full_bodies:
+            failures.append(f'{label}: main_image sent in full {sent_full}x, expected {full_bodies}x')
+        print(f"{label:<34} uploads {delta['uploads']}  409s {delta['conflicts']}  "
+              f"/flux/run in {delta['flux_bytes'] / 2 ** 20:.2f} MB")
+
+    # the cold POST carries the full form; the retry references the staged upload
+    await scenario('cold start, new image', uploads=1, conflicts=0, full_bodies=1)
+    await scenario('cold start, image already staged', uploads=0, conflicts=0, full_bodies=1)
+    await scenario('cold start, staged upload lost', uploads=0, conflicts=1, full_bodies=2, lose_uploads=True)
+    await user.client.close()
+    server.close()
+    return failures
+
+
+async def batch_async(args, base_url):
+    """--batch: the serial flow, then BatchLoad at every --batch-concurrency level."""
+    characters, outfits = args.batch
+    levels = [('serial', None)] + [(f'flux {args.batch_flux} / nano {n}', n) for n in args.batch_concurrency]
+    rows = []
+    for label, nano in levels:
+        run = Run(args, base_url)
+        batch = BatchLoad(run, characters, outfits, args.batch_flux, nano or 1, args.batch_uploads)
+        start = time.monotonic()
+        await (batch.serial() if nano is None else batch.pipelined())
+        report = run.report(time.monotonic() - start)
+        report.update(mode=label, pairs=characters * outfits, flux_runs=batch.flux_runs)
+        rows.append(report)
+    return {'batch': rows}
+
+
+def print_batch_report(report, scale):
+    unit = f'   scaled: wall and job seconds x{1 / scale:g}, jobs/min / {1 / scale:g}' if scale != 1 else ''
+    print(f"{'mode':<22} {'pairs':>5} {'done':>5} {'failed':>6} {'flux':>5} {'wall s':>8} {'jobs/min':>9}"
+          f" {'p50 job s':>10}{unit}")
+    for row in report['batch']:
+        total = row['stages'].get('total', {})
+        print(f"{row['mode']:<22} {row['pairs']:>5} {row['completed']:>5} {row['failed']:>6} {row['flux_runs']:>5} "
+              f"{row['wall_seconds']:>8} {row['jobs_per_minute']:>9} {total.get('p50', 0):>10.3f}")
+        for error, count in row['errors'].items():
+            print(f'  ! {count}x {error}')
+
+
+def main(argv):
+    parser = argparse.ArgumentParser(description='Replay handleGenerate for N virtual users.')
+    parser.add_argument('--base-url', help='backend to load (e.g. http://127.0.0.1:9091)')
+    parser.add_argument('--mock', action='store_true', help='start mock_backend.py in-process instead')
+    parser.add_argument('--mock-concurrency', type=int, default=4, help='GPU slots of the in-process mock')
+    parser.add_argument('--mock-image-kb', type=int, default=1536, help='image size the mock returns')
+    parser.add_argument('--mock-long-poll', type=float, default=25.0, help='long-poll cap of the mock (0 = off)')
+    parser.add_argument('--mock-cold-start', type=float, default=0.0, help='seconds the mock answers 404/502/503')
+    parser.add_argument('--mock-queue-limit', type=int, help='GPU wait queue of the mock before 503s')
+    parser.add_argument('--users', type=int, default=10)
+    parser.add_argument('--jobs', type=int, default=1, help='jobs per user, run back to back')
+    parser.add_argument('--ramp', type=float, default=0.0, help='seconds over which users start')
+    parser.add_argument('--scale', type=float, default=1.0, help='multiply client-side waits (match the mock)')
+    parser.add_argument('--polling', choices=['adaptive', 'fixed'], default='adaptive',
+                        help='pollWithBackoff, or the fixed-interval loops it replaced')
+    parser.add_argument('--nano-interval', type=float, default=3.0, help='fixed pollNanoResult intervalMs / 1000')
+    parser.add_argument('--upscale-interval', type=float, default=5.0, help='fixed step3 poll interval in seconds')
+    parser.add_argument('--upscale', action='store_true', help='also run the step3 upscale sequence')
+    parser.add_argument('--main-kb', type=int, default=2048, help='size of the uploaded main photo')
+    parser.add_argument('--garment-kb', type=int, default=1536, help='size of the padded garment')
+    parser.add_argument('--batch', type=_grid, metavar='CxO',
+                        help='replay batch-engine.js for C characters x O outfits instead of --users')
+    parser.add_argument('--batch-concurrency', type=_levels, default=[1, 2, 4],
+                        help='--batch: comma-separated nano pool sizes to compare (default 1,2,4)')
+    parser.add_argument('--batch-flux', type=int, default=1, help='--batch: flux pool size')
+    parser.add_argument('--batch-uploads', type=int, default=2, help='--batch: upload pool size')
+    parser.add_argument('--json', help='also write the report to this file')
+    parser.add_argument('--check-retry', action='store_true',
+                        help='assert the staged cold-start retry against the in-process mock, then exit')
+    args = parser.parse_args(argv)
+
+    if args.check_retry:
+        failures = asyncio.run(check_retry(args))
+        for failure in failures:
+            print(f'FAIL {failure}', file=sys.stderr)
+        return 1 if failures else 0
+
+    report = asyncio.run(main_async(args))
+    if args.batch:
+        print_batch_report(report, args.scale)
+        ok = all(row['completed'] for row in report['batch'])
+    else:
+        print_report(report, args.scale)
+        ok = bool(report['completed'])
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+            f.write('\n')
+    return 0 if ok else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,32 @@
+// Generated by build_locales.py from translations.js; do not edit.
+// Per-locale chunks (content-hashed) and the English first-paint strings.
+export const LOCALE_CHUNKS = {
+  "en": "/locales/en.88d6c040a9.json",
+  "zh": "/locales/zh.27407fab99.json"
+};
+
+export const FALLBACK_LOCALE = "en";
+
+export const FIRST_PAINT = {
+  "hero.badge": "Fashion · Consistency · One‑click Dressing",
+  "hero.feature1": "⚡ One‑shot dressing",
+  "hero.feature2": "🖼️ Multi‑image support",
+  "hero.feature3": "💬 Natural language",
+  "hero.getStarted": "Get Started",
+  "hero.startEditing": "Start Editing",
+  "hero.subtitle": "DressOn AI delivers stable character identity, refined fabric detail, and natural scene blending. Re‑style any photo with simple text and references.",
+  "hero.title": "EASY outfit swap",
+  "hero.titleLine2": "with ANY two photos.",
+  "hero.viewExamples": "View Examples",
+  "nav.api": "API",
+  "nav.calculator": "Calculator",
+  "nav.credits": "credits",
+  "nav.imageEditor": "Image Editor",
+  "nav.launchNow": "Launch Now",
+  "nav.menu": "Menu",
+  "nav.pricing": "Pricing",
+  "nav.showcase": "Showcase",
+  "nav.signIn": "Sign In",
+  "step3.readyDesc": "Upload image and enhance to high resolution",
+  "step3.readyTitle": "Ready for upscaling"
+};
@@ -0,0 +1,643 @@
+#!/usr/bin/env python3
+"""Local asyncio stand-in for the Flux / Nano / Upscale backend
+
+Usage:
+  python mock_backend.py                                # http://127.0.0.1:9091
+  python mock_backend.py --scale 0.1                    # everything 10x faster
+  python mock_backend.py --cold-start 20 --idle-timeout 300
+  python mock_backend.py --latency nano/job=lognormal:25,0.4 --concurrency 2
+  python mock_backend.py --config backend.json          # same keys as the flags
+
+Implements the endpoints the frontend calls with the same response shapes:
+
+  POST /flux/run              {halfImageUrl} or {halfImageBase64}
+  POST /flux/refine           {imageBase64}
+  POST /nano/process_async    {task_id}
+  GET  /nano/result           {status: queued|running|succeeded|failed, imageBase64}
+  GET  /me                    {user, credits: {balance}}
+  POST /upscale/process_async {task_id}
+  GET  /upscale/result        {status: pending|running|done|error, stage, result_url}
+  POST /batch/start           {job_id}
+  GET  /batch/status          {status, total, done, failed, eta_seconds}
+  POST /uploads               {sha256, bytes}   (file, sha256) staged once for retries
+  GET  /files/<name>.png      generated image bytes
+  GET  /__stats               request counters and latency summaries
+
+Latency is drawn per endpoint from a distribution ("fixed:S", "uniform:A,B",
+"normal:MU,SIGMA", "lognormal:MEDIAN,SIGMA", "exp:MEAN", all in seconds).
+Keys ending in /job are the GPU work behind the async endpoints and run
+inside the --concurrency limit. Cold starts answer 404/502/503 (what
+fix_retry_logic.py retries on) for --cold-start seconds after launch and
+after every --idle-timeout without traffic, like a sleeping Render service;
+they and "GPU queue full" 503s carry a Retry-After header.
+
+Any POST may reference a staged upload with `<field>_sha256=<hash>` in
+place of the file part; unknown hashes answer 409 (what the httpPost of
+fix_retry_logic.py re-sends the full form on).
+
+The two result endpoints long-poll: with ?wait=S (capped at --long-poll)
+an unfinished task is held until its status or stage changes or S seconds
+pass, and the response says so with an X-Long-Poll header (--long-poll 0
+turns this off, like a server that ignores wait=).
+
+Only the standard library is used; the HTTP/1.1 handling covers what fetch()
+and FormData send (Content-Length bodies, keep-alive, CORS preflight).
+"""
+
+import argparse
+import asyncio
+import base64
+import hashlib
+import json
+import math
+import random
+import struct
+import sys
+import time
+import uuid
+import zlib
+from collections import OrderedDict
+from urllib.parse import parse_qs, urlsplit
+
+DEFAULT_LATENCY = {
+    'flux/run': 'lognormal:9,0.35',
+    'flux/refine': 'lognormal:7,0.35',
+    'nano/process_async': 'lognormal:0.8,0.3',
+    'nano/result': 'lognormal:0.12,0.4',
+    'nano/job': 'lognormal:28,0.35',
+    'me': 'lognormal:0.08,0.3',
+    'upscale/process_async': 'lognormal:1.0,0.3',
+    'upscale/result': 'lognormal:0.12,0.4',
+    'upscale/job': 'lognormal:40,0.3',
+    'batch/start': 'fixed:0.2',
+    'batch/status': 'lognormal:0.05,0.3',
+    'batch/item': 'lognormal:35,0.3',
+    'files': 'lognormal:0.15,0.5',
+}
+
+REASONS = {200: 'OK', 204: 'No Content', 400: 'Bad Request', 404: 'Not Found', 405: 'Method Not Allowed',
+           411: 'Length Required', 413: 'Payload Too Large', 500: 'Internal Server Error',
+           502: 'Bad Gateway', 503: 'Service Unavailable'}
+
+
+def parse_distribution(spec):
+    """'lognormal:9,0.35' -> zero-argument sampler returning seconds."""
+    kind, _, args = spec.partition(':')
+    values = [float(v) for v in args.split(',') if v.strip()]
+    samplers = {
+        'fixed': lambda s: s,
+        'uniform': lambda a, b: random.uniform(a, b),
+        'normal': lambda mu, sigma: max(0.0, random.gauss(mu, sigma)),
+        'lognormal': lambda median, sigma: random.lognormvariate(math.log(median), sigma),
+        'exp': lambda mean: random.expovariate(1 / mean),
+    }
+    if kind not in samplers:
+        raise ValueError(f'unknown distribution {spec!r}')
+    sampler = samplers[kind]
+    sampler(*values)  # validate the argument count now, not on first request
+    return lambda: sampler(*values)
+
+
+def make_png(width, height, seed=0):
+    """Noise PNG (incompressible, so its size is about width*height*3)."""
+    rng = random.Random(seed)
+    row = width * 3
+    raw = b''.join(b'\x00' + rng.randbytes(row) for _ in range(height))
+
+    def chunk(tag, data):
+        return struct.pack('>I', len(data)) + tag + data + struct.pack('>I', zlib.crc32(tag + data))
+
+    header = struct.pack('>IIBBBBB', width, height, 8, 2, 0, 0, 0)
+    return b'\x89PNG\r\n\x1a\n' + chunk(b'IHDR', header) + chunk(b'IDAT', zlib.compress(raw, 1)) + chunk(b'IEND', b'')
+
+
+def parse_form(content_type, body):
+    """Text fields of a multipart or urlencoded body.
+
+    File parts are counted as `<name>:bytes`; the last file part's content is
+    kept as `<name>:data` for the endpoints that need it (/uploads).
+    """
+    fields = {}
+    if content_type.startswith('multipart/form-data'):
+        boundary = content_type.split('boundary=', 1)[-1].strip('"').encode()
+        for part in body.split(b'--' + boundary)[1:-1]:
+            head, _, value = part.partition(b'\r\n\r\n')
+            value = value[:-2] if value.endswith(b'\r\n') else value
+            disposition = next((line for line in head.split(b'\r\n') if line.lower().startswith(b'content-disposition')), b'')
+            name = disposition.split(b'name="', 1)[-1].split(b'"', 1)[0].decode('utf-8', 'replace')
+            if b'filename=' in disposition:
+                fields.setdefault(name + ':bytes', 0)
+                fields[name + ':bytes'] += len(value)
+                fields[name + ':data'] = value
+            else:
+                fields[name] = value.decode('utf-8', 'replace')
+    elif content_type.startswith('application/x-www-form-urlencoded'):
+        fields = {k: v[-1] for k, v in parse_qs(body.decode('utf-8', 'replace')).items()}
+    elif content_type.startswith('application/json') and body:
+        try:
+            fields = json.loads(body)
+        except ValueError:
+            pass
+    return fields
+
+
+class Task:
+    def __init__(self, kind):
+        self.id = uuid.uuid4().hex[:16]
+        self.kind = kind
+        self.status = 'queued'
+        self.stage = 'queued'
+        self.error = None
+        self.result = None
+        self.total = self.done = self.failed = 0
+        self.concurrency = 1
+        self.item_seconds = []
+        self.changed = asyncio.Event()
+
+    def update(self, **fields):
+        """Set fields and wake every long poll waiting on this task."""
+        for name, value in fields.items():
+            setattr(self, name, value)
+        self.changed.set()
+        self.changed = asyncio.Event()
+
+
+class Backend:
+    """Request routing, simulated latency, cold starts and the GPU slot pool."""
+
+    def __init__(self, config):
+        self.config = config
+        self.scale = config['scale']
+        self.latency = {key: parse_distribution(spec) for key, spec in {**DEFAULT_LATENCY, **config['latency']}.items()}
+        self.gpu = asyncio.Semaphore(config['concurrency'])
+        self.waiting = 0
+        self.tasks = {}
+        self.started = time.monotonic()
+        self.last_request = self.started
+        self.awake_at = self.started + config['cold_start'] * self.scale
+        self.stats = {}
+        side = max(16, int(math.sqrt(config['image_kb'] * 1024 / 3)))
+        self.image = make_png(side, side)
+        self.image_data_url = 'data:image/png;base64,' + base64.b64encode(self.image).decode('ascii')
+        self.balance = config['credits']
+        self.uploads = OrderedDict()  # sha256 -> bytes, least recently used first
+        self.upload_bytes = 0
+        self.routes = {
+            ('POST', 'flux/run'): self.flux_run,
+            ('POST', 'flux/refine'): self.flux_refine,
+            ('POST', 'nano/process_async'): self.nano_start,
+            ('GET', 'nano/result'): self.nano_result,
+            ('GET', 'me'): self.me,
+            ('POST', 'upscale/process_async'): self.upscale_start,
+            ('GET', 'upscale/result'): self.upscale_result,
+            ('POST', 'batch/start'): self.batch_start,
+            ('GET', 'batch/status'): self.batch_status,
+            ('GET', 'files'): self.files,
+            ('POST', 'uploads'): self.upload,
+        }
+
+    async def delay(self, key):
+        await asyncio.sleep(self.latency[key]() * self.scale)
+
+    def _cold(self, now):
+        """Status code to fail with while the service is (re)starting, else None."""
+        cold = self.config['cold_start'] * self.scale
+        if cold and now - self.last_request > self.config['idle_timeout'] * self.scale:
+            self.awake_at = now + cold  # slept while idle; this request wakes it
+        self.last_request = now
+        if now < self.awake_at:
+            return random.choice(self.config['cold_statuses'])
+        return None
+
+    def _retry_after(self, seconds):
+        """Retry-After in unscaled seconds, so clients can apply their own --scale."""
+        return {'Retry-After': str(max(1, math.ceil(seconds / self.scale if self.scale else seconds)))}
+
+    async def _hold(self, task, query):
+        """Long poll: wait for the task to change, at most ?wait= seconds."""
+        limit = self.config['long_poll']
+        if not limit:
+            return {}
+        try:
+            wait = min(float(query.get('wait') or 0), limit)
+        except ValueError:
+            wait = 0
+        if wait > 0 and task.status in ('queued', 'running'):
+            try:
+                await asyncio.wait_for(task.changed.wait(), wait * self.scale)
+            except asyncio.TimeoutError:
+                pass
+        return {'X-Long-Poll': f'{limit:g}'}
+
+    def record(self, key, status, seconds, request_bytes, response_bytes):
+        entry = self.stats.setdefault(key, {'count': 0, 'statuses': {}, 'seconds': [], 'in_bytes': 0, 'out_bytes': 0})
+        entry['count'] += 1
+        entry['statuses'][str(status)] = entry['statuses'].get(str(status), 0) + 1
+        entry['seconds'].append(seconds)
+        entry['in_bytes'] += request_bytes
+        entry['out_bytes'] += response_bytes
+
+    def summary(self):
+        out = {}
+        for key, entry in sorted(self.stats.items()):
+            seconds = sorted(entry['seconds'])
+            out[key] = {
+                'count': entry['count'],
+                'statuses': entry['statuses'],
+                'in_bytes': entry['in_bytes'],
+                'out_bytes': entry['out_bytes'],
+                'p50': _percentile(seconds, 50),
+                'p95': _percentile(seconds, 95),
+                'p99': _percentile(seconds, 99),
+            }
+        return {'uptime': round(time.monotonic() - self.started, 1), 'gpu_waiting': self.waiting, 'endpoints': out}
+
+    async def gpu_slot(self):
+        """Acquire a GPU slot, or None when the wait queue is full."""
+        limit = self.config['queue_limit']
+        if limit is not None and self.waiting >= limit and self.gpu.locked():
+            return None
+        self.waiting += 1
+        try:
+            await self.gpu.acquire()
+        finally:
+            self.waiting -= 1
+        return self.gpu
+
+    async def handle(self, method, target, headers, body, base_url):
+        """Return (status, payload, content_type[, headers]) for one request."""
+        url = urlsplit(target)
+        path = url.path.rstrip('/') or '/'
+        query = {k: v[-1] for k, v in parse_qs(url.query).items()}
+        key = path.strip('/')
+        if key.startswith('files/'):
+            key = 'files'
+
+        if key == '__stats':
+            return 200, self.summary(), None
+        now = time.monotonic()
+        status = self._cold(now)
+        if status:
+            return status, {'error': 'service starting'}, None, self._retry_after(self.awake_at - now)
+
+        handler = self.routes.get((method, key))
+        if not handler:
+            known = any(k == key for _, k in self.routes)
+            return (405 if known else 404), {'error': f'{method} /{key} not supported'}, None
+        form = parse_form(headers.get('content-type', ''), body) if method == 'POST' else {}
+        for name, digest in list(form.items()):
+            if name.endswith('_sha256') and key != 'uploads':
+                data = self.uploads.get(digest)
+                if data is None:
+                    return 409, {'error': 'unknown upload', 'sha256': digest}, None
+                self.uploads.move_to_end(digest)
+                field = name[:-len('_sha256')]
+                form[field + ':bytes'] = form.get(field + ':bytes', 0) + len(data)
+        return await handler(form=form, query=query, base_url=base_url, path=path)
+
+    async def flux_run(self, form, base_url, **_):
+        if not self.config['flux_urls']:
+            return await self._gpu_call('flux/run', lambda: {'halfImageBase64': self.image_data_url})
+        return await self._gpu_call('flux/run', lambda: {'halfImageUrl': f'{base_url}/files/{uuid.uuid4().hex[:12]}.png'})
+
+    async def flux_refine(self, **_):
+        return await self._gpu_call('flux/refine', lambda: {'imageBase64': self.image_data_url})
+
+    async def _gpu_call(self, key, payload):
+        slot = await self.gpu_slot()
+        if slot is None:
+            return 503, {'error': 'GPU queue full'}, None, self._retry_after(self.latency[key]() * self.scale)
+        try:
+            await self.delay(key)
+        finally:
+            slot.release()
+        return 200, payload(), None
+
+    async def nano_start(self, **_):
+        await self.delay('nano/process_async')
+        task = self._spawn('nano', 'nano/job')
+        return 200, {'task_id': task.id}, None
+
+    async def nano_result(self, query, base_url, **_):
+        await self.delay('nano/result')
+        task = self.tasks.get(query.get('task_id'))
+        if not task or task.kind != 'nano':
+            return 404, {'error': 'task not found'}, None
+        headers = await self._hold(task, query)
+        body = {'status': task.status}
+        if task.status == 'succeeded':
+            body['imageBase64'] = base_url + task.result if self.config['result_urls'] else self.image_data_url
+        elif task.status == 'failed':
+            body['error'] = task.error
+        return 200, body, None, headers
+
+    async def me(self, **_):
+        await self.delay('me')
+        return 200, {'user': {'email': 'loadtest@example.com', 'name': 'Load Test'}, 'credits': {'balance': self.balance}}, None
+
+    async def upscale_start(self, **_):
+        await self.delay('upscale/process_async')
+        task = self._spawn('upscale', 'upscale/job')
+        return 200, {'task_id': task.id}, None
+
+    async def upscale_result(self, query, **_):
+        await self.delay('upscale/result')
+        task = self.tasks.get(query.get('task_id'))
+        if not task or task.kind != 'upscale':
+            return 404, {'error': 'task not found'}, None
+        headers = await self._hold(task, query)
+        status = {'queued': 'pending', 'running': 'running', 'succeeded': 'done', 'failed': 'error'}[task.status]
+        body = {'status': status, 'stage': task.stage}
+        if status == 'done':
+            body['result_url'] = task.result
+        elif status == 'error':
+            body['error'] = task.error
+        return 200, body, None, headers
+
+    async def batch_start(self, form, **_):
+        await self.delay('batch/start')
+        task = Task('batch')
+        task.total = int(form.get('total') or self.config['batch_items'])
+        self.tasks[task.id] = task
+        concurrency = max(1, int(form.get('concurrency') or 1))
+        asyncio.ensure_future(self._run_batch(task, concurrency))
+        return 200, {'job_id': task.id}, None
+
+    async def batch_status(self, query, **_):
+        await self.delay('batch/status')
+        task = self.tasks.get(query.get('job_id'))
+        if not task or task.kind != 'batch':
+            return 404, {'error': 'job not found'}, None
+        remaining = task.total - task.done - task.failed
+        per_item = (sum(task.item_seconds) / len(task.item_seconds)) if task.item_seconds else None
+        eta = round(remaining * per_item / task.concurrency) if per_item else None
+        status = 'done' if not remaining else task.status
+        return 200, {'status': status, 'total': task.total, 'done': task.done, 'failed': task.failed,
+                     'eta_seconds': eta}, None
+
+    async def upload(self, form, **_):
+        data = form.get('file:data')
+        if data is None:
+            return 400, {'error': 'file is required'}, None
+        digest = hashlib.sha256(data).hexdigest()
+        if form.get('sha256') and form['sha256'] != digest:
+            return 400, {'error': 'sha256 mismatch', 'sha256': digest}, None
+        if digest not in self.uploads:
+            self.uploads[digest] = data
+            self.upload_bytes += len(data)
+            while self.upload_bytes > self.config['upload_cache_mb'] * 2 ** 20 and len(self.uploads) > 1:
+                self.upload_bytes -= len(self.uploads.popitem(last=False)[1])
+        self.uploads.move_to_end(digest)
+        return 200, {'sha256': digest, 'bytes': len(data)}, None
+
+    async def files(self, **_):
+        await self.delay('files')
+        return 200, self.image, 'image/png'
+
+    def _spawn(self, kind, job_key):
+        task = Task(kind)
+        self.tasks[task.id] = task
+        asyncio.ensure_future(self._run_job(task, job_key))
+        return task
+
+    async def _run_job(self, task, job_key):
+        slot = await self.gpu_slot()
+        if slot is None:
+            task.update(status='failed', stage='rejected', error='GPU queue full')
+            return
+        try:
+            task.update(status='running', stage='processing')
+            await self.delay(job_key)
+        finally:
+            slot.release()
+        if random.random() < self.config['fail_rate']:
+            task.update(status='failed', stage='failed', error='simulated failure')
+        else:
+            task.update(status='succeeded', stage='done', result=f'/files/{task.id}.png')
+
+    async def _run_batch(self, task, concurrency):
+        task.status = 'running'
+        task.concurrency = concurrency
+        lanes = asyncio.Semaphore(concurrency)
+
+        async def item():
+            async with lanes:
+                slot = await self.gpu_slot()
+                if slot is None:
+                    task.failed += 1
+                    return
+                start = time.monotonic()
+                try:
+                    await self.delay('batch/item')
+                finally:
+                    slot.release()
+                task.item_seconds.append(time.monotonic() - start)
+                if random.random() < self.config['fail_rate']:
+                    task.failed += 1
+                else:
+                    task.done += 1
+
+        await asyncio.gather(*(item() for _ in range(task.total)))
+        task.status = 'done'
+
+
+def _percentile(sorted_values, pct):
+    if not sorted_values:
+        return None
+    i = min(len(sorted_values) - 1, max(0, math.ceil(pct / 100 * len(sorted_values)) - 1))
+    return round(sorted_values[i], 4)
+
+
+async def _read_request(reader, max_body):
+    line = await reader.readline()
+    if not line:
+        return None
+    method, target, _ = line.decode('latin-1').split(' ', 2)
+    headers = {}
+    while True:
+        line = await reader.readline()
+        if line in (b'\r\n', b'\n', b''):
+            break
+        name, _, value = line.decode('latin-1').partition(':')
+        headers[name.strip().lower()] = value.strip()
+    if headers.get('transfer-encoding', '').lower() == 'chunked':
+        return method, target, headers, None
+    length = int(headers.get('content-length') or 0)
+    if length > max_body:
+        return method, target, headers, False
+    body = await reader.readexactly(length) if length else b''
+    return method, target, headers, body
+
+
+def _response(status, payload, content_type, origin, keep_alive, extra=None):
+    if isinstance(payload, (bytes, bytearray)):
+        data = bytes(payload)
+    else:
+        data = json.dumps(payload).encode('utf-8')
+        content_type = 'application/json'
+    head = [
+        f'HTTP/1.1 {status} {REASONS.get(status, "Unknown")}',
+        f'Content-Type: {content_type}',
+        f'Content-Length: {len(data)}',
+        f'Connection: {"keep-alive" if keep_alive else "close"}',
+        'Cache-Control: no-store',
+    ]
+    head += [f'{name}: {value}' for name, value in (extra or {}).items()]
+    if origin:
+        head += [f'Access-Control-Allow-Origin: {origin}', 'Access-Control-Allow-Credentials: true', 'Vary: Origin',
+                 'Access-Control-Expose-Headers: Retry-After, X-Long-Poll']
+    return ('\r\n'.join(head) + '\r\n\r\n').encode('latin-1') + data
+
+
+async def _serve_connection(backend, reader, writer):
+    host, port = writer.get_extra_info('sockname')[:2]
+    try:
+        while True:
+            try:
+                request = await _read_request(reader, backend.config['max_body_mb'] * 2 ** 20)
+            except (asyncio.IncompleteReadError, ConnectionError, ValueError):
+                break
+            if request is None:
+                break
+            method, target, headers, body = request
+            origin = headers.get('origin')
+            keep_alive = headers.get('connection', '').lower() != 'close'
+            base_url = f'http://{headers.get("host") or f"{host}:{port}"}'
+            start = time.monotonic()
+            extra = None
+            if body is None:
+                status, payload, ctype = 411, {'error': 'chunked bodies are not supported'}, None
+                keep_alive = False
+            elif body is False:
+                status, payload, ctype = 413, {'error': 'body too large'}, None
+                keep_alive = False
+            elif method == 'OPTIONS':
+                writer.write((
+                    'HTTP/1.1 204 No Content\r\n'
+                    f'Access-Control-Allow-Origin: {origin or "*"}\r\n'
+                    'Access-Control-Allow-Credentials: true\r\n'
+                    'Access-Control-Allow-Methods: GET, POST, OPTIONS\r\n'
+                    f'Access-Control-Allow-Headers: {headers.get("access-control-request-headers", "content-type")}\r\n'
+                    'Access-Control-Max-Age: 600\r\nContent-Length: 0\r\n\r\n').encode('latin-1'))
+                await writer.drain()
+                continue
+            else:
+                try:
+                    status, payload, ctype, *extra = await backend.handle(method, target, headers, body, base_url)
+                    extra = extra[0] if extra else None
+                except Exception as e:  # keep serving; the client sees a 500 like from the real backend
+                    status, payload, ctype = 500, {'error': f'{type(e).__name__}: {e}'}, None
+            data = _response(status, payload, ctype, origin, keep_alive, extra)
+            writer.write(data)
+            await writer.drain()
+            key = urlsplit(target).path.strip('/')
+            backend.record('files' if key.startswith('files/') else key, status, time.monotonic() - start,
+                            len(body or b''), len(data))
+            if not keep_alive:
+                break
+    finally:
+        writer.close()
+
+
+async def start(config):
+    """Start listening; returns (backend, server). Port 0 picks a free port."""
+    backend = Backend(config)
+    server = await asyncio.start_server(lambda r, w: _serve_connection(backend, r, w),
+                                        config['host'], config['port'], limit=2 ** 20)
+    return backend, server
+
+
+DEFAULTS = {
+    'host': '127.0.0.1',
+    'port': 9091,
+    'scale': 1.0,
+    'latency': {},
+    'concurrency': 4,
+    'queue_limit': None,
+    'cold_start': 0.0,
+    'idle_timeout': 900.0,
+    'cold_statuses': [404, 502, 503],
+    'fail_rate': 0.0,
+    'image_kb': 1536,
+    'flux_urls': True,
+    'result_urls': False,
+    'batch_items': 10,
+    'credits': 100,
+    'max_body_mb': 64,
+    'long_poll': 25.0,
+    'upload_cache_mb': 256,
+}
+
+
+def load_config(argv):
+    parser = argparse.ArgumentParser(description='Local stand-in for the Flux/Nano/Upscale backend.')
+    parser.add_argument('--config', help='JSON file with any of the keys below (flags override it)')
+    parser.add_argument('--host')
+    parser.add_argument('--port', type=int)
+    parser.add_argument('--scale', type=float, help='multiply every latency (0.1 = ten times faster)')
+    parser.add_argument('--latency', action='append', default=[], metavar='KEY=DIST',
+                        help=f'override a distribution; keys: {", ".join(DEFAULT_LATENCY)}')
+    parser.add_argument('--concurrency', type=int, help='GPU slots shared by flux calls and jobs')
+    parser.add_argument('--queue-limit', type=int, help='max requests waiting for a slot before 503')
+    parser.add_argument('--cold-start', type=float, help='seconds of 404/502/503 after launch and idle')
+    parser.add_argument('--idle-timeout', type=float, help='seconds without traffic before sleeping again')
+    parser.add_argument('--cold-statuses', help='comma-separated statuses used while cold')
+    parser.add_argument('--fail-rate', type=float, help='probability that a job fails')
+    parser.add_argument('--image-kb', type=int, help='approximate size of generated images')
+    parser.add_argument('--base64-half', action='store_true', help='flux/run returns halfImageBase64')
+    parser.add_argument('--result-urls', action='store_true', help='nano results carry a URL, not base64')
+    parser.add_argument('--long-poll', type=float, help='max seconds a result poll with ?wait= is held (0 = off)')
+    args = parser.parse_args(argv)
+
+    config = dict(DEFAULTS)
+    if args.config:
+        with open(args.config, 'r', encoding='utf-8') as f:
+            config.update(json.load(f))
+    for key in ('host', 'port', 'scale', 'concurrency', 'queue_limit', 'cold_start', 'idle_timeout',
+                'fail_rate', 'image_kb', 'long_poll'):
+        value = getattr(args, key)
+        if value is not None:
+            config[key] = value
+    if args.cold_statuses:
+        config['cold_statuses'] = [int(s) for s in args.cold_statuses.split(',')]
+    if args.base64_half:
+        config['flux_urls'] = False
+    if args.result_urls:
+        config['result_urls'] = True
+    config['latency'] = dict(config['latency'])
+    for item in args.latency:
+        key, _, spec = item.partition('=')
+        if key not in DEFAULT_LATENCY:
+            parser.error(f'unknown latency key {key!r}')
+        config['latency'][key] = spec
+    for key, spec in config['latency'].items():
+        try:
+            parse_distribution(spec)
+        except (ValueError, TypeError) as e:
+            parser.error(f'bad distribution for {key}: {spec!r} ({e})')
+    return config
+
+
+async def _serve(config, started):
+    backend, server = await start(config)
+    started.append(backend)
+    async with server:
+        await server.serve_forever()
+
+
+def main(argv):
+    config = load_config(argv)
+    print(f"Mock backend on http://{config['host']}:{config['port']} "
+          f"(scale {config['scale']}, {config['concurrency']} GPU slots, cold start {config['cold_start']}s)")
+    started = []
+    try:
+        asyncio.run(_serve(config, started))
+    except KeyboardInterrupt:
+        pass
+    if started:
+        print(json.dumps(started[0].summary(), indent=2))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,281 @@
+#!/usr/bin/env python3
+"""Local asyncio stand-in for the RunPod serverless API behind api/mvp
+
+Usage:
+  python mock_runpod.py                                  # http://127.0.0.1:9092/v2
+  python mock_runpod.py --scale 0.1 --status-latency lognormal:0.3,0.3
+  python mock_runpod.py --verify                         # drive api/mvp/status.js against it
+
+Point the functions at it with
+  RUNPOD_API_BASE=http://127.0.0.1:9092/v2 RUNPOD_ENDPOINT_ID=local RUNPOD_API_KEY=test
+
+Implements what api/mvp/start.js and status.js call:
+
+  POST /v2/<endpoint>/run          {id, status: IN_QUEUE}
+  GET  /v2/<endpoint>/status/<id>  {id, status, delayTime, executionTime, output}
+  GET  /__stats                    upstream call counts and latency summaries
+
+Jobs go IN_QUEUE -> IN_PROGRESS -> COMPLETED (or FAILED with --fail-rate)
+after --queue and --job seconds. Every status call sleeps --status-latency,
+so duplicated upstream polls show up both in the call counts and as latency.
+A missing or wrong bearer token answers 401 like RunPod.
+
+--verify starts the mock on a free port and runs a node script that imports
+status.js with fake req/res objects: --tabs concurrent pollers per job for
+--jobs jobs, single-id and batched. It prints how many upstream status calls
+each mode made per client poll.
+
+Only the standard library is used (plus node for --verify).
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import sys
+import textwrap
+import time
+import uuid
+from urllib.parse import urlsplit
+
+from mock_backend import _percentile, _read_request, _response, parse_distribution
+
+DEFAULTS = {
+    'host': '127.0.0.1',
+    'port': 9092,
+    'scale': 1.0,
+    'api_key': 'test',
+    'queue': 'lognormal:3,0.4',
+    'job': 'lognormal:25,0.35',
+    'status_latency': 'lognormal:0.15,0.4',
+    'fail_rate': 0.0,
+}
+
+TERMINAL = ('COMPLETED', 'FAILED')
+
+
+class RunPod:
+    def __init__(self, config):
+        self.config = config
+        self.scale = config['scale']
+        self.queue = parse_distribution(config['queue'])
+        self.job = parse_distribution(config['job'])
+        self.status_latency = parse_distribution(config['status_latency'])
+        self.jobs = {}
+        self.calls = {'run': 0, 'status': 0}
+        self.status_by_job = {}
+        self.seconds = {'run': [], 'status': []}
+        self.started = time.monotonic()
+
+    def _state(self, job, now):
+        if now < job['queued_until']:
+            return 'IN_QUEUE'
+        if now < job['done_at']:
+            return 'IN_PROGRESS'
+        return job['outcome']
+
+    async def handle(self, method, path, headers, body):
+        if path == '/__stats':
+            return 200, self.summary()
+        if headers.get('authorization') != f"Bearer {self.config['api_key']}":
+            return 401, {'error': 'Unauthorized'}
+        parts = path.strip('/').split('/')
+        if len(parts) < 3 or parts[0] != 'v2':
+            return 404, {'error': 'not found'}
+        now = time.monotonic()
+        if method == 'POST' and parts[2] == 'run' and len(parts) == 3:
+            self.calls['run'] += 1
+            try:
+                payload = json.loads(body or b'{}')
+            except ValueError:
+                return 400, {'error': 'invalid JSON'}
+            job_id = f'{uuid.uuid4()}-u1'
+            queued_until = now + self.queue() * self.scale
+            self.jobs[job_id] = {
+                'input': payload.get('input', {}),
+                'created': now,
+                'queued_until': queued_until,
+                'done_at': queued_until + self.job() * self.scale,
+                'outcome': 'FAILED' if random.random() < self.config['fail_rate'] else 'COMPLETED',
+            }
+            return 200, {'id': job_id, 'status': 'IN_QUEUE'}
+        if method == 'GET' and parts[2] == 'status' and len(parts) == 4:
+            self.calls['status'] += 1
+            job_id = parts[3]
+            self.status_by_job[job_id] = self.status_by_job.get(job_id, 0) + 1
+            await asyncio.sleep(self.status_latency() * self.scale)
+            job = self.jobs.get(job_id)
+            if not job:
+                return 404, {'error': 'job not found'}
+            now = time.monotonic()
+            state = self._state(job, now)
+            out = {'id': job_id, 'status': state, 'delayTime': int((min(now, job['queued_until']) - job['created']) * 1000)}
+            if state in TERMINAL:
+                out['executionTime'] = int((job['done_at'] - job['queued_until']) * 1000)
+                if state == 'COMPLETED':
+                    out['output'] = {'image_url': f'https://example.invalid/{job_id}.png', 'echo': job['input']}
+                else:
+                    out['error'] = 'simulated failure'
+            return 200, out
+        return 405 if parts[2] in ('run', 'status') else 404, {'error': 'not found'}
+
+    def summary(self):
+        polls = sorted(self.status_by_job.values())
+        return {
+            'uptime': round(time.monotonic() - self.started, 1),
+            'calls': dict(self.calls),
+            'jobs': len(self.jobs),
+            'status_calls_per_job_p50': _percentile(polls, 50),
+            'status_calls_per_job_max': polls[-1] if polls else None,
+            'status_p50': _percentile(sorted(self.seconds['status']), 50),
+            'status_p95': _percentile(sorted(self.seconds['status']), 95),
+        }
+
+
+async def _serve_connection(runpod, reader, writer):
+    try:
+        while True:
+            try:
+                request = await _read_request(reader, 8 * 2 ** 20)
+            except (asyncio.IncompleteReadError, ConnectionError, ValueError):
+                break
+            if request is None:
+                break
+            method, target, headers, body = request
+            keep_alive = headers.get('connection', '').lower() != 'close'
+            start = time.monotonic()
+            if body is None or body is False:
+                status, payload = 413, {'error': 'unsupported body'}
+                keep_alive = False
+            else:
+                try:
+                    status, payload = await runpod.handle(method, urlsplit(target).path, headers, body)
+                except Exception as e:  # keep serving; report like an upstream 500
+                    status, payload = 500, {'error': f'{type(e).__name__}: {e}'}
+            writer.write(_response(status, payload, None, None, keep_alive))
+            await writer.drain()
+            kind = 'run' if target.endswith('/run') else 'status' if '/status/' in target else None
+            if kind:
+                runpod.seconds[kind].append(time.monotonic() - start)
+            if not keep_alive:
+                break
+    finally:
+        writer.close()
+
+
+async def start(config):
+    """Start listening; returns (runpod, server). Port 0 picks a free port."""
+    runpod = RunPod(config)
+    server = await asyncio.start_server(lambda r, w: _serve_connection(runpod, r, w), config['host'], config['port'])
+    return runpod, server
+
+
+# Fake Vercel req/res around status.js and start.js; prints one JSON line per mode
+VERIFY_SCRIPT = textwrap.dedent('''
+    const tabs = Number(process.env.VERIFY_TABS), jobs = Number(process.env.VERIFY_JOBS);
+    const interval = Number(process.env.VERIFY_INTERVAL_MS);
+    const { default: start } = await import(process.env.VERIFY_DIR + '/start.js');
+    const { default: status } = await import(process.env.VERIFY_DIR + '/status.js');
+    const call = (handler, req) => new Promise((resolve) => {
+      const res = { headers: {}, code: 200, setHeader(k, v) { this.headers[k] = v; },
+        status(c) { this.code = c; return this; }, json(b) { resolve({ code: this.code, body: b }); } };
+      handler(req, res);
+    });
+    const stats = async () => (await fetch(process.env.VERIFY_BASE + '/__stats')).json();
+    const sleep = (ms) => new Promise((r) => setTimeout(r, ms));
+    for (const mode of ['single', 'batch']) {
+      const ids = [];
+      for (let i = 0; i < jobs; i++) ids.push((await call(start, { method: 'POST', body: { input: { i } } })).body.id);
+      const before = (await stats()).calls.status;
+      let polls = 0;
+      const t0 = Date.now();
+      if (mode === 'single') {
+        // every tab polls its job on its own, like today's frontend
+        await Promise.all(ids.flatMap((id) => Array.from({ length: tabs }, async () => {
+          await sleep(Math.random() * interval);
+          for (;;) {
+            polls++;
+            const r = await call(status, { method: 'GET', query: { id } });
+            if (['COMPLETED', 'FAILED'].includes(r.body.status)) return;
+            await sleep(interval);
+          }
+        })));
+      } else {
+        // every tab polls all jobs in one batched request
+        await Promise.all(Array.from({ length: tabs }, async () => {
+          await sleep(Math.random() * interval);
+          let open = ids;
+          while (open.length) {
+            polls += open.length;
+            const r = await call(status, { method: 'GET', query: { ids: open.join(',') } });
+            open = open.filter((id) => !['COMPLETED', 'FAILED'].includes(r.body.results[id]?.status));
+            if (open.length) await sleep(interval);
+          }
+        }));
+      }
+      const upstream = (await stats()).calls.status - before;
+      console.log(JSON.stringify({ mode, tabs, jobs, client_polls: polls, upstream_status_calls: upstream,
+        upstream_per_poll: +(upstream / polls).toFixed(3), seconds: (Date.now() - t0) / 1000 }));
+    }
+''')
+
+
+async def _verify(config, args):
+    runpod, server = await start(dict(config, port=0))
+    port = server.sockets[0].getsockname()[1]
+    base = f"http://{config['host']}:{port}"
+    env = dict(os.environ, RUNPOD_API_BASE=f'{base}/v2', RUNPOD_ENDPOINT_ID='local', RUNPOD_API_KEY=config['api_key'],
+               VERIFY_BASE=base, VERIFY_DIR=os.path.join(os.path.dirname(os.path.abspath(__file__)), 'api', 'mvp'),
+               VERIFY_TABS=str(args.tabs), VERIFY_JOBS=str(args.jobs),
+               VERIFY_INTERVAL_MS=str(int(args.interval * 1000 * config['scale'])))
+    async with server:
+        proc = await asyncio.create_subprocess_exec('node', '--input-type=module', '-e', VERIFY_SCRIPT, env=env)
+        code = await proc.wait()
+    print(json.dumps(runpod.summary(), indent=2))
+    return code
+
+
+def main(argv):
+    parser = argparse.ArgumentParser(description='Local stand-in for the RunPod /run and /status API.')
+    parser.add_argument('--host', default=DEFAULTS['host'])
+    parser.add_argument('--port', type=int, default=DEFAULTS['port'])
+    parser.add_argument('--scale', type=float, default=DEFAULTS['scale'], help='multiply every latency')
+    parser.add_argument('--api-key', default=DEFAULTS['api_key'])
+    parser.add_argument('--queue', default=DEFAULTS['queue'], help='seconds IN_QUEUE (distribution)')
+    parser.add_argument('--job', default=DEFAULTS['job'], help='seconds IN_PROGRESS (distribution)')
+    parser.add_argument('--status-latency', default=DEFAULTS['status_latency'], help='seconds per status call')
+    parser.add_argument('--fail-rate', type=float, default=DEFAULTS['fail_rate'])
+    parser.add_argument('--verify', action='store_true', help='run status.js against the mock and report')
+    parser.add_argument('--tabs', type=int, default=20, help='--verify: pollers per job')
+    parser.add_argument('--jobs', type=int, default=5, help='--verify: concurrent jobs')
+    parser.add_argument('--interval', type=float, default=1.0, help='--verify: client poll interval in seconds')
+    args = parser.parse_args(argv)
+    config = {key: getattr(args, key) for key in DEFAULTS}
+    for key in ('queue', 'job', 'status_latency'):
+        try:
+            parse_distribution(config[key])
+        except (ValueError, TypeError) as e:
+            parser.error(f'bad distribution for --{key.replace("_", "-")}: {config[key]!r} ({e})')
+
+    if args.verify:
+        return asyncio.run(_verify(config, args))
+
+    async def serve():
+        runpod, server = await start(config)
+        print(f"Mock RunPod on http://{config['host']}:{config['port']}/v2 (scale {config['scale']})")
+        try:
+            async with server:
+                await server.serve_forever()
+        finally:
+            print(json.dumps(runpod.summary(), indent=2))
+
+    try:
+        asyncio.run(serve())
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv[1:]))
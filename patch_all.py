@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+"""Run fix_* patch sets over many targets in parallel
+
+Usage:
+  python patch_all.py fix_console_logging fix_triple_timers -- user-flow.js user-flow.js.bak
+  python patch_all.py fix_downloads -- "*.js.bak" "backup/*.js"
+  python patch_all.py fix_retry_logic            # no globs: use each script's TARGET
+  python patch_all.py --stream fix_downloads -- "dist/assets/*.js"
+
+Patch sets are given by script (module) name and run in the order listed, so
+a later set may patch what an earlier one produced. Every matched file is
+handled by one worker process: read once, every set applied in memory, written
+once via temp file + rename. Manifests are merged and saved by the parent.
+
+--stream forces the mmap mode of patch_engine for every file (it is used
+automatically from STREAM_THRESHOLD upwards); --no-stream disables it.
+"""
+
+import glob
+import importlib
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from patch_engine import ALREADY_APPLIED, ANCHOR_NOT_FOUND, APPLIED, load_manifest, patch_one, save_manifest
+
+
+def _parse_args(argv):
+    patterns = []
+    if '--' in argv:
+        i = argv.index('--')
+        argv, patterns = argv[:i], argv[i + 1:]
+    stream = True if '--stream' in argv else False if '--no-stream' in argv else None
+    return [a for a in argv if a not in ('--stream', '--no-stream')], patterns, stream
+
+
+def _expand(patterns):
+    files = []
+    for pattern in patterns:
+        matches = sorted(glob.glob(pattern, recursive=True)) or ([pattern] if os.path.isfile(pattern) else [])
+        files.extend(m for m in matches if os.path.isfile(m) and m not in files)
+    return files
+
+
+def _work(path, stages, entry, stream):
+    start = time.perf_counter()
+    try:
+        results, new_entry = patch_one(path, stages, entry, stream=stream)
+        error = None
+    except Exception as e:  # report per file, keep the rest of the run going
+        results, new_entry, error = [], entry, f'{type(e).__name__}: {e}'
+    return path, results, new_entry, error, time.perf_counter() - start
+
+
+def run(set_names, patterns, workers=None, stream=None):
+    modules = [importlib.import_module(name) for name in set_names]
+    stages = [tuple(m.PATCHES) for m in modules]
+    files = _expand(patterns or sorted({m.TARGET for m in modules}))
+    if not files:
+        print('No target files matched.')
+        return 1
+
+    manifests = {}
+    for path in files:
+        directory = os.path.dirname(os.path.abspath(path))
+        if directory not in manifests:
+            manifests[directory] = (path, load_manifest(path))
+
+    wall = time.perf_counter()
+    rows = []
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = []
+        for path in files:
+            _, entries = manifests[os.path.dirname(os.path.abspath(path))]
+            futures.append(pool.submit(_work, path, stages, entries.get(os.path.basename(path)), stream))
+        for future in futures:
+            path, results, new_entry, error, seconds = future.result()
+            _, entries = manifests[os.path.dirname(os.path.abspath(path))]
+            if new_entry is not None:
+                entries[os.path.basename(path)] = new_entry
+            rows.append((path, results, error, seconds))
+    wall = time.perf_counter() - wall
+
+    for path, entries in manifests.values():
+        if entries:
+            save_manifest(path, entries)
+
+    _summary(set_names, rows, wall)
+    return 1 if any(error for _, _, error, _ in rows) else 0
+
+
+def _summary(set_names, rows, wall):
+    width = max(len(path) for path, _, _, _ in rows)
+    print(f"Patch sets: {', '.join(set_names)}")
+    print(f"{'file'.ljust(width)}  {'applied':>7}  {'already':>7}  {'missing':>7}  {'ms':>8}")
+    total = 0.0
+    for path, results, error, seconds in rows:
+        total += seconds
+        if error:
+            print(f"{path.ljust(width)}  ERROR {error}")
+            continue
+        statuses = [status for stage in results for status in stage.values()]
+        print(f"{path.ljust(width)}  {statuses.count(APPLIED):>7}  {statuses.count(ALREADY_APPLIED):>7}  "
+              f"{statuses.count(ANCHOR_NOT_FOUND):>7}  {seconds * 1000:>8.1f}")
+    print(f"{len(rows)} file(s), {total * 1000:.1f} ms worker time, {wall * 1000:.1f} ms wall")
+
+    missing = [(path, [name for stage in results for name, status in stage.items() if status == ANCHOR_NOT_FOUND])
+               for path, results, error, _ in rows if not error]
+    missing = [(path, names) for path, names in missing if names]
+    if missing:
+        print('Anchors not found:')
+        for path, names in missing:
+            print(f"  - {path}: {', '.join(names)}")
+
+
+if __name__ == '__main__':
+    set_names, patterns, stream = _parse_args(sys.argv[1:])
+    if not set_names:
+        print(__doc__)
+        sys.exit(2)
+    sys.exit(run(set_names, patterns, stream=stream))
@@ -0,0 +1,654 @@
+#!/usr/bin/env python3
+"""Shared single-pass patch engine for the fix_*.py codemod scripts
+
+Each script registers its patches as a list of Patch objects. All anchors of a
+patch set are compiled into one combined matcher, so a target file is read
+once, scanned once and written once no matter how many patches it carries.
+
+Files of STREAM_THRESHOLD bytes or more (minified dist/ bundles) are not
+loaded at all: they are memory-mapped, anchors are found in the bytes and the
+output is streamed to a temp file, copying unchanged regions straight from
+the mapping.
+
+Applied patches are recorded in a content-hash manifest next to the target
+(.patch-manifest.json), so re-running a script on an unchanged file is a
+stat() call instead of a full rescan.
+
+Patches come in two kinds. Literal patches (see `literal()`) are plain
+JavaScript snippets matched whitespace-tolerantly: a snippet matches wherever
+the target has the same whitespace-separated token stream, so indentation,
+CRLF and runs of spaces don't matter and nothing has to be escaped by hand.
+Function patches (see `replace_function()`) swap a whole named function,
+found through the js_index function-boundary index instead of a text search.
+Regex patches keep the original re-based behaviour; `add_import()` builds
+one that inserts an import line only while the module is not imported yet.
+"""
+
+import hashlib
+import heapq
+import json
+import mmap
+import os
+import re
+import stat
+import tempfile
+from dataclasses import dataclass
+from functools import lru_cache
+
+from js_index import function_index, remember
+
+MANIFEST_NAME = '.patch-manifest.json'
+
+# Files at least this big are patched through mmap + streamed output
+STREAM_THRESHOLD = 32 * 2 ** 20
+
+# Per-patch outcomes reported by patch_file()
+APPLIED = 'applied'
+ALREADY_APPLIED = 'already applied'
+ANCHOR_NOT_FOUND = 'anchor not found'
+
+# Flags we know how to scope into an inline group, e.g. (?s:...)
+_INLINE_FLAGS = ((re.IGNORECASE, 'i'), (re.MULTILINE, 'm'), (re.DOTALL, 's'))
+
+_LEADING_WS = re.compile(r'\s*')
+_IMPORT_FROM = re.compile(r'''\bfrom\s*(['"])(.+?)\1''')
+
+
+@dataclass(frozen=True)
+class Patch:
+    """One named anchor -> replacement rule.
+
+    `pattern` is a regular expression anchor, a plain snippet when `literal`
+    is set, or a function name when `function` is set (`expect` then holds
+    the definition it must currently have, compared whitespace-tolerantly).
+    `replacement` is inserted literally (no backslash or group expansion).
+    Every occurrence is replaced. `present`, when set, is text whose presence
+    in the target means the patch has landed even though `replacement` is
+    not found verbatim (an import that ended up elsewhere in the block).
+    """
+    name: str
+    pattern: str
+    replacement: str
+    flags: int = 0
+    literal: bool = False
+    function: bool = False
+    expect: str = ''
+    present: str = ''
+
+    def __post_init__(self):
+        if self.literal and not self.pattern.split():
+            raise ValueError(f'literal patch {self.name!r} has an empty snippet')
+
+    @property
+    def fingerprint(self):
+        """Short digest of the patch definition; changes when the patch is edited."""
+        kind = 'F' if self.function else 'L' if self.literal else self.flags
+        raw = f'{kind}\0{self.pattern}\0{self.replacement}'
+        if self.expect:
+            raw += f'\0{self.expect}'
+        raw = raw.encode('utf-8')
+        return hashlib.sha256(raw).hexdigest()[:16]
+
+
+def literal(name, snippet, replacement, present=''):
+    """Whitespace-tolerant literal patch: `snippet` is copied verbatim from the JS.
+
+    `present`: text that shows the patch already landed when later edits
+    changed the code around `replacement`.
+    """
+    return Patch(name, snippet, replacement, literal=True, present=present)
+
+
+def replace_function(name, function_name, replacement, expect=''):
+    """Replace the whole definition of `function_name`.
+
+    With `expect` (the old definition, copied verbatim from the JS) the
+    function is only replaced while it still has that body, so a definition
+    rewritten by a later patch is never clobbered.
+    """
+    return Patch(name, function_name, replacement, function=True, expect=expect)
+
+
+def add_import(name, after, statement, unless=()):
+    """Insert the import `statement` on the line after `after` (a whole line).
+
+    Nothing is inserted while one of the imports following
+    `after` already imports the same module, so a second run, or a file that
+    got the import by hand, is left alone and reported as already applied.
+    Modules in `unless` hold the insert back the same way, for a fallback
+    anchor that must not fire when a preferred one further down exists.
+    """
+    source = _IMPORT_FROM.search(statement)
+    modules = '|'.join(re.escape(m) for m in (source.group(2), *unless))
+    # each import is bounded by ; or a newline, so minified input stays linear
+    imported = r'(?:\s*import\b[^;\n]*;?)*?\s*import\b[^;\n]*\bfrom\s*[\'"](?:' + modules + r')[\'"]'
+    return Patch(name, f'{re.escape(after)}(?!{imported})', f'{after}\n{statement}', present=source.group(0))
+
+
+def _group(patch, index):
+    letters = ''.join(letter for flag, letter in _INLINE_FLAGS if patch.flags & flag)
+    body = f'(?{letters}:{patch.pattern})' if letters else f'(?:{patch.pattern})'
+    return f'(?P<p{index}>{body})'
+
+
+@lru_cache(maxsize=None)
+def compile_patches(patches):
+    """Compile a tuple of patches into one alternation.
+
+    Alternatives keep registration order, so when two anchors start at the
+    same position the earlier patch wins, exactly like running the old
+    re.sub chain top to bottom.
+    """
+    return re.compile('|'.join(_group(p, i) for i, p in enumerate(patches)))
+
+
+def _apply_regex(content, patches, counts):
+    def _replace(match):
+        patch = patches[int(match.lastgroup[1:])]
+        counts[patch.name] += 1
+        return patch.replacement
+
+    return compile_patches(patches).sub(_replace, content)
+
+
+def _skip_nonspace(text, pos, k):
+    """Offset just past the k-th non-whitespace character at or after `pos`."""
+    while k > 64:
+        # A slice of k chars holds at most k non-space chars, so this never
+        # overshoots; it just needs more rounds in whitespace-heavy code.
+        seg = text[pos:pos + k]
+        if not seg:
+            break
+        k -= len(''.join(seg.split()))
+        pos += len(seg)
+    while k > 0 and pos < len(text):
+        if not text[pos].isspace():
+            k -= 1
+        pos += 1
+    return pos
+
+
+class _Canonical:
+    """Whitespace-normalized view of a text with a way back to real offsets.
+
+    `canon` is ' '.join(text.split()), the token stream of the text built by
+    C-level str methods. Offsets are mapped back by counting non-whitespace
+    characters from a cursor, so a sequence of increasing lookups costs one
+    pass over the text in total.
+    """
+
+    def __init__(self, text):
+        self.text = text
+        self.canon = ' '.join(text.split())
+        self.rewind()
+
+    def rewind(self):
+        """Restart the cursor so lookups may begin again from offset 0."""
+        self._c = 0
+        self._o = _LEADING_WS.match(self.text).end()
+
+    def to_original(self, c):
+        """Original offset of canonical char `c`; `c` must not be a space and
+        must not be smaller than the previous lookup."""
+        assert c >= self._c
+        need = (c - self._c) - self.canon.count(' ', self._c, c)
+        o = _skip_nonspace(self.text, self._o, need)
+        o = _LEADING_WS.match(self.text, o).end()
+        self._c, self._o = c, o
+        return o
+
+
+def _absorb(text, o0, o1, snippet, floor):
+    """Widen [o0, o1) over whitespace the snippet itself starts/ends with.
+
+    Whitespace is only absorbed up to a line break unless the snippet's own
+    leading/trailing whitespace contains one. `text` may be a str or a bytes
+    buffer (mmap); only single-character slices are taken from it.
+    """
+    nl = '\n' if isinstance(text, str) else b'\n'
+    lead = snippet[:len(snippet) - len(snippet.lstrip())]
+    if lead:
+        stop = floor if '\n' in lead else max(floor, text.rfind(nl, floor, o0) + 1)
+        while o0 > stop and text[o0 - 1:o0].isspace():
+            o0 -= 1
+    trail = snippet[len(snippet.rstrip()):]
+    if trail:
+        n = len(text)
+        while o1 < n and text[o1:o1 + 1].isspace() and (text[o1:o1 + 1] != nl or '\n' in trail):
+            o1 += 1
+    return o0, o1
+
+
+class _Snippet:
+    """Precomputed search data for one literal snippet.
+
+    `key` is the longest token of the snippet (an interior one when there are
+    three or more, since only interior tokens must match whole words). Hits
+    of the key are found with a raw str.find and verified in place: `tail`
+    matches the key and the tokens after it, `head` matches the tokens before
+    it on the reversed text, with whitespace runs between tokens.
+    """
+
+    def __init__(self, snippet):
+        words = snippet.split()
+        pool = range(1, len(words) - 1) if len(words) >= 3 else range(len(words))
+        k = max(pool, key=lambda i: len(words[i]))
+        self.needle = ' '.join(words)
+        self.key = words[k]
+        self.tail = re.compile(r'\s+'.join(re.escape(w) for w in words[k:]))
+        self.head = re.compile(''.join(r'\s+' + re.escape(w[::-1]) for w in reversed(words[:k]))) if k else None
+
+
+@lru_cache(maxsize=None)
+def _snippet(pattern):
+    return _Snippet(pattern)
+
+
+def _key_matches(text, reverse, snip):
+    """Whitespace-tolerant (start, end) offsets of `snip`, found via its key.
+
+    Returns None once the key hits outnumber what a few linear passes over
+    the text would cost (a key that occurs everywhere); the caller then falls
+    back to searching the full token stream.
+    """
+    n = len(text)
+    key, tail, head = snip.key, snip.tail.match, snip.head and snip.head.match
+    budget = 4 * n // len(snip.needle) + 64
+    matches = []
+    h = text.find(key)
+    while h != -1:
+        budget -= 1
+        if budget < 0:
+            return None
+        end = tail(text, h)
+        if end:
+            if not head:
+                matches.append((h, end.end()))
+            else:
+                start = head(reverse, n - h)
+                if start:
+                    matches.append((n - start.end(), end.end()))
+        h = text.find(key, h + 1)
+    return matches
+
+
+def _canonical_matches(view, snip):
+    """(start, end) offsets of `snip` found in the full token stream."""
+    view.rewind()
+    matches = []
+    needle = snip.needle
+    c = view.canon.find(needle)
+    while c != -1:
+        matches.append((view.to_original(c), view.to_original(c + len(needle) - 1) + 1))
+        c = view.canon.find(needle, c + len(needle))
+    return matches
+
+
+def _apply_spans(content, patches, counts, digest=None):
+    view = reverse = None
+    found = []
+    functions = function_index(content, digest) if any(p.function for p in patches) else {}
+    for index, patch in enumerate(patches):
+        if patch.function:
+            span = functions.get(patch.pattern)
+            if not span or content[span[0]:span[1]] == patch.replacement:
+                continue
+            if patch.expect and content[span[0]:span[1]].split() != patch.expect.split():
+                continue
+            found.append((span[0], index, span[1]))
+            continue
+        snip = _snippet(patch.pattern)
+        if snip.head and reverse is None:
+            reverse = content[::-1]
+        matches = _key_matches(content, reverse, snip)
+        if matches is None:
+            view = view or _Canonical(content)
+            matches = _canonical_matches(view, snip)
+        found.extend((o0, index, o1) for o0, o1 in matches)
+    found.sort()
+
+    out, last = [], 0
+    for o0, index, o1 in found:
+        if o0 < last:
+            continue  # overlaps an earlier (or higher-priority) match
+        patch = patches[index]
+        o0, o1 = _absorb(content, o0, o1, patch.pattern, last)
+        out.append(content[last:o0])
+        out.append(patch.replacement)
+        counts[patch.name] += 1
+        last = o1
+    if not out:
+        return content
+    out.append(content[last:])
+    return ''.join(out)
+
+
+def apply_patches(content, patches, digest=None):
+    """Apply every patch to `content` in a single scan.
+
+    Regex patches share one combined scan. Literal patches are located by a
+    str.find of their longest token and verified in place, falling back to
+    one whitespace-normalized copy of the text when a key is too common.
+    Function patches are a lookup in the (cached) function index; `digest`
+    is the sha256 of `content` when the caller already has it. If a set
+    mixes regex with other kinds the regex patches run first. On overlap the
+    match that starts first wins, ties go to the earlier patch.
+
+    Returns (new_content, counts) where counts maps patch name -> number of
+    replacements made.
+    """
+    patches = tuple(patches)
+    counts = dict.fromkeys((p.name for p in patches), 0)
+    regex = tuple(p for p in patches if not (p.literal or p.function))
+    spans = tuple(p for p in patches if p.literal or p.function)
+    if regex:
+        new_content = _apply_regex(content, regex, counts)
+        if new_content != content:
+            content, digest = new_content, None
+    if spans:
+        content = _apply_spans(content, spans, counts, digest)
+    return content, counts
+
+
+@lru_cache(maxsize=None)
+def _bytes_regex(patch, encoding):
+    """Byte-level matcher for stream mode.
+
+    Literal snippets become their escaped tokens joined by \\s+ (ASCII
+    whitespace), so the first token is a literal prefix the re module scans
+    for quickly. Regex patches are compiled from their encoded pattern, which
+    works for anything but non-ASCII character classes.
+    """
+    if patch.literal:
+        return re.compile(rb'\s+'.join(re.escape(w.encode(encoding)) for w in patch.pattern.split()))
+    return re.compile(patch.pattern.encode(encoding), patch.flags)
+
+
+def _edits(buffer, patches, encoding, counts):
+    """Yield non-overlapping (start, end, replacement bytes) in file order.
+
+    Every patch is a lazy finditer over the buffer and the iterators are
+    merged by start offset, so nothing but the current match per patch is
+    held in memory. On overlap the earlier start wins, ties go to the
+    earlier patch (regex and literal patches share this one sweep).
+    """
+    def _spans(index, patch):
+        for m in _bytes_regex(patch, encoding).finditer(buffer):
+            yield m.start(), index, m.end()
+
+    last = 0
+    for o0, index, o1 in heapq.merge(*(_spans(i, p) for i, p in enumerate(patches))):
+        if o0 < last:
+            continue
+        patch = patches[index]
+        if patch.literal:
+            o0, o1 = _absorb(buffer, o0, o1, patch.pattern, last)
+        counts[patch.name] += 1
+        last = o1
+        yield o0, o1, patch.replacement.encode(encoding)
+
+
+class _Mapped:
+    """Read-only mmap of a file (an empty bytes object for an empty file)."""
+
+    def __init__(self, path):
+        self._file = open(path, 'rb')
+        try:
+            size = os.fstat(self._file.fileno()).st_size
+            self.buffer = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ) if size else b''
+        except BaseException:
+            self._file.close()
+            raise
+
+    def __enter__(self):
+        return self.buffer
+
+    def __exit__(self, *exc):
+        if isinstance(self.buffer, mmap.mmap):
+            self.buffer.close()
+        self._file.close()
+
+
+def _file_digest(path):
+    with _Mapped(path) as buffer:
+        return hashlib.sha256(buffer).hexdigest()
+
+
+def _stream_stage(source, path, patches, encoding, recorded):
+    """Patch `source` into a new temp file next to `path`.
+
+    Unchanged regions are written straight from the mapping (memoryview
+    slices, no copies); the temp file is only created once the first match
+    is found. Returns (temp path or None, {name: status}).
+    """
+    counts = dict.fromkeys((p.name for p in patches), 0)
+    tmp = None
+    with _Mapped(source) as buffer, memoryview(buffer) as view:
+        try:
+            last = 0
+            out = None
+            for o0, o1, replacement in _edits(buffer, patches, encoding, counts):
+                if out is None:
+                    fd, tmp = _mkstemp(path)
+                    out = os.fdopen(fd, 'wb')
+                out.write(view[last:o0])
+                out.write(replacement)
+                last = o1
+            if out is not None:
+                with out:
+                    out.write(view[last:])
+                    out.flush()
+                    os.fsync(out.fileno())
+        except BaseException:
+            if tmp:
+                if out is not None:
+                    out.close()
+                os.unlink(tmp)
+            raise
+
+        def contains(text):
+            return buffer.find(text.encode(encoding)) != -1
+
+        results = {p.name: _status(p, counts[p.name], contains, recorded) for p in patches}
+    return tmp, results
+
+
+def _stream_stages(path, stages, encoding, recorded):
+    """Run every stage through mmap + streamed output; returns (results, changed)."""
+    source, results, changed = path, [], False
+    try:
+        for patches in stages:
+            tmp, stage_results = _stream_stage(source, path, patches, encoding, recorded)
+            results.append(stage_results)
+            if tmp:
+                if source != path:
+                    os.unlink(source)
+                source = tmp
+        if source != path:
+            _replace(source, path)
+            source, changed = path, True
+    finally:
+        if source != path:
+            os.unlink(source)
+    return results, changed
+
+
+def _manifest_path(path):
+    return os.path.join(os.path.dirname(os.path.abspath(path)), MANIFEST_NAME)
+
+
+def load_manifest(path):
+    """Return the manifest dict for the directory holding `path` ({} if none)."""
+    try:
+        with open(_manifest_path(path), 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def _mkstemp(path):
+    directory = os.path.dirname(os.path.abspath(path))
+    return tempfile.mkstemp(prefix='.' + os.path.basename(path) + '.', suffix='.tmp', dir=directory)
+
+
+def _replace(tmp, path):
+    """Move a finished temp file over `path`, keeping the original mode."""
+    try:
+        os.chmod(tmp, stat.S_IMODE(os.stat(path).st_mode))
+    except FileNotFoundError:
+        pass
+    os.replace(tmp, path)
+
+
+def atomic_write(path, data):
+    """Write bytes to `path` via a temp file in the same directory + rename.
+
+    A crash mid-write leaves either the old file or the new one, never a
+    truncated mix.
+    """
+    fd, tmp = _mkstemp(path)
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        _replace(tmp, path)
+    except BaseException:
+        try:
+            os.unlink(tmp)
+        except FileNotFoundError:
+            pass
+        raise
+
+
+def save_manifest(path, manifest):
+    data = json.dumps(manifest, indent=2, sort_keys=True) + '\n'
+    atomic_write(_manifest_path(path), data.encode('utf-8'))
+
+
+def _recorded(entry, patches):
+    recorded = entry.get('patches', {}) if entry else {}
+    return all(recorded.get(p.name) == p.fingerprint for p in patches)
+
+
+def _status(patch, count, contains, recorded):
+    if count:
+        return APPLIED
+    if recorded.get(patch.name) == patch.fingerprint:
+        return ALREADY_APPLIED
+    # An anchor that is gone while its replacement is present means the patch
+    # landed earlier (by hand or before the manifest existed).
+    if patch.replacement and contains(patch.replacement):
+        return ALREADY_APPLIED
+    if patch.present and contains(patch.present):
+        return ALREADY_APPLIED
+    return ANCHOR_NOT_FOUND
+
+
+def patch_one(path, stages, entry=None, encoding='utf-8', stream=None):
+    """Apply a sequence of patch sets to one file, reading and writing once.
+
+    Stages run in order on the in-memory text, each in a single scan, so a
+    later set may patch what an earlier one produced. `entry` is this file's
+    current manifest entry (or None). Returns (results, new_entry) where
+    results holds one {name: status} dict per stage; the caller decides
+    whether to persist new_entry. Safe to run in a worker process.
+
+    With `stream` (default: files of STREAM_THRESHOLD bytes or more) the
+    file is memory-mapped and every stage streams into a temp file instead,
+    so peak memory is bounded by the largest replacement rather than the
+    file size. Function patches need the in-memory path.
+    """
+    stages = [tuple(patches) for patches in stages]
+    every = [p for patches in stages for p in patches]
+
+    st = os.stat(path)
+    if (entry and _recorded(entry, every)
+            and entry.get('size') == st.st_size and entry.get('mtime_ns') == st.st_mtime_ns):
+        return [dict.fromkeys((p.name for p in patches), ALREADY_APPLIED) for patches in stages], entry
+
+    has_functions = any(p.function for p in every)
+    if stream is None:
+        stream = st.st_size >= STREAM_THRESHOLD and not has_functions
+    elif stream and has_functions:
+        raise ValueError('function patches need the in-memory path (stream=False)')
+
+    if stream:
+        digest = _file_digest(path)
+    else:
+        with open(path, 'rb') as f:
+            raw = f.read()
+        digest = hashlib.sha256(raw).hexdigest()
+    new_digest = digest
+
+    # Records only count for the exact content they were made against.
+    recorded = dict(entry.get('patches', {})) if entry and entry.get('sha256') == digest else {}
+
+    if recorded and _recorded({'patches': recorded}, every):
+        # Content unchanged, only touched: refresh the stat fields.
+        results = [dict.fromkeys((p.name for p in patches), ALREADY_APPLIED) for patches in stages]
+    elif stream:
+        results, changed = _stream_stages(path, stages, encoding, recorded)
+        if changed:
+            new_digest = _file_digest(path)
+    else:
+        original = content = raw.decode(encoding)
+        functions = entry.get('functions') if entry else None
+        if functions and functions.get('sha256') == digest:
+            remember(digest, functions['names'])
+        results = []
+        content_digest = digest
+        for patches in stages:
+            new_content, counts = apply_patches(content, patches, content_digest)
+            results.append({p.name: _status(p, counts[p.name], content.__contains__, recorded) for p in patches})
+            if new_content != content:
+                content, content_digest = new_content, None
+        if content != original:
+            new_raw = content.encode(encoding)
+            new_digest = hashlib.sha256(new_raw).hexdigest()
+            atomic_write(path, new_raw)
+
+    for patches, stage_results in zip(stages, results):
+        recorded.update((p.name, p.fingerprint) for p in patches if stage_results[p.name] != ANCHOR_NOT_FOUND)
+    st = os.stat(path)
+    new_entry = {
+        'sha256': new_digest,
+        'size': st.st_size,
+        'mtime_ns': st.st_mtime_ns,
+        'patches': recorded,
+    }
+    if has_functions:
+        # Keep the index of what is on disk now, so the next run can reuse it
+        if entry and entry.get('functions', {}).get('sha256') == new_digest:
+            new_entry['functions'] = entry['functions']
+        else:
+            text = raw.decode(encoding) if new_digest == digest else content
+            names = function_index(text, new_digest)
+            new_entry['functions'] = {'sha256': new_digest, 'names': {k: list(v) for k, v in names.items()}}
+    return results, new_entry
+
+
+def patch_file(path, patches, encoding='utf-8', manifest=True, stream=None):
+    """Apply all patches to `path` in one scan and write once if changed.
+
+    Returns a dict mapping patch name -> APPLIED / ALREADY_APPLIED /
+    ANCHOR_NOT_FOUND. With `manifest` enabled, a file whose size and mtime
+    still match the manifest entry and which already has every patch recorded
+    is skipped without being opened. `stream` is passed on to patch_one().
+    """
+    key = os.path.basename(path)
+    entries = load_manifest(path) if manifest else {}
+    entry = entries.get(key)
+
+    (results,), new_entry = patch_one(path, [patches], entry, encoding, stream)
+
+    if manifest and new_entry != entry:
+        entries[key] = new_entry
+        save_manifest(path, entries)
+    return results
+
+
+def report(results):
+    """Print one line per patch with its outcome."""
+    for name, status in results.items():
+        print(f'  - {name}: {status}')
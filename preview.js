@@ -0,0 +1,97 @@
+// Result previews through Blobs and object URLs
+// Results arrive either as http(s) URLs or as (multi-MB) base64 data URLs.
+// A data URL is turned into a Blob once (fetch() decodes it without a canvas
+// round trip) and shown through an object URL, so the first preview no longer
+// waits for a decode/redraw/re-encode of the whole image. Object URLs belong
+// to an element (canvas panel, thumbnail <img>) and are revoked when that
+// element is reset or shows something else. Thumbnails are only encoded for
+// large results shown in small boxes.
+import { preprocess } from './sdk/imagePipeline.js';
+
+const THUMB_MIN_BYTES = 512 * 1024;  // below this the original is a fine thumbnail
+const RECENT_MAX = 4;
+
+const recent = new Map();     // data URL -> Promise<Blob>, most recently used last
+const owned = new WeakMap();  // element -> Set of object URLs it displays
+const tokens = new WeakMap(); // element -> latest request, so stale conversions are dropped
+
+// Blob for a result (Blob or data URL), or null for plain URLs
+export function resultBlob(src) {
+  if (src instanceof Blob) return Promise.resolve(src);
+  if (typeof src !== 'string' || !src.startsWith('data:')) return Promise.resolve(null);
+  let blob = recent.get(src);
+  if (blob) {
+    recent.delete(src);
+  } else {
+    blob = fetch(src).then((resp) => resp.blob());
+    blob.catch(() => recent.delete(src));
+  }
+  recent.set(src, blob);
+  while (recent.size > RECENT_MAX) recent.delete(recent.keys().next().value);
+  return blob;
+}
+
+// True when `src` should go through resultBlob before display
+export function needsBlob(src) {
+  return src instanceof Blob || (typeof src === 'string' && src.startsWith('data:'));
+}
+
+function own(owner, blob) {
+  const url = URL.createObjectURL(blob);
+  if (!owned.has(owner)) owned.set(owner, new Set());
+  owned.get(owner).add(url);
+  return url;
+}
+
+// Revoke every object URL `owner` holds (except `keep`) and cancel pending conversions
+export function releasePreviews(owner, keep = null) {
+  if (!owner) return;
+  tokens.delete(owner);
+  const urls = owned.get(owner);
+  if (!urls) return;
+  urls.forEach((url) => {
+    if (url === keep) return;
+    URL.revokeObjectURL(url);
+    urls.delete(url);
+  });
+}
+
+// True while `owner` still displays object URL `url` (not reset or replaced)
+export function ownsPreview(owner, url) {
+  return !!owned.get(owner)?.has(url);
+}
+
+async function convert(owner, src, toBlob) {
+  const token = {};
+  tokens.set(owner, token);
+  const blob = await toBlob(await resultBlob(src));
+  if (tokens.get(owner) !== token) return null;  // owner was reset or reused meanwhile
+  releasePreviews(owner);
+  return own(owner, blob);
+}
+
+// Full-size preview src owned by `owner`: plain URLs pass through, Blobs and
+// data URLs become object URLs. Resolves null if superseded.
+export async function previewSrc(owner, src) {
+  if (!needsBlob(src)) return src;
+  return await convert(owner, src, (blob) => blob);
+}
+
+// Preview bounded to maxWidth x maxHeight CSS px, encoded in the image worker
+// only when the result is large; plain URLs pass through.
+export async function thumbnailSrc(owner, src, maxWidth, maxHeight) {
+  if (!needsBlob(src)) return src;
+  const dpr = Math.min(2, (typeof devicePixelRatio === 'number' && devicePixelRatio) || 1);
+  return await convert(owner, src, async (blob) => {
+    if (blob.size < THUMB_MIN_BYTES) return blob;
+    try {
+      const thumb = await preprocess('downscale', blob, {
+        maxWidth: Math.round(maxWidth * dpr), maxHeight: Math.round(maxHeight * dpr), quality: 0.85,
+      });
+      return thumb.blob;
+    } catch (e) {
+      console.warn('[preview] Thumbnail failed, using the original:', e);
+      return blob;
+    }
+  });
+}
@@ -0,0 +1,115 @@
+// Persistent store for the latest step results ('step1', 'step2')
+// Results used to be kept as base64 data URLs in localStorage: synchronous
+// multi-MB writes and reads on the main thread, +33% size and the ~5 MB
+// quota. Here each slot holds either the result URL or a Blob in IndexedDB,
+// written asynchronously and read back lazily once the page is idle.
+// Entries older than MAX_AGE_MS are evicted on restore.
+
+const DB_NAME = 'DressOnResults';
+const STORE_NAME = 'results';
+const DB_VERSION = 1;
+const MAX_AGE_MS = 7 * 24 * 60 * 60 * 1000;
+
+// localStorage keys of the old format, migrated once and then removed
+const LEGACY_KEYS = { step1: 'lastFinalImageBase64', step2: 'lastStep2ImageBase64' };
+
+class ResultStore {
+  constructor() {
+    this.db = null;
+    this.ready = null;
+  }
+
+  async init() {
+    return new Promise((resolve, reject) => {
+      const request = indexedDB.open(DB_NAME, DB_VERSION);
+
+      request.onerror = (event) => {
+        console.error('[result store] IndexedDB error:', event.target.error);
+        reject(event.target.error);
+      };
+
+      request.onsuccess = (event) => {
+        this.db = event.target.result;
+        resolve(this.db);
+      };
+
+      request.onupgradeneeded = (event) => {
+        const db = event.target.result;
+        if (!db.objectStoreNames.contains(STORE_NAME)) {
+          db.createObjectStore(STORE_NAME);
+        }
+      };
+    });
+  }
+
+  async open() {
+    if (typeof indexedDB === 'undefined') return null;
+    if (!this.ready) this.ready = this.init().catch(() => null);
+    return await this.ready;
+  }
+
+  async request(mode, fn) {
+    const db = await this.open();
+    if (!db) return null;
+    return new Promise((resolve) => {
+      const transaction = db.transaction([STORE_NAME], mode);
+      const request = fn(transaction.objectStore(STORE_NAME));
+      transaction.oncomplete = () => resolve(request.result ?? null);
+      transaction.onerror = () => resolve(null);
+      transaction.onabort = () => resolve(null);  // e.g. quota exceeded: keep the session copy only
+    });
+  }
+
+  // value: http(s) URL, data: URL or Blob. Data URLs are stored as Blobs.
+  async save(slot, value) {
+    if (!value) return this.remove(slot);
+    let entry;
+    if (value instanceof Blob) {
+      entry = { blob: value };
+    } else if (typeof value === 'string' && value.startsWith('data:')) {
+      entry = { blob: await (await fetch(value)).blob() };
+    } else {
+      entry = { url: String(value) };
+    }
+    entry.savedAt = Date.now();
+    await this.request('readwrite', (store) => store.put(entry, slot));
+  }
+
+  // The stored URL or Blob, or null when missing or expired
+  async load(slot) {
+    const entry = await this.request('readonly', (store) => store.get(slot));
+    if (!entry) return null;
+    if (Date.now() - (entry.savedAt || 0) > MAX_AGE_MS) {
+      await this.remove(slot);
+      return null;
+    }
+    return entry.url || entry.blob || null;
+  }
+
+  async remove(slot) {
+    await this.request('readwrite', (store) => store.delete(slot));
+  }
+
+  // Move results saved by older versions out of localStorage (frees the quota)
+  async migrateLegacy() {
+    if (!(await this.open())) return;  // nowhere to move them to
+    for (const [slot, key] of Object.entries(LEGACY_KEYS)) {
+      let value = null;
+      try { value = localStorage.getItem(key); } catch {}
+      if (!value) continue;
+      await this.save(slot, value);
+      try { localStorage.removeItem(key); } catch {}
+    }
+  }
+}
+
+export const resultStore = new ResultStore();
+
+// Run `fn` after first paint, when the main thread is idle
+export function whenIdle(fn) {
+  const schedule = () => (window.requestIdleCallback
+    ? window.requestIdleCallback(() => fn(), { timeout: 2000 })
+    : setTimeout(fn, 200));
+  if (document.readyState === 'complete') schedule();
+  else window.addEventListener('load', schedule, { once: true });
+}
@@ -5,6 +5,9 @@
 // const { task_id } = await FluxKontext.startNanoProcess(imageBlob, refFiles, prompt);
 // const result = await FluxKontext.pollNanoResult(task_id);
 
+import { preprocess } from './imagePipeline.js';
+import { sha256Hex } from './hash.js';
+
 function resolveEnvBaseUrl() {
   // Support both Next.js (process.env.NEXT_PUBLIC_*) and Vite (import.meta.env.VITE_*) styles
   let envUrl;
@@ -79,10 +82,81 @@ function buildForm(data) {
   return form;
 }
 
-async function httpPost(path, form, retries = 0) {
+// Cold starts (Render sleeps when idle): before a POST to a backend not seen
+// alive within WARMUP.ttlMs, a cheap GET probe waits for it to wake instead
+// of uploading megabytes into a 502. If a POST still fails with 404/502/503
+// or a network error, file parts of STAGE_MIN_BYTES or more go up once to
+// /uploads under their SHA-256 and the retry sends only `<field>_sha256`
+// references. Backends without /uploads get the full form again. A
+// Retry-After on the failed POST is waited out before retrying.
+const WARMUP = { path: '/me', ttlMs: 5 * 60 * 1000, maxWaitMs: 60000 };
+const COLD_STATUSES = [404, 502, 503];
+const STAGE_MIN_BYTES = 64 * 1024;
+const stagedHashes = new Set();
+let stagingSupported = true;
+let lastAliveAt = 0;
+
+async function waitForBackend() {
+  const start = Date.now();
+  let delay = 1000;
+  while (Date.now() - start < WARMUP.maxWaitMs) {
+    let hinted = 0;
+    try {
+      const resp = await fetch(`${DEFAULTS.baseUrl}${WARMUP.path}`, { credentials: 'include' });
+      if (!COLD_STATUSES.includes(resp.status)) {
+        lastAliveAt = Date.now();
+        return true;
+      }
+      hinted = Number(resp.headers.get('retry-after')) * 1000 || 0;
+    } catch {
+      // network error: still waking up
+    }
+    const wait = hinted || delay;
+    console.warn(`[API] backend not ready, probing again in ${(wait/1000).toFixed(1)}s...`);
+    await new Promise(resolve => setTimeout(resolve, wait));
+    delay = Math.min(5000, delay * 1.6);
+  }
+  return false;
+}
+
+async function stageForm(form) {
+  if (!stagingSupported) return form;
+  const staged = new FormData();
+  for (const [key, value] of form.entries()) {
+    if (!(value instanceof Blob) || value.size < STAGE_MIN_BYTES) {
+      staged.append(key, value);
+      continue;
+    }
+    const hash = await sha256Hex(value);
+    if (!hash) return form; // no crypto.subtle: send the form as is
+    if (!stagedHashes.has(hash)) {
+      const upload = new FormData();
+      upload.append('file', value, value.name || 'upload.bin');
+      upload.append('sha256', hash);
+      const resp = await fetch(`${DEFAULTS.baseUrl}/uploads`, { method: 'POST', body: upload, credentials: 'include' });
+      if (resp.status === 404 || resp.status === 405 || resp.status === 501) stagingSupported = false;
+      if (!resp.ok) return form;
+      stagedHashes.add(hash);
+    }
+    staged.append(`${key}_sha256`, hash);
+  }
+  return staged;
+}
+
+async function retryStaged(path, form, retries, retryAfterMs = 0) {
+  if (retryAfterMs) await new Promise(resolve => setTimeout(resolve, retryAfterMs));
+  let body = form;
+  if (await waitForBackend()) {
+    try { body = await stageForm(form); } catch { body = form; }
+  }
+  return httpPost(path, body, retries, form);
+}
+
+async function httpPost(path, form, retries = 0, fullForm = form) {
   const url = `${DEFAULTS.baseUrl}${path}`;
   const MAX_RETRIES = 2;
-  const RETRY_DELAYS = [5000, 10000]; // 5s, 10s
+
+  if (retries === 0 && Date.now() - lastAliveAt > WARMUP.ttlMs) await waitForBackend();
 
   try {
     const resp = await fetch(url, { method: 'POST', body: form, credentials: 'include' });
@@ -90,28 +164,31 @@ async function httpPost(path, form, retries = 0) {
       const text = await resp.text().catch(() => '');
       const status = resp.status;
 
+      // The backend lost a staged upload (e.g. restarted): send everything again
+      if (status === 409 && form !== fullForm && retries < MAX_RETRIES) {
+        stagedHashes.clear();
+        return httpPost(path, fullForm, retries + 1);
+      }
+
       // Retry on cold start errors (404, 502, 503) but not auth errors (401, 403)
-      const shouldRetry = (status === 404 || status === 502 || status === 503) && retries < MAX_RETRIES;
+      const shouldRetry = COLD_STATUSES.includes(status) && retries < MAX_RETRIES;
 
       if (shouldRetry) {
-        const delay = RETRY_DELAYS[retries];
-        console.warn(`[API] ${path} failed with ${status}, retrying in ${delay/1000}s... (${retries + 1}/${MAX_RETRIES})`);
-        await new Promise(resolve => setTimeout(resolve, delay));
-        return httpPost(path, form, retries + 1);
+        console.warn(`[API] ${path} failed with ${status}, waiting for backend... (${retries + 1}/${MAX_RETRIES})`);
+        return retryStaged(path, fullForm, retries + 1, Number(resp.headers.get('retry-after')) * 1000 || 0);
       }
 
       throw new Error(`POST ${path} failed: ${status} ${text}`);
     }
+    lastAliveAt = Date.now();
     const contentType = resp.headers.get('content-type') || '';
     if (contentType.includes('application/json')) return await resp.json();
     return await resp.text();
   } catch (error) {
     // Network errors (fetch failed completely)
     if (error.message && error.message.includes('Failed to fetch') && retries < MAX_RETRIES) {
-      const delay = RETRY_DELAYS[retries];
-      console.warn(`[API] ${path} network error, retrying in ${delay/1000}s... (${retries + 1}/${MAX_RETRIES})`);
-      await new Promise(resolve => setTimeout(resolve, delay));
-      return httpPost(path, form, retries + 1);
+      console.warn(`[API] ${path} network error, waiting for backend... (${retries + 1}/${MAX_RETRIES})`);
+      return retryStaged(path, fullForm, retries + 1);
     }
     throw error;
   }
@@ -127,6 +204,57 @@ async function httpGet(path) {
   return await resp.json();
 }
 
+// Adaptive result polling: check early, then back off (x factor, +/- jitter)
+// up to maxMs. A Retry-After header overrides the next delay. Every request
+// carries wait=<waitSec>; a server that long-polls holds the answer until the
+// task changes and says so with X-Long-Poll, after which we re-poll at once.
+// Servers that ignore wait= just get the backoff schedule. Cross-origin
+// backends must list Retry-After and X-Long-Poll in Access-Control-Expose-Headers.
+const POLL_DEFAULTS = {
+  initialMs: 500, maxMs: 5000, factor: 1.6, jitter: 0.2, waitSec: 20,
+  timeoutMs: 300000, maxAttempts: Infinity, timeoutMessage: 'poll timeout',
+};
+
+function retryAfterMs(resp) {
+  const value = resp.headers.get('retry-after');
+  if (!value) return null;
+  const seconds = Number(value);
+  if (Number.isFinite(seconds)) return Math.max(0, seconds * 1000);
+  const date = Date.parse(value);
+  return Number.isNaN(date) ? null : Math.max(0, date - Date.now());
+}
+
+export async function pollWithBackoff(url, isDone, options = {}) {
+  const opts = { ...POLL_DEFAULTS, ...options };
+  const start = Date.now();
+  let delay = opts.initialMs;
+  let longPoll = opts.waitSec > 0 ? undefined : false;  // undefined: not known yet
+  for (let attempt = 0; attempt < opts.maxAttempts; attempt++) {
+    const target = longPoll === false ? url : `${url}${url.includes('?') ? '&' : '?'}wait=${opts.waitSec}`;
+    const resp = await fetch(target, opts.fetchOptions);
+    const hinted = retryAfterMs(resp);
+    if (resp.ok) {
+      const j = await resp.json();
+      if (typeof opts.onProgress === 'function') {
+        try { opts.onProgress(j, attempt); } catch {}
+      }
+      if (isDone(j)) return j;  // may throw for failed tasks
+      if (longPoll === undefined) longPoll = resp.headers.has('x-long-poll');
+    } else if (!(hinted !== null || resp.status === 429 || resp.status === 503)) {
+      const text = await resp.text().catch(() => '');
+      throw new Error(`Poll failed: ${resp.status} ${text}`);
+    }
+    if (Date.now() - start > opts.timeoutMs) break;
+    let wait = hinted;
+    if (wait === null && !(longPoll && resp.ok)) {
+      wait = delay * (1 + opts.jitter * (2 * Math.random() - 1));
+      delay = Math.min(opts.maxMs, delay * opts.factor);
+    }
+    if (wait) await new Promise(r => setTimeout(r, Math.min(wait, Math.max(0, opts.timeoutMs - (Date.now() - start)))));
+  }
+  throw new Error(opts.timeoutMessage);
+}
+
 export const FluxKontext = {
   setBaseUrl(url) {
     assert(typeof url === 'string' && url.length > 0, 'Invalid baseUrl');
@@ -316,51 +444,28 @@ export const FluxKontext = {
     return await httpPost('/nano/process_async', form);
   },
 
-  async pollNanoResult(taskId, onProgress, { intervalMs = 3000, timeoutMs = 300000 } = {}) {
+  async pollNanoResult(taskId, onProgress, { intervalMs, timeoutMs = 300000, ...backoff } = {}) {
     assert(taskId, 'taskId is required');
-    const start = Date.now();
-    while (true) {
-      const j = await httpGet(`/nano/result?task_id=${encodeURIComponent(taskId)}`);
-      if (typeof onProgress === 'function') {
-        try { onProgress(j); } catch {}
-      }
-      if (j && (j.imageBase64 || j.status === 'succeeded')) return j;
+    const fixed = intervalMs ? { initialMs: intervalMs, maxMs: intervalMs, jitter: 0 } : {};
+    return await pollWithBackoff(`${DEFAULTS.baseUrl}/nano/result?task_id=${encodeURIComponent(taskId)}`, (j) => {
+      if (j && (j.imageBase64 || j.status === 'succeeded')) return true;
       if (j && (j.status === 'failed' || j.status === 'error')) {
         const err = new Error(j.error || 'nano process failed');
         if (j.debug !== undefined) err.debug = j.debug;
         throw err;
       }
-      if (Date.now() - start > timeoutMs) throw new Error('nano result timeout');
-      await new Promise(r => setTimeout(r, intervalMs));
-    }
+      return false;
+    }, {
+      ...backoff, ...fixed, timeoutMs, onProgress,
+      timeoutMessage: 'nano result timeout',
+      fetchOptions: { credentials: 'include' },
+    });
   },
 
   async resizeImageWithPadding(file, targetWidth, targetHeight, background = '#ffffff') {
-    const imgUrl = URL.createObjectURL(file);
-    try {
-      const img = await new Promise((resolve, reject) => {
-        const el = new Image();
-        el.onload = () => resolve(el);
-        el.onerror = reject;
-        el.src = imgUrl;
-      });
-      const canvas = document.createElement('canvas');
-      canvas.width = targetWidth;
-      canvas.height = targetHeight;
-      const ctx = canvas.getContext('2d');
-      ctx.fillStyle = background;
-      ctx.fillRect(0, 0, targetWidth, targetHeight);
-      const scale = Math.min(targetWidth / img.width, targetHeight / img.height);
-      const dw = Math.round(img.width * scale);
-      const dh = Math.round(img.height * scale);
-      const dx = Math.floor((targetWidth - dw) / 2);
-      const dy = Math.floor((targetHeight - dh) / 2);
-      ctx.drawImage(img, dx, dy, dw, dh);
-      const blob = await new Promise(resolve => canvas.toBlob(resolve, 'image/png'));
-      return blob;
-    } finally {
-      URL.revokeObjectURL(imgUrl);
-    }
+    // decode / scale / encode in the preprocessing worker (imagePipeline.js)
+    const { blob } = await preprocess('pad', file, { width: targetWidth, height: targetHeight, background });
+    return blob;
   },
 };
 
@@ -0,0 +1,17 @@
+// Content hashing shared by the SDK (staged uploads) and the app (image-cache.js)
+// sha256Hex(blob) resolves with the lowercase hex SHA-256 of the bytes, or
+// null without crypto.subtle (plain http, old browsers) or when hashing fails.
+
+// Hashing a multi-MB photo takes tens of ms; remember it per File object
+const hashes = new WeakMap();
+
+export async function sha256Hex(blob) {
+  if (!blob || typeof crypto === 'undefined' || !crypto.subtle) return null;
+  if (!hashes.has(blob)) {
+    hashes.set(blob, (async () => {
+      const digest = await crypto.subtle.digest('SHA-256', await blob.arrayBuffer());
+      return Array.from(new Uint8Array(digest), b => b.toString(16).padStart(2, '0')).join('');
+    })().catch(() => null));
+  }
+  return hashes.get(blob);
+}
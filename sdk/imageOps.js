@@ -0,0 +1,113 @@
+// Image preprocessing operations shared by the worker (imageWorker.js) and
+// the main-thread fallback in imagePipeline.js. Input is a Blob/File; every
+// operation decodes once with createImageBitmap, scales while drawing and
+// encodes with convertToBlob / toBlob, so results are Blobs and nothing is
+// base64-encoded.
+
+function makeCanvas(width, height) {
+  if (typeof OffscreenCanvas !== 'undefined') return new OffscreenCanvas(width, height);
+  const canvas = document.createElement('canvas');
+  canvas.width = width;
+  canvas.height = height;
+  return canvas;
+}
+
+async function encode(canvas, type, quality) {
+  if (canvas.convertToBlob) return await canvas.convertToBlob({ type, quality });
+  return await new Promise((resolve, reject) => canvas.toBlob(
+    (blob) => (blob ? resolve(blob) : reject(new Error('canvas encode failed'))), type, quality));
+}
+
+async function decode(blob) {
+  if (typeof createImageBitmap === 'function') return await createImageBitmap(blob);
+  // Old browsers (main thread only): <img> decode, scaled at draw time
+  const url = URL.createObjectURL(blob);
+  try {
+    const img = new Image();
+    img.src = url;
+    await img.decode();
+    return img;
+  } finally {
+    URL.revokeObjectURL(url);
+  }
+}
+
+function release(image) {
+  if (image && typeof image.close === 'function') image.close();
+}
+
+function sizeOf(image) {
+  return { width: image.naturalWidth || image.width, height: image.naturalHeight || image.height };
+}
+
+// Decode once, hand the bitmap and its size to `fn`, always release it
+async function withImage(blob, fn) {
+  const image = await decode(blob);
+  try {
+    return await fn(image, sizeOf(image));
+  } finally {
+    release(image);
+  }
+}
+
+// Draw `image` scaled to (w, h) at (x, y) on a canvasW x canvasH canvas and encode it
+async function render(image, { canvasW, canvasH, x = 0, y = 0, w = canvasW, h = canvasH, background, type, quality }) {
+  const canvas = makeCanvas(canvasW, canvasH);
+  const ctx = canvas.getContext('2d');
+  if (background) {
+    ctx.fillStyle = background;
+    ctx.fillRect(0, 0, canvasW, canvasH);
+  }
+  ctx.imageSmoothingEnabled = true;
+  ctx.imageSmoothingQuality = 'high';
+  ctx.drawImage(image, x, y, w, h);
+  return await encode(canvas, type, quality);
+}
+
+export const ops = {
+  async probe(blob) {
+    return await withImage(blob, (image, size) => size);
+  },
+
+  // Scale down to at most targetPixels (compressImage / showcase resizeImage)
+  async resize(blob, { targetPixels = 1024 * 1024, type = 'image/jpeg', quality = 0.85 } = {}) {
+    return await withImage(blob, async (image, { width, height }) => {
+      let w = width;
+      let h = height;
+      if (width * height > targetPixels) {
+        const ratio = Math.sqrt(targetPixels / (width * height));
+        w = Math.floor(width * ratio);
+        h = Math.floor(height * ratio);
+      }
+      return { blob: await render(image, { canvasW: w, canvasH: h, type, quality }), width: w, height: h };
+    });
+  },
+
+  // Letterbox into width x height (FluxKontext.resizeImageWithPadding)
+  async pad(blob, { width, height, background = '#ffffff', type = 'image/png', quality } = {}) {
+    return await withImage(blob, async (image, src) => {
+      const scale = Math.min(width / src.width, height / src.height);
+      const w = Math.round(src.width * scale);
+      const h = Math.round(src.height * scale);
+      const x = Math.floor((width - w) / 2);
+      const y = Math.floor((height - h) / 2);
+      const out = await render(image, { canvasW: width, canvasH: height, x, y, w, h, background, type, quality });
+      return { blob: out, width, height };
+    });
+  },
+
+  // Fit inside maxWidth x maxHeight, never upscaling (preview thumbnails)
+  async downscale(blob, { maxWidth, maxHeight, type = 'image/jpeg', quality = 0.9 } = {}) {
+    return await withImage(blob, async (image, src) => {
+      const scale = Math.min(maxWidth / src.width, maxHeight / src.height, 1);
+      const w = Math.max(1, Math.floor(src.width * scale));
+      const h = Math.max(1, Math.floor(src.height * scale));
+      return { blob: await render(image, { canvasW: w, canvasH: h, type, quality }), width: w, height: h };
+    });
+  },
+};
+
+export async function runOp(op, blob, options) {
+  if (!ops[op]) throw new Error(`Unknown image op: ${op}`);
+  return await ops[op](blob, options);
+}
@@ -0,0 +1,74 @@
+// Main-thread entry point for image preprocessing
+// preprocess(op, blob, options) runs an imageOps operation in a shared
+// module Web Worker (createImageBitmap + OffscreenCanvas) and resolves with
+// { blob, width, height }. Browsers without module workers or OffscreenCanvas
+// run the same code on the main thread; a failing worker job is retried there.
+import { runOp } from './imageOps.js';
+
+let worker = null;       // null: not started yet, false: unavailable
+let nextId = 0;
+const pending = new Map();
+
+function workerSupported() {
+  return typeof Worker !== 'undefined'
+    && typeof OffscreenCanvas !== 'undefined'
+    && typeof createImageBitmap === 'function';
+}
+
+function failAll(error) {
+  pending.forEach(({ reject }) => reject(error));
+  pending.clear();
+}
+
+function getWorker() {
+  if (worker !== null) return worker;
+  if (!workerSupported()) return (worker = false);
+  try {
+    worker = new Worker(new URL('./imageWorker.js', import.meta.url), { type: 'module' });
+  } catch (e) {
+    console.warn('[image] Worker unavailable, preprocessing on main thread:', e);
+    return (worker = false);
+  }
+  worker.onmessage = (event) => {
+    const { id, result, error } = event.data || {};
+    const job = pending.get(id);
+    if (!job) return;
+    pending.delete(id);
+    if (error) job.reject(new Error(error));
+    else job.resolve(result);
+  };
+  worker.onerror = (event) => {
+    // The worker script itself failed (e.g. module workers unsupported): stop using it
+    console.warn('[image] Worker error, preprocessing on main thread:', event.message || event);
+    worker.terminate();
+    worker = false;
+    failAll(new Error('image worker failed'));
+  };
+  return worker;
+}
+
+export async function preprocess(op, blob, options = {}) {
+  const w = getWorker();
+  if (w) {
+    try {
+      return await new Promise((resolve, reject) => {
+        const id = ++nextId;
+        pending.set(id, { resolve, reject });
+        w.postMessage({ id, op, blob, options });
+      });
+    } catch (e) {
+      console.warn(`[image] ${op} failed in worker, retrying on main thread:`, e);
+    }
+  }
+  return await runOp(op, blob, options);
+}
+
+// Blob -> data URL, for the few callers that still persist strings
+export function blobToDataURL(blob) {
+  return new Promise((resolve, reject) => {
+    const reader = new FileReader();
+    reader.onload = () => resolve(reader.result);
+    reader.onerror = () => reject(reader.error);
+    reader.readAsDataURL(blob);
+  });
+}
@@ -0,0 +1,12 @@
+// Web Worker running imageOps off the main thread (see imagePipeline.js)
+import { runOp } from './imageOps.js';
+
+self.onmessage = async (event) => {
+  const { id, op, blob, options } = event.data || {};
+  try {
+    const result = await runOp(op, blob, options);
+    self.postMessage({ id, result });
+  } catch (error) {
+    self.postMessage({ id, error: String(error?.message || error) });
+  }
+};
@@ -7,5 +7,7 @@ export const SHOWCASE_CONFIG = {
   SHOW_SAVE_BUTTON: false, // Toggle to show/hide Save export buttons
   MAX_FILE_SIZE: 10 * 1024 * 1024, // 10MB max file size
   ALLOWED_TYPES: ['image/jpeg', 'image/png', 'image/webp', 'image/jpg'],
-  SAVE_DIRECTORY: './assets/showcase/' // Directory to save uploaded images
+  SAVE_DIRECTORY: './assets/showcase/', // Directory to save uploaded images
+  IMAGE_MANIFEST_URL: '/img/manifest.json', // AVIF/WebP srcsets from build_images.py (optional)
+  DEFAULT_IMAGE_DIR: 'public/showcase/' // Manifest key prefix of the default images (served at /showcase/)
 };
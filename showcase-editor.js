@@ -3,6 +3,19 @@
 // Uses IndexedDB for storage to bypass LocalStorage 5MB limit
 
 import { SHOWCASE_CONFIG } from './showcase-config.js';
+import { preprocess, blobToDataURL } from './sdk/imagePipeline.js';
+
+// Responsive variants of the default images (build_images.py); null when the
+// build step has not run, and the original JPEGs are used as before
+let imageManifest = null;
+function loadImageManifest() {
+  if (!imageManifest) {
+    imageManifest = fetch(SHOWCASE_CONFIG.IMAGE_MANIFEST_URL)
+      .then((resp) => (resp.ok ? resp.json() : null))
+      .catch(() => null);
+  }
+  return imageManifest;
+}
 
 // Simple IndexedDB wrapper
 const DB_NAME = 'DressOnShowcaseDB';
@@ -340,6 +353,7 @@ class ShowcaseEditor {
       'arctic-aura': 4
     };
     const ROLE_NAMES = ['Character & Pose', 'Outfit Reference', 'Final Result'];
+    const manifest = await loadImageManifest();
     
     let loadedCount = 0;
 
@@ -360,8 +374,9 @@ class ShowcaseEditor {
         );
 
         if (imgElement) {
-          // Apply directly from asset path
-          this.applyImageToElement(imgElement, imgPath, fileName);
+          // Apply directly from asset path (AVIF/WebP srcset when the build made one)
+          const responsive = manifest?.images?.[`${SHOWCASE_CONFIG.DEFAULT_IMAGE_DIR}${fileName}`] || null;
+          this.applyImageToElement(imgElement, imgPath, fileName, responsive);
           
           // We don't save to DB yet to save space, unless user edits it.
           // Or we could fetch and save:
@@ -375,7 +390,9 @@ class ShowcaseEditor {
   }
 
   // Centralized method to apply image to element
-  applyImageToElement(imgElement, imgSrc, imgName) {
+  // `responsive` is a build_images.py manifest entry: the image is then wrapped
+  // in a lazy-loaded <picture>; imgSrc stays the fallback and the lightbox source
+  applyImageToElement(imgElement, imgSrc, imgName, responsive = null) {
     // Remove overlay
     const overlay = imgElement.querySelector('.upload-overlay');
     if (overlay) overlay.remove();
@@ -384,13 +401,18 @@ class ShowcaseEditor {
     const oldLink = imgElement.querySelector('.download-link');
     if (oldLink) oldLink.remove();
     const oldImg = imgElement.querySelector('.real-showcase-img');
-    if (oldImg) oldImg.remove();
+    if (oldImg) (oldImg.closest('picture') || oldImg).remove();
     const miniBtn = imgElement.querySelector('.mini-dl-btn');
     if (miniBtn) miniBtn.remove();
 
     // Create new image element
     const realImg = document.createElement('img');
     realImg.className = 'real-showcase-img';
+    if (responsive) {
+      // before src: a detached <img> would otherwise start fetching the fallback
+      realImg.loading = 'lazy';
+      realImg.decoding = 'async';
+    }
     realImg.src = imgSrc;
     realImg.alt = imgName || 'Showcase image';
     realImg.dataset.imgSrc = imgSrc; // Store src in data attribute for event delegation
@@ -399,11 +421,26 @@ class ShowcaseEditor {
     // Error handling: if image fails, remove it to show background
     realImg.onerror = () => {
       console.warn(`[Showcase] Failed to load image: ${imgSrc}`);
-      realImg.remove();
+      (realImg.closest('picture') || realImg).remove();
       // Restore overlay if needed, or just leave background
     };
 
-    imgElement.appendChild(realImg);
+    if (responsive) {
+      const picture = document.createElement('picture');
+      Object.entries(responsive.sources).forEach(([type, srcset]) => {
+        const source = document.createElement('source');
+        source.type = type;
+        source.srcset = srcset;
+        source.sizes = responsive.sizes;
+        picture.appendChild(source);
+      });
+      realImg.width = responsive.width;
+      realImg.height = responsive.height;
+      picture.appendChild(realImg);
+      imgElement.appendChild(picture);
+    } else {
+      imgElement.appendChild(realImg);
+    }
     imgElement.classList.add('has-image');
   }
 
@@ -484,50 +521,11 @@ class ShowcaseEditor {
   }
 
   async resizeImage(file, targetPixels = 1024 * 1024) {
-    return new Promise((resolve, reject) => {
-      const reader = new FileReader();
-      reader.onload = (e) => {
-        const img = new Image();
-        img.onload = () => {
-          const width = img.width;
-          const height = img.height;
-          const currentPixels = width * height;
-          
-          let newWidth = width;
-          let newHeight = height;
-
-          if (currentPixels > targetPixels) {
-            const ratio = Math.sqrt(targetPixels / currentPixels);
-            newWidth = Math.floor(width * ratio);
-            newHeight = Math.floor(height * ratio);
-          }
-
-          const canvas = document.createElement('canvas');
-          canvas.width = newWidth;
-          canvas.height = newHeight;
-          
-          const ctx = canvas.getContext('2d');
-          ctx.imageSmoothingEnabled = true;
-          ctx.imageSmoothingQuality = 'high';
-          ctx.drawImage(img, 0, 0, newWidth, newHeight);
-          
-          const dataUrl = canvas.toDataURL('image/jpeg', 0.75);
-          
-          canvas.toBlob((blob) => {
-            resolve({
-              dataUrl,
-              blob,
-              width: newWidth,
-              height: newHeight
-            });
-          }, 'image/jpeg', 0.75);
-        };
-        img.onerror = reject;
-        img.src = e.target.result;
-      };
-      reader.onerror = reject;
-      reader.readAsDataURL(file);
-    });
+    // Decode and compress in the preprocessing worker; the data URL is only
+    // kept because saved showcases store it
+    const { blob, width, height } = await preprocess('resize', file, { targetPixels, type: 'image/jpeg', quality: 0.75 });
+    const dataUrl = await blobToDataURL(blob);
+    return { dataUrl, blob, width, height };
   }
 
   async handleFileUpload(file, imgElement, showcaseId, imgIndex) {
@@ -0,0 +1,128 @@
+// Levelled status log for the generate / refine flows
+// Entries go into a fixed-size ring buffer as raw parts ({ t, level, sel,
+// msg, data }); timestamps, step names and data (e.g. a Nano debug payload)
+// are only formatted when the buffer is dumped or echoed. `msg` may be a
+// function for messages that are costly to build.
+//
+// Dev builds echo every entry to the console. Production builds drop debug
+// entries outright (log.debug is a no-op), only buffer the rest and echo
+// nothing, unless localStorage STATUS_LOG is set to a level. For support
+// tickets: DressOnLog.dump() prints the buffer, DressOnLog.download() saves it.
+
+const LEVELS = { debug: 10, info: 20, warn: 30, error: 40, off: 100 };
+const CAPACITY = 500;
+const DATA_MAX = 600;
+
+function isProd() {
+  try {
+    return !!import.meta.env?.PROD;
+  } catch (_) {
+    return false;
+  }
+}
+
+function echoLevel() {
+  try {
+    const stored = window.localStorage.getItem('STATUS_LOG');
+    if (stored && stored in LEVELS) return LEVELS[stored];
+  } catch (_) {}
+  return isProd() ? LEVELS.off : LEVELS.debug;
+}
+
+const stepOf = (sel) => (String(sel).includes('canvas1') ? 'Step1' : 'Step2');
+
+function formatData(data) {
+  if (data === undefined) return '';
+  let text;
+  try { text = typeof data === 'string' ? data : JSON.stringify(data); } catch (_) { text = String(data); }
+  return text.length > DATA_MAX ? `${text.slice(0, DATA_MAX)} …` : text;
+}
+
+export function formatEntry(entry, { withTime = true } = {}) {
+  let msg = entry.msg;
+  if (typeof msg === 'function') {
+    try { msg = msg(); } catch (e) { msg = `<message failed: ${e?.message || e}>`; }
+  }
+  const data = formatData(entry.data);
+  const body = data ? `${msg} ${data}` : msg;
+  const ts = withTime ? `${new Date(entry.t).toLocaleTimeString()} · ` : '';
+  return `[${stepOf(entry.sel)}] ${ts}${body}`;
+}
+
+class StatusLog {
+  constructor(capacity = CAPACITY) {
+    this.capacity = capacity;
+    this.buffer = new Array(capacity);
+    this.next = 0;
+    this.size = 0;
+    this.echo = echoLevel();
+    // Production: debug entries cost one no-op call
+    this.debug = isProd() && this.echo > LEVELS.debug ? () => {} : (sel, msg, data) => this.add('debug', sel, msg, data);
+  }
+
+  add(level, sel, msg, data) {
+    const entry = { t: Date.now(), level, sel, msg, data };
+    this.buffer[this.next] = entry;
+    this.next = (this.next + 1) % this.capacity;
+    if (this.size < this.capacity) this.size += 1;
+    if (LEVELS[level] >= this.echo) {
+      const out = level === 'error' ? console.error : level === 'warn' ? console.warn : console.log;
+      out(formatEntry(entry));
+    }
+  }
+
+  info(sel, msg, data) { this.add('info', sel, msg, data); }
+  warn(sel, msg, data) { this.add('warn', sel, msg, data); }
+  error(sel, msg, data) { this.add('error', sel, msg, data); }
+
+  // Oldest first; optionally only entries at or above `minLevel`
+  entries(minLevel = 'debug') {
+    const out = [];
+    const start = (this.next - this.size + this.capacity) % this.capacity;
+    for (let i = 0; i < this.size; i++) {
+      const entry = this.buffer[(start + i) % this.capacity];
+      if (LEVELS[entry.level] >= LEVELS[minLevel]) out.push(entry);
+    }
+    return out;
+  }
+
+  text(minLevel = 'debug') {
+    return this.entries(minLevel)
+      .map((entry) => `${new Date(entry.t).toISOString()} ${entry.level.toUpperCase().padEnd(5)} ${formatEntry(entry, { withTime: false })}`)
+      .join('\n');
+  }
+
+  dump(minLevel = 'debug') {
+    console.log(this.text(minLevel));
+  }
+
+  // Save the buffer as a text file to attach to a support ticket
+  download(minLevel = 'debug') {
+    const header = `DressOn status log · ${new Date().toISOString()} · ${navigator.userAgent}\n`;
+    const url = URL.createObjectURL(new Blob([header, this.text(minLevel), '\n'], { type: 'text/plain' }));
+    const a = document.createElement('a');
+    a.href = url;
+    a.download = `dresson-log-${Date.now()}.txt`;
+    document.body.appendChild(a);
+    a.click();
+    a.remove();
+    setTimeout(() => URL.revokeObjectURL(url), 100);
+  }
+
+  clear() {
+    this.buffer = new Array(this.capacity);
+    this.next = 0;
+    this.size = 0;
+  }
+}
+
+export const log = new StatusLog();
+
+if (typeof window !== 'undefined') {
+  window.DressOnLog = {
+    dump: (level) => log.dump(level),
+    download: (level) => log.download(level),
+    entries: (level) => log.entries(level),
+    clear: () => log.clear(),
+  };
+}
@@ -1,16 +1,10 @@
 // Step 3: Upscale to High Resolution
-import { FluxKontext } from './sdk/apiClient.js';
-import { translations } from './translations.js';
-import { getCurrentLanguage } from './language-switcher.js';
+import { FluxKontext, pollWithBackoff } from './sdk/apiClient.js';
+import { t } from './language-switcher.js';
+import { downloadResult, primeDownload } from './download.js';
 
 const DOWNLOAD_ICON = new URL('./assets/download.svg', import.meta.url).href;
 
-// Helper function to get translated text
-function t(key) {
-  const lang = getCurrentLanguage();
-  return translations[lang]?.[key] || translations['en']?.[key] || key;
-}
-
 (function initUpscale() {
   const $ = (s, ctx = document) => ctx.querySelector(s);
 
@@ -69,7 +63,7 @@ function t(key) {
     const title = message || t('step3.readyTitle');
     const desc = t('step3.readyDesc');
     canvas3.innerHTML = `
-      <div class="placeholder">
+      <div class="placeholder"${message ? '' : ' data-default'}>
         <div class="icon">✨</div>
         <div class="title">${title}</div>
         <div class="desc">${desc}</div>
@@ -243,28 +237,9 @@ function t(key) {
     icon.alt = 'Download';
     downloadBtn.appendChild(icon);
 
-    downloadBtn.onclick = async () => {
-      try {
-        // Fetch image as blob to bypass CORS download restrictions
-        const response = await fetch(imageUrl);
-        const blob = await response.blob();
-        const blobUrl = URL.createObjectURL(blob);
-
-        // Trigger download
-        const a = document.createElement('a');
-        a.href = blobUrl;
-        a.download = `upscaled-${Date.now()}.png`;
-        document.body.appendChild(a);
-        a.click();
-        document.body.removeChild(a);
-
-        // Cleanup blob URL
-        setTimeout(() => URL.revokeObjectURL(blobUrl), 100);
-      } catch (error) {
-        console.error('[step3] Download failed:', error);
-        alert('Download failed. Please try again.');
-      }
-    };
+    // Blob fetched once (as a blob to bypass CORS download restrictions) and kept for later clicks
+    primeDownload(imageUrl);
+    downloadBtn.onclick = () => downloadResult(imageUrl, `upscaled-${Date.now()}.png`);
 
     canvas3.appendChild(downloadBtn);
   }
@@ -375,63 +350,51 @@ function t(key) {
   // 轮询任务结果
   async function pollResult(taskId) {
     const apiBase = getApiBase();
-    const maxAttempts = 120; // 最多轮询120次 (10分钟)
-    const interval = 5000; // 每5秒轮询一次
-
-    for (let i = 0; i < maxAttempts; i++) {
-      await new Promise(resolve => setTimeout(resolve, interval));
-
-      try {
-        const response = await fetch(`${apiBase}/upscale/result?task_id=${taskId}`);
 
-        if (!response.ok) {
-          throw new Error(`Poll failed: ${response.status}`);
+    try {
+      // 自适应轮询：先快后慢（最长5秒一次），支持长轮询和 Retry-After，最多10分钟
+      const data = await pollWithBackoff(`${apiBase}/upscale/result?task_id=${taskId}`, (data) => {
+        if (data.status === 'error') {
+          // 失败
+          throw new Error(data.error || 'Upscale failed');
         }
-
-        const data = await response.json();
-        console.log(`[step3] Poll ${i + 1}:`, data.status, data.stage || '');
-
-        if (data.status === 'done') {
-          // 成功
-          const resultUrl = data.result_url;
-
-          if (!resultUrl) {
-            throw new Error('No result URL in response');
+        return data.status === 'done';
+      }, {
+        initialMs: 1000,
+        maxMs: 5000,
+        timeoutMs: 600000,
+        timeoutMessage: 'Upscale timed out. Please try again.',
+        onProgress: (data, i) => {
+          console.log(`[step3] Poll ${i + 1}:`, data.status, data.stage || '');
+          // 继续轮询（status === 'pending' 或 'running'）
+          // 只更新文本，不重新创建进度条
+          if (data.status !== 'done' && data.status !== 'error') {
+            const stage = data.stage || 'processing';
+            updateLoadingText(`${stage.replace(/_/g, ' ')}...`);
           }
+        },
+      });
 
-          // 构造完整URL
-          const fullUrl = resultUrl.startsWith('http')
-            ? resultUrl
-            : `${apiBase}${resultUrl}`;
+      // 成功
+      const resultUrl = data.result_url;
 
-          console.log('[step3] Success! URL:', fullUrl);
+      if (!resultUrl) {
+        throw new Error('No result URL in response');
+      }
 
-          showResult(fullUrl);
+      // 构造完整URL
+      const fullUrl = resultUrl.startsWith('http')
+        ? resultUrl
+        : `${apiBase}${resultUrl}`;
 
-          upscaleBtn.disabled = false;
-          upscaleBtn.textContent = 'Upscale Image';
-          return;
-        } else if (data.status === 'error') {
-          // 失败
-          throw new Error(data.error || 'Upscale failed');
-        }
+      console.log('[step3] Success! URL:', fullUrl);
 
-        // 继续轮询（status === 'pending' 或 'running'）
-        // 只更新文本，不重新创建进度条
-        const stage = data.stage || 'processing';
-        updateLoadingText(`${stage.replace(/_/g, ' ')}...`);
-
-      } catch (error) {
-        console.error(`[step3] Poll error:`, error);
-        showError(error.message || 'Failed to check status');
-        upscaleBtn.disabled = false;
-        upscaleBtn.textContent = 'Upscale Image';
-        return;
-      }
+      showResult(fullUrl);
+    } catch (error) {
+      console.error(`[step3] Poll error:`, error);
+      showError(error.message || 'Failed to check status');
     }
 
-    // 超时
-    showError('Upscale timed out. Please try again.');
     upscaleBtn.disabled = false;
     upscaleBtn.textContent = 'Upscale Image';
   }
@@ -461,9 +424,11 @@ function t(key) {
         uploadedFileUrl = null;
       }
 
-      // 将图片转换为File对象
+      // 将图片转换为File对象（恢复的结果可能直接是 Blob）
       let blob;
-      if (imageSource.startsWith('data:')) {
+      if (imageSource instanceof Blob) {
+        blob = imageSource;
+      } else if (imageSource.startsWith('data:')) {
         // data URL
         const response = await fetch(imageSource);
         blob = await response.blob();
@@ -592,6 +557,10 @@ function t(key) {
   // 初始化
   upscaleBtn.disabled = true;
   showPlaceholder();
+  // Locale strings load asynchronously: re-render the default placeholder once they are applied
+  document.addEventListener('i18n:applied', () => {
+    if (canvas3.querySelector('.placeholder[data-default]')) showPlaceholder();
+  });
 
   // 更新按钮状态
   updateGetImageButtons();
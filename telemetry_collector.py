@@ -0,0 +1,265 @@
+#!/usr/bin/env python3
+"""Local collector for the tracing.js spans
+
+Usage:
+  python telemetry_collector.py                          # http://127.0.0.1:9393/telemetry
+  python telemetry_collector.py --log spans.jsonl        # also append every batch
+  python telemetry_collector.py --report spans.jsonl     # summarise a log offline
+  python telemetry_collector.py --report spans.jsonl --compare v41 v42
+
+Point the frontend at it with
+  localStorage.setItem('TELEMETRY_URL', 'http://127.0.0.1:9393/telemetry')
+
+tracing.js beacons batches of {release, page, spans: [{name, ms, status,
+trace, ...}]}. Spans are aggregated per (release, span name) into
+log-bucketed histograms (10% wide buckets, so p50/p95 are within ~5%);
+only status "ok" spans feed the histogram, the others are counted. Buckets
+are fixed, so histograms from different runs or deploys add up and compare
+bucket for bucket.
+
+  POST /telemetry    a batch (any content type; beacons send text/plain)
+  GET  /summary      {release: {span: {count, p50, p95, max, statuses}}}
+  GET  /             the same as a text table
+
+Only the standard library is used.
+"""
+
+import argparse
+import json
+import math
+import sys
+import threading
+import time
+from collections import Counter, defaultdict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+BUCKET_GROWTH = 1.1
+MAX_BODY = 1 << 20
+
+# Order of the stages in handleGenerate, for printing
+STAGE_ORDER = ['total', 'flux', 'flux-fetch', 'padding', 'padding-wait', 'nano', 'nano-submit', 'nano-poll', 'preview']
+
+
+class Histogram:
+    """Sparse log-bucketed histogram of millisecond durations."""
+
+    def __init__(self):
+        self.buckets = Counter()
+        self.count = 0
+        self.max = 0.0
+
+    @staticmethod
+    def bucket(ms):
+        return 0 if ms < 1 else 1 + int(math.log(ms) / math.log(BUCKET_GROWTH))
+
+    @staticmethod
+    def midpoint(index):
+        if index == 0:
+            return 0.5
+        low = BUCKET_GROWTH ** (index - 1)
+        return math.sqrt(low * low * BUCKET_GROWTH)
+
+    def add(self, ms):
+        self.buckets[self.bucket(ms)] += 1
+        self.count += 1
+        self.max = max(self.max, ms)
+
+    def percentile(self, pct):
+        if not self.count:
+            return None
+        rank = max(1, math.ceil(pct / 100 * self.count))
+        seen = 0
+        for index in sorted(self.buckets):
+            seen += self.buckets[index]
+            if seen >= rank:
+                return min(self.midpoint(index), self.max)
+        return self.max
+
+
+class Store:
+    """Per-release, per-span histograms; safe to feed from several threads."""
+
+    def __init__(self, log_path=None):
+        self.lock = threading.Lock()
+        self.histograms = defaultdict(Histogram)   # (release, name) -> Histogram
+        self.statuses = defaultdict(Counter)       # (release, name) -> status counts
+        self.log_path = log_path
+
+    def add_batch(self, batch):
+        release = str(batch.get('release') or 'unknown')
+        spans = [s for s in batch.get('spans') or [] if isinstance(s, dict) and s.get('name')]
+        with self.lock:
+            for span in spans:
+                key = (release, str(span['name']))
+                status = str(span.get('status') or 'ok')
+                self.statuses[key][status] += 1
+                if status == 'ok':
+                    try:
+                        self.histograms[key].add(float(span.get('ms') or 0))
+                    except (TypeError, ValueError):
+                        pass
+            if self.log_path and spans:
+                with open(self.log_path, 'a', encoding='utf-8') as f:
+                    f.write(json.dumps({'received': time.time(), 'release': release,
+                                        'page': batch.get('page'), 'spans': spans}) + '\n')
+        return len(spans)
+
+    def summary(self, release=None):
+        out = defaultdict(dict)
+        with self.lock:
+            for (rel, name), statuses in self.statuses.items():
+                if release and rel != release:
+                    continue
+                hist = self.histograms.get((rel, name)) or Histogram()
+                p50, p95 = hist.percentile(50), hist.percentile(95)
+                out[rel][name] = {
+                    'count': hist.count,
+                    'p50': round(p50, 1) if p50 is not None else None,
+                    'p95': round(p95, 1) if p95 is not None else None,
+                    'max': round(hist.max, 1),
+                    'statuses': dict(statuses),
+                }
+        return {rel: dict(sorted(spans.items(), key=_stage_key)) for rel, spans in sorted(out.items())}
+
+
+def _stage_key(item):
+    name = item[0]
+    return (STAGE_ORDER.index(name) if name in STAGE_ORDER else len(STAGE_ORDER), name)
+
+
+def _seconds(ms):
+    return '-' if ms is None else f'{ms / 1000:.2f}'
+
+
+def format_summary(summary):
+    lines = []
+    for release, spans in summary.items():
+        lines.append(f'release {release}')
+        lines.append(f'  {"span":<12} {"ok":>6} {"p50 s":>8} {"p95 s":>8} {"max s":>8}  other')
+        for name, row in spans.items():
+            other = ', '.join(f'{k} {v}' for k, v in sorted(row['statuses'].items()) if k != 'ok')
+            lines.append(f'  {name:<12} {row["count"]:>6} {_seconds(row["p50"]):>8} {_seconds(row["p95"]):>8} '
+                         f'{_seconds(row["max"]):>8}  {other}')
+    return '\n'.join(lines) if lines else 'no spans yet'
+
+
+def format_comparison(summary, base, new):
+    """p50/p95 of every span in `new` relative to `base`."""
+    a, b = summary.get(base, {}), summary.get(new, {})
+    lines = [f'{"span":<12} {"p50 " + base:>14} {"p50 " + new:>14} {"Δp50":>8} {"p95 " + base:>14} {"p95 " + new:>14} {"Δp95":>8}']
+    for name in sorted(set(a) | set(b), key=lambda n: _stage_key((n,))):
+        row = [f'{name:<12}']
+        for pct in ('p50', 'p95'):
+            x, y = a.get(name, {}).get(pct), b.get(name, {}).get(pct)
+            delta = f'{(y - x) / x * 100:+.0f}%' if x and y is not None else '-'
+            row.append(f'{_seconds(x):>14} {_seconds(y):>14} {delta:>8}')
+        lines.append(' '.join(row))
+    return '\n'.join(lines)
+
+
+def load_log(path, store):
+    with open(path, encoding='utf-8') as f:
+        for line in f:
+            line = line.strip()
+            if line:
+                store.add_batch(json.loads(line))
+
+
+def make_handler(store):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'
+
+        def _send(self, status, body, content_type='application/json'):
+            data = body.encode('utf-8') if isinstance(body, str) else json.dumps(body).encode('utf-8')
+            self.send_response(status)
+            self.send_header('Content-Type', content_type)
+            self.send_header('Content-Length', str(len(data)))
+            self.send_header('Access-Control-Allow-Origin', self.headers.get('Origin') or '*')
+            self.send_header('Vary', 'Origin')
+            self.end_headers()
+            self.wfile.write(data)
+
+        def do_OPTIONS(self):
+            self.send_response(204)
+            self.send_header('Access-Control-Allow-Origin', self.headers.get('Origin') or '*')
+            self.send_header('Access-Control-Allow-Methods', 'GET, POST, OPTIONS')
+            self.send_header('Access-Control-Allow-Headers', self.headers.get('Access-Control-Request-Headers') or 'content-type')
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+
+        def do_POST(self):
+            if urlsplit(self.path).path != '/telemetry':
+                return self._send(404, {'error': 'not found'})
+            length = int(self.headers.get('Content-Length') or 0)
+            if length > MAX_BODY:
+                self.close_connection = True
+                return self._send(413, {'error': 'body too large'})
+            try:
+                batch = json.loads(self.rfile.read(length) or b'{}')
+                accepted = store.add_batch(batch if isinstance(batch, dict) else {})
+            except ValueError as e:
+                return self._send(400, {'error': f'bad batch: {e}'})
+            self._send(200, {'accepted': accepted})
+
+        def do_GET(self):
+            url = urlsplit(self.path)
+            release = parse_qs(url.query).get('release', [None])[0]
+            if url.path == '/summary':
+                return self._send(200, store.summary(release))
+            if url.path == '/':
+                return self._send(200, format_summary(store.summary(release)) + '\n', 'text/plain; charset=utf-8')
+            self._send(404, {'error': 'not found'})
+
+        def log_message(self, fmt, *args):  # keep the console for the summaries
+            pass
+
+    return Handler
+
+
+def main(argv):
+    parser = argparse.ArgumentParser(description='Collect and summarise tracing.js spans.')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=9393)
+    parser.add_argument('--log', help='append every received batch to this JSONL file')
+    parser.add_argument('--report', metavar='LOG', help='summarise a JSONL log instead of serving')
+    parser.add_argument('--compare', nargs=2, metavar=('BASE', 'NEW'), help='with --report: p50/p95 deltas of NEW vs BASE')
+    parser.add_argument('--json', action='store_true', help='with --report: print the summary as JSON')
+    args = parser.parse_args(argv)
+
+    if args.report:
+        store = Store()
+        load_log(args.report, store)
+        summary = store.summary()
+        if args.json:
+            print(json.dumps(summary, indent=2))
+        elif args.compare:
+            print(format_comparison(summary, *args.compare))
+        else:
+            print(format_summary(summary))
+        return 0
+    if args.compare:
+        parser.error('--compare needs --report')
+
+    # Resume from an existing log, then keep appending to it
+    store = Store()
+    if args.log:
+        try:
+            load_log(args.log, store)
+        except FileNotFoundError:
+            pass
+        store.log_path = args.log
+    server = ThreadingHTTPServer((args.host, args.port), make_handler(store))
+    print(f'Telemetry collector on http://{args.host}:{args.port}/telemetry')
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+    print(format_summary(store.summary()))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv[1:]))
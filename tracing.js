@@ -0,0 +1,105 @@
+// Named performance spans for the generation flow
+// startSpan(name) sets a performance.mark; span.end() adds the matching
+// performance.measure (visible in the DevTools Performance panel) and queues
+// { name, ms, start, status, trace } for the collector. Spans with a parent
+// share its trace id, so one Generate click is one trace: total, flux,
+// flux-fetch, padding (runs alongside flux), padding-wait, nano, nano-submit,
+// nano-poll and preview
+// Nothing polls: queued spans are sent with navigator.sendBeacon when
+// BATCH_SIZE is reached, FLUSH_DELAY_MS after the last span, or when the page
+// is hidden. Sending is off unless a collector URL is configured
+// (localStorage TELEMETRY_URL, window.DRESSON_TELEMETRY_URL or
+// VITE_TELEMETRY_URL), e.g. http://127.0.0.1:9393/telemetry from
+// telemetry_collector.py.
+
+const PREFIX = 'dresson:';
+const BATCH_SIZE = 20;
+const FLUSH_DELAY_MS = 10000;
+const MAX_QUEUE = 200;  // drop oldest while no collector is reachable
+
+let queue = [];
+let flushTimer = null;
+let nextId = 0;
+
+function env() {
+  try {
+    return (typeof import.meta !== 'undefined' && import.meta.env) || {};
+  } catch (_) {
+    return {};
+  }
+}
+
+function endpoint() {
+  try {
+    const stored = window.localStorage.getItem('TELEMETRY_URL');
+    if (stored) return stored;
+  } catch (_) {}
+  return (typeof window !== 'undefined' && window.DRESSON_TELEMETRY_URL) || env().VITE_TELEMETRY_URL || '';
+}
+
+// Deploy identifier the collector groups by
+const RELEASE = env().VITE_RELEASE || env().MODE || 'dev';
+
+function newTraceId() {
+  return Math.random().toString(36).slice(2, 10) + Date.now().toString(36);
+}
+
+export function startSpan(name, { parent = null, attrs = {} } = {}) {
+  const id = ++nextId;
+  const mark = `${PREFIX}${name}#${id}`;
+  const start = performance.now();
+  try { performance.mark(mark); } catch (_) {}
+  let ended = false;
+  return {
+    name,
+    trace: parent?.trace || newTraceId(),
+    end(status = 'ok', more = {}) {
+      if (ended) return null;
+      ended = true;
+      let ms = performance.now() - start;
+      try {
+        const measure = performance.measure(`${PREFIX}${name}`, { start: mark, detail: { status, ...attrs, ...more } });
+        if (measure) ms = measure.duration;
+      } catch (_) {}
+      try { performance.clearMarks(mark); performance.clearMeasures(`${PREFIX}${name}`); } catch (_) {}
+      // start (ms since navigation) lets a trace viewer line up overlapping stages
+      const span = { name, ms: Math.round(ms), start: Math.round(start), status, trace: this.trace, ts: Date.now(), ...attrs, ...more };
+      record(span);
+      return span;
+    },
+  };
+}
+
+function record(span) {
+  console.debug(`[trace] ${span.name} ${span.status} ${span.ms} ms`);
+  if (!endpoint()) return;
+  queue.push(span);
+  if (queue.length > MAX_QUEUE) queue = queue.slice(-MAX_QUEUE);
+  if (queue.length >= BATCH_SIZE) {
+    flushSpans();
+  } else if (!flushTimer) {
+    flushTimer = setTimeout(flushSpans, FLUSH_DELAY_MS);
+  }
+}
+
+export function flushSpans() {
+  if (flushTimer) { clearTimeout(flushTimer); flushTimer = null; }
+  const url = endpoint();
+  if (!url || !queue.length) return;
+  const batch = queue;
+  queue = [];
+  // text/plain keeps the beacon a CORS "simple" request (no preflight)
+  const body = new Blob([JSON.stringify({ release: RELEASE, page: location.pathname, spans: batch })], { type: 'text/plain' });
+  let sent = false;
+  try { sent = navigator.sendBeacon?.(url, body) || false; } catch (_) {}
+  if (!sent) {
+    fetch(url, { method: 'POST', body, keepalive: true, mode: 'no-cors' }).catch(() => {});
+  }
+}
+
+if (typeof document !== 'undefined') {
+  document.addEventListener('visibilitychange', () => {
+    if (document.visibilityState === 'hidden') flushSpans();
+  });
+  window.addEventListener('pagehide', flushSpans);
+}
@@ -1,4 +1,6 @@
 // Translations for DressOn website
+// Source only: build_locales.py splits it into public/locales/<lang>.<hash>.json
+// and locales.js, which language-switcher.js loads. Re-run it after editing.
 export const translations = {
   en: {
     // Navbar
@@ -1,5 +1,12 @@
 // User-facing flow: after Generate, automatically run Flux then NanoBanana
 import { FluxKontext } from './sdk/apiClient.js';
+import { imageCache } from './image-cache.js';
+import { FLUX_PROMPT, FLUX_STEPS, getImageSizeFromFile, halfImageKey, computePaddedGarment } from './generate-stages.js';
+import { resultStore, whenIdle } from './result-store.js';
+import { resultBlob, needsBlob, previewSrc, thumbnailSrc, releasePreviews, ownsPreview } from './preview.js';
+import { downloadResult, timestampedName, primeDownload } from './download.js';
+import { startSpan } from './tracing.js';
+import { log } from './status-log.js';
 
 const DOWNLOAD_ICON = new URL('./assets/download.svg', import.meta.url).href;
 
@@ -44,6 +51,7 @@ const progressBars = new WeakMap();
 function setCanvasLoading(sel, text = 'Generating…', duration = 150) {
   const panel = $(sel);
   if (!panel) return;
+  releasePreviews(panel);
 
   // Determine duration based on text if not explicitly provided
   if (text.includes('Flux')) {
@@ -91,15 +99,33 @@ function startProgressBar(fillEl, durationSeconds) {
 function setCanvasError(sel, message) {
   const panel = $(sel);
   if (!panel) return;
+  releasePreviews(panel);
   panel.innerHTML = `<div style="color:#ff8585;line-height:1.6">${message}</div>`;
 }
 
-function setCanvasImage(sel, src, retryCount = 0) {
+function setCanvasImage(sel, src, retryCount = 0, span = null) {
   const panel = $(sel);
   if (!panel) {
     console.error('[DEBUG] Panel not found:', sel);
     return;
   }
+  // 'preview' span: from the result being handed over until it is on screen
+  span = span || startStage(sel, 'preview');
+
+  // Blob / data URL results are shown through an object URL owned by the panel
+  if (needsBlob(src)) {
+    previewSrc(panel, src)
+      .then((url) => {
+        if (url) setCanvasImage(sel, url, retryCount, span);
+        else span.end('cancelled');
+      })
+      .catch((e) => {
+        span.end('error');
+        setCanvasError(sel, `Failed to load image: ${e?.message || e}`);
+      });
+    return;
+  }
+  releasePreviews(panel, src);
 
   const MAX_RETRIES = 3;
   const LOAD_TIMEOUT = 30000; // 30 seconds
@@ -111,8 +137,12 @@ function setCanvasImage(sel, src, retryCount = 0) {
     retryAttempt: retryCount
   });
 
-  // Clear panel and directly add image (show loading progress)
-  panel.innerHTML = '';
+  // Clear panel and directly add image (show loading progress). Blob / data URL
+  // results come back here once their object URL is ready, after the caller
+  // has added the download button, so that button stays.
+  for (const node of [...panel.childNodes]) {
+    if (!node.classList?.contains('dl-btn')) node.remove();
+  }
   const img = document.createElement('img');
   img.src = src;
   img.alt = 'Generated result';
@@ -127,13 +157,18 @@ function setCanvasImage(sel, src, retryCount = 0) {
     }
   };
 
+  const decodeFirst = src.startsWith('blob:') && typeof img.decode === 'function';
+
   const handleSuccess = () => {
     if (hasCompleted) return;
     hasCompleted = true;
     cleanup();
+    if (!decodeFirst) span.end('ok');
+    // remote results: fill the download cache now, while the image is in the HTTP cache
+    if (!src.startsWith('blob:')) primeDownload(src);
 
     console.log('[DEBUG] Image loaded successfully:', {
-      src: src.substring(0, 100) + '...',
+      src: src.substring(0, 100) + (src.length > 100 ? '...' : ''),
       naturalWidth: img.naturalWidth,
       naturalHeight: img.naturalHeight,
       aspectRatio: (img.naturalWidth / img.naturalHeight).toFixed(3)
@@ -163,12 +198,13 @@ function setCanvasImage(sel, src, retryCount = 0) {
     if (retryCount < MAX_RETRIES) {
       console.log(`[Image Retry] Attempting retry ${retryCount + 1} in ${retryCount + 1}s...`);
       setTimeout(() => {
-        setCanvasImage(sel, src, retryCount + 1);
+        setCanvasImage(sel, src, retryCount + 1, span);
       }, 1000 * (retryCount + 1)); // Exponential backoff: 1s, 2s, 3s
       return;
     }
 
     // All retries failed - show error with manual retry button
+    span.end('error');
     panel.innerHTML = `<div style="display:grid;place-items:center;text-align:center;color:#ff8585;padding:20px">
       <div style="font-size:32px;margin-bottom:12px">⚠️</div>
       <div style="margin-bottom:8px">Failed to load image</div>
@@ -193,12 +229,23 @@ function setCanvasImage(sel, src, retryCount = 0) {
     handleError('Load timeout (30s exceeded)');
   }, LOAD_TIMEOUT);
 
-  // Add image to panel immediately (user sees loading progress)
-  panel.appendChild(img);
+  // Object URLs: attach once decoded off the main thread (no decode jank on insert);
+  // remote URLs: add immediately so the user sees loading progress
+  if (decodeFirst) {
+    // prepend: the download button may already have been added; skip if the panel was reset meanwhile
+    img.decode().catch(() => {}).then(() => {
+      if (!img.naturalWidth) return;  // broken image: handleError retries / reports it
+      if (!ownsPreview(panel, src)) return span.end('cancelled');
+      panel.prepend(img);
+      span.end('ok');
+    });
+  } else {
+    panel.appendChild(img);
+  }
 }
 
-// ---- timer helpers (multi-timer system) ----
-const timerData = new WeakMap(); // stores { total, flux, nano } for each panel
+// ---- timer helpers (tracing spans, see tracing.js) ----
+const timerData = new WeakMap(); // stores the { total, flux, nano } spans of each panel
 let currentCancel = null; // function to cancel current flow
 
 function startTimer(sel, type = 'total') {
@@ -211,29 +258,16 @@ function startTimer(sel, type = 'total') {
     timerData.set(panel, timers);
   }
 
+  // A restarted timer abandons the previous run's span
   const timerKey = type.toLowerCase();
-  if (!timers[timerKey]) {
-    timers[timerKey] = {};
-  }
+  timers[timerKey]?.end('cancelled');
 
-  const timer = timers[timerKey];
-
-  // Clear old interval if exists
-  if (timer.interval) {
-    clearInterval(timer.interval);
-  }
-
-  timer.startTime = Date.now();
   const stepName = sel.includes('canvas1') ? 'Step1' : 'Step2';
-  const timerLabel = type.charAt(0).toUpperCase() + type.slice(1);
+  const parent = timerKey === 'total' ? null : timers.total;
+  timers[timerKey] = startSpan(timerKey, { parent, attrs: { step: stepName } });
 
+  const timerLabel = type.charAt(0).toUpperCase() + type.slice(1);
   console.log(`[${stepName}] ${timerLabel} timer started`);
-
-  // Periodic updates every 5 seconds
-  timer.interval = setInterval(() => {
-    const elapsed = (Date.now() - timer.startTime) / 1000;
-    console.log(`[${stepName}] ${timerLabel}: ${elapsed.toFixed(1)}s`);
-  }, 5000);
 }
 
 function stopTimer(sel, type = 'total', label) {
@@ -244,17 +278,14 @@ function stopTimer(sel, type = 'total', label) {
   if (!timers) return;
 
   const timerKey = type.toLowerCase();
-  const timer = timers[timerKey];
-  if (!timer) return;
-
-  // Clear interval
-  if (timer.interval) {
-    clearInterval(timer.interval);
-    timer.interval = null;
-  }
-
-  if (timer.startTime) {
-    const elapsed = ((Date.now() - timer.startTime) / 1000).toFixed(1);
+  const span = timers[timerKey];
+  if (!span) return;
+
+  // Ended spans stay in place so later stages (e.g. preview) keep the trace id
+  const status = label === 'failed' ? 'error' : label === 'cached' ? 'cached' : 'ok';
+  const done = span.end(status);
+  if (done) {
+    const elapsed = (done.ms / 1000).toFixed(1);
     const stepName = sel.includes('canvas1') ? 'Step1' : 'Step2';
     const timerLabel = type.charAt(0).toUpperCase() + type.slice(1);
     const message = label ? `${timerLabel} ${label} (${elapsed}s)` : `${timerLabel}: ${elapsed}s`;
@@ -262,19 +293,12 @@ function stopTimer(sel, type = 'total', label) {
   }
 }
 
-function setAttempt(sel, current, max) {  const stepName = sel.includes('canvas1') ? 'Step1' : 'Step2';  console.log(`[${stepName}] Attempt: ${current}/${max}`);}
-
-function logStatus(sel, msg, opts) {
-  const withTime = !opts || opts.withTime !== false;
+// Span for one stage of the panel's current run (flux-fetch, padding, padding-wait, nano-submit, nano-poll, preview)
+function startStage(sel, name) {
+  const panel = $(sel);
+  const timers = panel ? timerData.get(panel) : null;
   const stepName = sel.includes('canvas1') ? 'Step1' : 'Step2';
-
-  // Output to browser console instead of DOM
-  if (withTime) {
-    const ts = new Date().toLocaleTimeString();
-    console.log(`[${stepName}] ${ts} · ${msg}`);
-  } else {
-    console.log(`[${stepName}] ${msg}`);
-  }
+  return startSpan(name, { parent: timers?.total || null, attrs: { step: stepName } });
 }
 
 async function fetchBlob(url) {
@@ -283,89 +307,59 @@ async function fetchBlob(url) {
   return await resp.blob();
 }
 
-async function getImageSizeFromFile(file) {
-  const url = URL.createObjectURL(file);
-  try {
-    const img = await new Promise((resolve, reject) => {
-      const el = new Image();
-      el.onload = () => resolve(el);
-      el.onerror = reject;
-      el.src = url;
-    });
-    return { width: img.naturalWidth || img.width, height: img.naturalHeight || img.height };
-  } finally {
-    URL.revokeObjectURL(url);
-  }
-}
-
-// downscale a dataURL into a preview that fits max box while keeping AR
-async function downscaleDataURL(dataUrl, maxW, maxH, mime = 'image/jpeg', quality = 0.9) {
-  const img = await new Promise((resolve, reject) => {
-    const el = new Image();
-    el.onload = () => resolve(el);
-    el.onerror = reject;
-    el.src = dataUrl;
-  });
-  const scale = Math.min(maxW / img.width, maxH / img.height, 1); // never upscale
-  const w = Math.max(1, Math.floor(img.width * scale));
-  const h = Math.max(1, Math.floor(img.height * scale));
-  const cvs = document.createElement('canvas');
-  cvs.width = w; cvs.height = h;
-  const ctx = cvs.getContext('2d');
-  ctx.drawImage(img, 0, 0, w, h);
-  return await new Promise((resolve) => resolve(cvs.toDataURL(mime, quality)));
-}
-
 // keep last half image for manual resend and split canvases
 let lastHalfBlob = null;
-let lastFinalImageBase64 = null; // original full-res final image from step1
-let lastStep2ImageBase64 = null; // original full-res refined image from step2
-
-// Restore from localStorage if available
-try {
-  const stored1 = localStorage.getItem('lastFinalImageBase64');
-  const stored2 = localStorage.getItem('lastStep2ImageBase64');
-  if (stored1) {
-    lastFinalImageBase64 = stored1;
-    console.log('[step1] Restored image from localStorage');
-  }
-  if (stored2) {
-    lastStep2ImageBase64 = stored2;
-    console.log('[step2] Restored image from localStorage');
-  }
-} catch (e) {
-  console.warn('[localStorage] Failed to restore images:', e);
-}
+let lastFinalImageBase64 = null; // original full-res final image from step1 (data URL, URL, or Blob once restored)
+let lastStep2ImageBase64 = null; // original full-res refined image from step2 (same)
 
 // Expose to window for step3-upscale.js access
 window.lastFinalImageBase64 = lastFinalImageBase64;
 window.lastStep2ImageBase64 = lastStep2ImageBase64;
 
+// Restore the previous session's results from IndexedDB once the page is idle
+// (never blocks module evaluation); a result produced meanwhile wins.
+whenIdle(async () => {
+  try {
+    await resultStore.migrateLegacy();
+    const [stored1, stored2] = await Promise.all([resultStore.load('step1'), resultStore.load('step2')]);
+    if (stored1 && !lastFinalImageBase64) {
+      lastFinalImageBase64 = window.lastFinalImageBase64 = stored1;
+      console.log('[step1] Restored image from result store');
+    }
+    if (stored2 && !lastStep2ImageBase64) {
+      lastStep2ImageBase64 = window.lastStep2ImageBase64 = stored2;
+      console.log('[step2] Restored image from result store');
+    }
+    if (stored1 || stored2) { try { if (window.updateStep3Buttons) window.updateStep3Buttons(); } catch {} }
+  } catch (e) {
+    console.warn('[result store] Failed to restore images:', e);
+  }
+});
+
 async function sendToNano(finalSel, mainFile, refFile) {
   // Prompt now controlled by backend DEFAULT_KIE_PROMPT environment variable
   if (!lastHalfBlob) { setCanvasError(finalSel, 'Half image not ready'); return; }
   setCanvasLoading(finalSel, 'Sending to NanoBanana…');
   startTimer(targetSel, 'nano');
-  logStatus(finalSel, 'Preparing garment: matching character size with white padding…');
+  log.info(finalSel, 'Preparing garment: matching character size with white padding…');
   const mainSize = await getImageSizeFromFile(mainFile);
   const resizedRef = await FluxKontext.resizeImageWithPadding(refFile, mainSize.width, mainSize.height, '#ffffff');
-  logStatus(finalSel, 'Prompt: controlled by backend DEFAULT_KIE_PROMPT env var');
+  log.info(finalSel, 'Prompt: controlled by backend DEFAULT_KIE_PROMPT env var');
   const maxRetries = 1;
   let attempt = 0; let lastError = null; let result = null;
   while (attempt < maxRetries && !result) {
     attempt++;
-    setAttempt(finalSel, attempt, maxRetries);
-    logStatus(finalSel, `Submitting to NanoBanana (attempt ${attempt}/${maxRetries})…`);
+    log.info(finalSel, `Submitting to NanoBanana (attempt ${attempt}/${maxRetries})…`);
     try {
       const { task_id } = await FluxKontext.startNanoProcess(lastHalfBlob, [resizedRef], '');
-      logStatus(finalSel, `Task created: ${task_id}`);
-      const r = await FluxKontext.pollNanoResult(task_id, (j)=>{ if (j?.status) logStatus(finalSel, `Nano status: ${j.status}`); });
+      log.info(finalSel, `Task created: ${task_id}`);
+      const r = await FluxKontext.pollNanoResult(task_id, (j)=>{ if (j?.status) log.debug(finalSel, `Nano status: ${j.status}`); });
       if (r?.imageBase64) { result = r; break; }
       lastError = new Error(r?.error || 'No image from NanoBanana');
     } catch (e) {
       lastError = e;
-      logStatus(finalSel, `Attempt ${attempt} failed: ${e?.message || e}`);
-      if (e && e.debug !== undefined) { try { const dbg = typeof e.debug==='string'? e.debug : JSON.stringify(e.debug); logStatus(finalSel, `debug: ${String(dbg).slice(0,600)}${String(dbg).length>600?' …':''}`); } catch {} }
+      log.warn(finalSel, `Attempt ${attempt} failed: ${e?.message || e}`);
+      if (e && e.debug !== undefined) log.debug(finalSel, 'debug:', e.debug);
     }
   }
   if (result?.imageBase64) {
@@ -386,58 +380,18 @@ async function sendToNano(finalSel, mainFile, refFile) {
       icon.alt = 'download';
       btn.appendChild(icon);
       const dataUrl = result.imageBase64;
-      btn.onclick = async () => {
-        try {
-          let blobUrl = dataUrl;
-          if (!dataUrl.startsWith('data:')) {
-            const response = await fetch(dataUrl);
-            const blob = await response.blob();
-            blobUrl = URL.createObjectURL(blob);
-          }
-          const a = document.createElement('a');
-          a.href = blobUrl;
-          const ts = new Date().toISOString().replace(/[:.]/g,'-');
-          a.download = `final-${ts}.png`;
-          document.body.appendChild(a); a.click(); a.remove();
-          if (!dataUrl.startsWith('data:')) {
-            setTimeout(() => URL.revokeObjectURL(blobUrl), 100);
-          }
-        } catch (error) {
-          console.error('[download] Failed:', error);
-          alert('Download failed. Please try again.');
-        }
-      };
+      btn.onclick = () => downloadResult(dataUrl, timestampedName('final'));
       panel2?.appendChild(btn);
     } catch {}
-    logStatus(finalSel, 'Done');
+    log.info(finalSel, 'Done');
   } else {
     stopTimer(targetSel, 'nano', 'failed'); stopTimer(targetSel, 'total', 'failed'); setCanvasError(finalSel, `Generation failed: ${lastError?.message || 'No image from NanoBanana after 12 attempts'}`);
   }
 }
 
-// cache: last successful half image + main image signature
-let __lastHalfBlob = null;
-let __lastMainSig = null;
-function __sigOf(file){
-  return file ? `${file.name}|${file.size}|${file.lastModified||0}` : '';
-}
-
-// garment originals and padded cache
+// garment original (kept so a garment uploaded earlier can be reused)
 let __garmentOriginal = null;           // File or Blob (original garment as uploaded)
 let __garmentOriginalName = null;       // original filename
-let __garmentPaddedCache = null;        // Blob padded to current main size
-let __garmentPaddedSig = null;          // signature of main used to produce padded
-let __garmentOriginalSig = null;        // signature of garment original
-
-async function computePaddedGarment(mainFile, garmentOriginal){
-  if (!mainFile || !garmentOriginal) return null;
-  const mainSize = await getImageSizeFromFile(mainFile);
-  const padded = await FluxKontext.resizeImageWithPadding(garmentOriginal, mainSize.width, mainSize.height, '#ffffff');
-  __garmentPaddedCache = padded;
-  __garmentPaddedSig = __sigOf(mainFile);
-  __garmentOriginalSig = __sigOf(garmentOriginal);
-  return padded;
-}
 
 async function handleGenerate() {
   const targetSel = '#canvas1';
@@ -462,132 +416,119 @@ async function handleGenerate() {
     startTimer(targetSel, 'flux');   // Flux-specific timer
     // Cancel functionality removed - UI elements moved to F12 console
 
-    const currSig = __sigOf(mainFile);
-    let halfBlob;
-    let fluxMs = 0;
-
-    // TEMPORARILY DISABLED: reuse half image if main not changed
-    // To re-enable caching: change the condition below from "false" to the original check
-    if (false && __lastHalfBlob && __lastMainSig === currSig) { // CACHE DISABLED
+    // Garment padding only needs the two uploads, not the half image: start it
+    // now so the probe of the Character Reference and the padding (both in the
+    // image worker) run while Flux is on the GPU. Awaited right before Nano.
+    const paddingSpan = startStage(targetSel, 'padding');
+    const paddingTask = computePaddedGarment(mainFile, __garmentOriginal || garmentFile)
+      .then((padding) => { paddingSpan.end(padding.cached ? 'cached' : 'ok'); return padding; },
+            (e) => { paddingSpan.end('error'); throw e; });
+    paddingTask.catch(() => {});  // reported when awaited; Flux may fail first
+
+    // reuse the half image of an identical Character Reference (persistent cache)
+    const halfKey = await halfImageKey(mainFile);
+    let halfBlob = await imageCache.get(halfKey);
+    if (halfBlob) {
+      log.info(targetSel, 'Reusing cached half image (same Character Reference)');
+      stopTimer(targetSel, 'flux', 'cached');
     } else {
-      logStatus(targetSel, 'Uploading Character Reference…');
-      const tFluxStart = performance.now();
-      const fluxRes = await FluxKontext.runFlux(mainFile, 'remove clothes', { steps: 8 });
-      logStatus(targetSel, 'Flux submitted. Waiting for half image…');
+      log.info(targetSel, 'Uploading Character Reference…');
+      const fluxRes = await FluxKontext.runFlux(mainFile, FLUX_PROMPT, { steps: FLUX_STEPS });
+      log.info(targetSel, 'Flux submitted. Waiting for half image…');
       // Prefer URL over base64 for better performance
       const halfUrl = fluxRes?.halfImageUrl;
       const halfB64 = fluxRes?.halfImageBase64;
 
       if (halfUrl) {
         // URL is fastest - backend already saved the image
-        logStatus(targetSel, 'Half image URL received. Fetching…');
-        const tFetchStart = performance.now();
+        log.info(targetSel, 'Half image URL received. Fetching…');
+        const fetchSpan = startStage(targetSel, 'flux-fetch');
         halfBlob = await fetchBlob(halfUrl);
-        const fetchMs = performance.now() - tFetchStart;
-        logStatus(targetSel, `Half image URL fetch: ${(fetchMs/1000).toFixed(2)} s`);
+        const fetchMs = fetchSpan.end('ok', { source: 'url' }).ms;
+        log.info(targetSel, `Half image URL fetch: ${(fetchMs/1000).toFixed(2)} s`);
       } else if (halfB64) {
         // Fallback to base64 if no URL provided
-        logStatus(targetSel, 'Half image received via backend proxy (base64)');
-        const tBlobStart = performance.now();
+        log.info(targetSel, 'Half image received via backend proxy (base64)');
+        const blobSpan = startStage(targetSel, 'flux-fetch');
         halfBlob = await (await fetch(halfB64)).blob();
-        const blobMs = performance.now() - tBlobStart;
-        logStatus(targetSel, `Half image blob conversion: ${(blobMs/1000).toFixed(2)} s`);
+        const blobMs = blobSpan.end('ok', { source: 'base64' }).ms;
+        log.info(targetSel, `Half image blob conversion: ${(blobMs/1000).toFixed(2)} s`);
       } else {
         throw new Error('Flux did not return half image');
       }
-      fluxMs = performance.now() - tFluxStart;
-      logStatus(targetSel, `Flux total time: ${(fluxMs/1000).toFixed(2)} s`);
-      __lastHalfBlob = halfBlob; __lastMainSig = currSig;
+      stopTimer(targetSel, 'flux', 'completed');
+      imageCache.set(halfKey, halfBlob);
     }
 
-    // 计算/复用 padded garment：检查主图和garment是否都没变
-    const currentGarmentSig = __sigOf(__garmentOriginal || garmentFile);
-    let paddedGarment = __garmentPaddedCache;
-    const needRecompute = !paddedGarment || 
-                          __garmentPaddedSig !== currSig ||  // 主图变了
-                          __garmentOriginalSig !== currentGarmentSig; // garment变了
-    if (needRecompute) {
-      logStatus(targetSel, 'Recomputing garment padding to match character size…', { withTime:false });
-      const tPaddingStart = performance.now();
-      paddedGarment = await computePaddedGarment(mainFile, __garmentOriginal || garmentFile);
-      const paddingMs = performance.now() - tPaddingStart;
-      logStatus(targetSel, `Garment padding complete: ${(paddingMs/1000).toFixed(2)} s`);
-      console.log('[garment cache] Padded garment recomputed');
-    } else {
-      logStatus(targetSel, 'Reusing cached padded garment');
+    // 计算/复用 padded garment：按 garment 内容哈希 + 主图尺寸缓存 (started alongside Flux)
+    // 'padding-wait' is what padding still adds to the critical path after Flux
+    const waitSpan = startStage(targetSel, 'padding-wait');
+    const padding = await paddingTask;
+    const paddedGarment = padding.blob;
+    const waitMs = waitSpan.end('ok').ms;
+    if (padding.cached) {
+      log.info(targetSel, 'Reusing cached padded garment');
       console.log('[garment cache] Reusing cached padded garment');
+    } else {
+      log.info(targetSel, `Garment padding ready (overlapped with Flux, waited ${(waitMs/1000).toFixed(2)} s)`);
+      console.log('[garment cache] Padded garment recomputed');
     }
 
     // 发送到 Nano
-    logStatus(targetSel, 'Submitting to NanoBanana…', { withTime:false });
-    const mainSize = await getImageSizeFromFile(mainFile); // 仅用于日志
-    logStatus(targetSel, 'Prompt: controlled by backend DEFAULT_KIE_PROMPT env var', { withTime:false });
+    log.info(targetSel, 'Submitting to NanoBanana…');
+    log.info(targetSel, 'Prompt: controlled by backend DEFAULT_KIE_PROMPT env var');
 
     const maxRetries = 1;
     let attempt = 0; let lastError = null; let result = null;
+    startTimer(targetSel, 'nano');
     while (attempt < maxRetries && !result) {
       attempt++;
-      setAttempt(targetSel, attempt, maxRetries);
-      logStatus(targetSel, `Submitting to NanoBanana (attempt ${attempt}/${maxRetries})…`, { withTime: false });
+      log.info(targetSel, `Submitting to NanoBanana (attempt ${attempt}/${maxRetries})…`);
+      let stage = null;  // open nano-submit / nano-poll span, ended as 'error' if the attempt throws
       try {
-        const tNanoStart = performance.now();
+        stage = startStage(targetSel, 'nano-submit');
         const { task_id } = await FluxKontext.startNanoProcess(halfBlob, [paddedGarment], '');
-        logStatus(targetSel, `task_id: ${task_id}`, { withTime: false });
+        stage.end('ok', { attempt });
+        log.info(targetSel, `task_id: ${task_id}`);
+        stage = startStage(targetSel, 'nano-poll');
         const r = await
           FluxKontext.pollNanoResult(task_id, (j) => {
             if (j) {
-              if (j.status) logStatus(targetSel, `status: ${j.status}`, { withTime: false });
-              if (j.error) logStatus(targetSel, `error: ${j.error}`, { withTime: false });
-              if (j.debug) { try { const dbg = typeof j.debug==='string'? j.debug : JSON.stringify(j.debug); logStatus(targetSel, `debug: ${String(dbg).slice(0,600)}${String(dbg).length>600?' …':''}`, { withTime: false }); } catch {} }
+              if (j.status) log.debug(targetSel, `status: ${j.status}`);
+              if (j.error) log.warn(targetSel, `error: ${j.error}`);
+              if (j.debug) log.debug(targetSel, 'debug:', j.debug);
             }
           })
         ;
+        stage.end(r?.imageBase64 ? 'ok' : 'error', { attempt });
         if (r?.imageBase64) {
-          const nanoMs = performance.now() - tNanoStart;
           result = r;
           stopTimer(targetSel, 'nano', 'completed');
           stopTimer(targetSel, 'total', 'completed');
           const panel2 = document.querySelector(targetSel);
-          const cw = Math.max(1, (panel2?.clientWidth || 1024));
-          const ch = Math.max(1, (panel2?.clientHeight || 768));
-          // If result is a URL (not data:), use it directly for fast display
-          // Browser will handle async download, avoiding the 80s delay from downscaleDataURL
-          let previewUrl = r.imageBase64;
-          if (!r.imageBase64.startsWith('data:')) {
-            // It's a URL - use it directly
-            previewUrl = r.imageBase64;
-          } else {
-            // It's base64 data - downscale it
-            try { previewUrl = await downscaleDataURL(r.imageBase64, cw, ch, 'image/jpeg', 0.9); } catch {}
-          }
-          setCanvasImage(targetSel, previewUrl);
+          // URLs load directly; data URLs become a Blob once and show via an object URL
+          setCanvasImage(targetSel, r.imageBase64);
           // remember original full-res for refine
           try {
             lastFinalImageBase64 = r.imageBase64;
             window.lastFinalImageBase64 = r.imageBase64;
-            // Save to localStorage for persistence across page refreshes
-            try { localStorage.setItem('lastFinalImageBase64', r.imageBase64); } catch (e) { console.warn('[localStorage] Failed to save step1 image:', e); }
+            // Persist across page refreshes (async, IndexedDB)
+            resultBlob(r.imageBase64).then((blob) => resultStore.save('step1', blob || r.imageBase64)).catch((e) => console.warn('[result store] Failed to save step1 image:', e));
           } catch {}
           // update step3 buttons
           try { if (window.updateStep3Buttons) window.updateStep3Buttons(); } catch {}
           // update download button
-          try { const old = panel2.querySelector('.dl-btn'); if (old) old.remove(); const btn = document.createElement('button'); btn.type='button'; btn.className='dl-btn'; btn.title='Download original'; const icon=document.createElement('img'); icon.src=DOWNLOAD_ICON; icon.alt='download'; btn.appendChild(icon); btn.onclick=async()=>{try{let blobUrl=r.imageBase64;if(!r.imageBase64.startsWith('data:')){const response=await fetch(r.imageBase64);const blob=await response.blob();blobUrl=URL.createObjectURL(blob);}const a=document.createElement('a');a.href=blobUrl;const ts=new Date().toISOString().replace(/[:.]/g,'-');a.download=`final-${ts}.png`;document.body.appendChild(a);a.click();a.remove();if(!r.imageBase64.startsWith('data:')){setTimeout(()=>URL.revokeObjectURL(blobUrl),100);}}catch(error){console.error('[download] Failed:',error);alert('Download failed. Please try again.');}}; panel2.appendChild(btn);} catch {}
+          try { const old = panel2.querySelector('.dl-btn'); if (old) old.remove(); const btn = document.createElement('button'); btn.type='button'; btn.className='dl-btn'; btn.title='Download original'; const icon=document.createElement('img'); icon.src=DOWNLOAD_ICON; icon.alt='download'; btn.appendChild(icon); btn.onclick=()=>downloadResult(r.imageBase64,timestampedName('final')); panel2.appendChild(btn);} catch {}
           // auto-fill Refine Reference preview with the generated image (keep uploader behavior)
           try {
             const refine = document.querySelector('.uploader[data-role="refine"]');
             const prev = refine?.querySelector('.preview');
             if (prev) {
-              let small = r.imageBase64;
-              // If it's a URL, use it directly; if base64, downscale it
-              if (!r.imageBase64.startsWith('data:')) {
-                small = r.imageBase64;
-              } else {
-                try { small = await downscaleDataURL(r.imageBase64, 270, 270, 'image/jpeg', 0.9); } catch {}
-              }
-              prev.src = small; prev.hidden = false;
+              // bounded thumbnail (worker-encoded) only for large base64 results
+              const small = await thumbnailSrc(prev, r.imageBase64, 270, 270);
+              if (small) { prev.src = small; prev.hidden = false; }
             }
           } catch {}
-          logStatus(targetSel, `nano: ${(nanoMs/1000).toFixed(2)} s · flux+nano: ${((fluxMs+nanoMs)/1000).toFixed(2)} s`);
           // refresh credits after success
           refreshCreditsBadge();
           break;
@@ -595,11 +536,12 @@ async function handleGenerate() {
         if (r instanceof Error) throw r;
         lastError = new Error(r?.error || 'No image from NanoBanana');
       } catch (e) {
-        lastError = e; logStatus(targetSel, `error: ${e?.message || e}`, { withTime:false }); if (e && e.debug !== undefined) { try { const dbg = typeof e.debug==='string'? e.debug : JSON.stringify(e.debug); logStatus(targetSel, `debug: ${String(dbg).slice(0,600)}${String(dbg).length>600?' …':''}`, { withTime:false }); } catch {} } if (String(e?.message||e).includes('Cancelled')) break;
+        stage?.end('error', { attempt });
+        lastError = e; log.error(targetSel, `error: ${e?.message || e}`); if (e && e.debug !== undefined) log.debug(targetSel, 'debug:', e.debug); if (String(e?.message||e).includes('Cancelled')) break;
       }
     }
     if (!result) throw new Error(lastError?.message || 'No image from NanoBanana after 6 attempts');
-  } catch (e) { const msg = e?.message || String(e); stopTimer(targetSel, 'flux', 'failed'); stopTimer(targetSel, 'total', 'failed'); setCanvasError(targetSel, `Generation failed: ${msg}`); logStatus(targetSel, 'Final status: failed after maximum retries', { withTime:false }); if (/Failed to fetch|CORS/i.test(msg)) { console.warn('Hint: ensure backend allows 127.0.0.1:5174 and ComfyUI is up'); } if (/402/.test(String(e))) { alert('余额不足，请购买或等候发放'); } }
+  } catch (e) { const msg = e?.message || String(e); stopTimer(targetSel, 'flux', 'failed'); stopTimer(targetSel, 'nano', 'failed'); stopTimer(targetSel, 'total', 'failed'); setCanvasError(targetSel, `Generation failed: ${msg}`); log.error(targetSel, 'Final status: failed after maximum retries'); if (/Failed to fetch|CORS/i.test(msg)) { console.warn('Hint: ensure backend allows 127.0.0.1:5174 and ComfyUI is up'); } if (/402/.test(String(e))) { alert('余额不足，请购买或等候发放'); } }
 }
 
 // Bind button exclusively (remove any existing listeners like mockGenerate)
@@ -966,11 +908,11 @@ async function handleRefine(){
   if (refFile) {
     // User uploaded a local image - use it as the image to refine
     halfSource = refFile;
-    logStatus(targetSel, 'Using uploaded image from Refine Reference', { withTime:false });
+    log.info(targetSel, 'Using uploaded image from Refine Reference');
   } else if (lastFinalImageBase64) {
     // Use Step 1 output (must be full-res, never thumbnail!)
     halfSource = lastFinalImageBase64;
-    logStatus(targetSel, 'Using Step 1 output image', { withTime:false });
+    log.info(targetSel, 'Using Step 1 output image');
   } else {
     setCanvasError(targetSel, 'No image to refine. Please upload an image in "Refine Reference" or run Step 1 first.');
     return;
@@ -998,7 +940,7 @@ async function handleRefine(){
       // It's a URL (from step1 result) - pass directly to backend
       // Backend will fetch it server-side (avoids 110s browser fetch delay)
       halfToSend = halfSource;
-      logStatus(targetSel, `Using step1 output URL (fast server-side fetch)`, { withTime:false });
+      log.info(targetSel, `Using step1 output URL (fast server-side fetch)`);
     } else {
       // It's a data: URL - pass to startNanoProcess which will convert it
       halfToSend = halfSource;
@@ -1006,53 +948,42 @@ async function handleRefine(){
 
     // No additional ref images needed since we're using the uploaded image as half_image
     const refs = [];
-    if (promptText) { try { const pvw = promptText.replace(/\s+/g,' ').slice(0,120); logStatus(targetSel, `Refine prompt: "${pvw}${pvw.length===120?'…':''}"`, { withTime:false }); } catch {} }
+    if (promptText) log.info(targetSel, () => { const pvw = promptText.replace(/\s+/g,' ').slice(0,120); return `Refine prompt: "${pvw}${pvw.length===120?'…':''}"`; });
 
     const maxRetries = 1; let attempt = 0; let lastError = null; let result = null; const tStart = performance.now();
     while (attempt < maxRetries && !result) {
-      attempt++; setAttempt(targetSel, attempt, maxRetries);
-      logStatus(targetSel, `Submitting to NanoBanana (attempt ${attempt}/${maxRetries})…`, { withTime:false });
+      attempt++;
+      log.info(targetSel, `Submitting to NanoBanana (attempt ${attempt}/${maxRetries})…`);
       try {
         const { task_id } = await FluxKontext.startNanoProcess(halfToSend, refs, promptText || '');
-        logStatus(targetSel, `task_id: ${task_id}`, { withTime:false });
+        log.info(targetSel, `task_id: ${task_id}`);
         const r = await
-          FluxKontext.pollNanoResult(task_id, (j)=>{ if (j) { if (j.status) logStatus(targetSel, `status: ${j.status}`, { withTime:false }); if (j.error) logStatus(targetSel, `error: ${j.error}`, { withTime:false }); if (j.debug) { try { const dbg = typeof j.debug==='string'? j.debug : JSON.stringify(j.debug); logStatus(targetSel, `debug: ${String(dbg).slice(0,600)}${String(dbg).length>600?' …':''}`, { withTime:false }); } catch {} } } });
+          FluxKontext.pollNanoResult(task_id, (j)=>{ if (j) { if (j.status) log.debug(targetSel, `status: ${j.status}`); if (j.error) log.warn(targetSel, `error: ${j.error}`); if (j.debug) log.debug(targetSel, 'debug:', j.debug); } });
         if (r?.imageBase64) {
           result = r; break;
         }
         if (r instanceof Error) throw r;
         lastError = new Error(r?.error || 'No image from NanoBanana');
-      } catch (e) { lastError = e; logStatus(targetSel, `error: ${e?.message || e}`, { withTime:false }); if (String(e?.message||e).includes('Cancelled')) break; }
+      } catch (e) { lastError = e; log.error(targetSel, `error: ${e?.message || e}`); if (String(e?.message||e).includes('Cancelled')) break; }
     }
     if (!result) throw new Error(lastError?.message || 'No image from NanoBanana after 6 attempts');
 
     // success → render into Live Preview and enable download
     const panel2 = document.querySelector(targetSel);
-    const cw = Math.max(1, (panel2?.clientWidth || 1024));
-    const ch = Math.max(1, (panel2?.clientHeight || 768));
-    // If result is a URL (not data:), use it directly for fast display
-    // Browser will handle async download, avoiding the 80s delay from downscaleDataURL
-    let previewUrl = result.imageBase64;
-    if (!result.imageBase64.startsWith('data:')) {
-      // It's a URL - use it directly
-      previewUrl = result.imageBase64;
-    } else {
-      // It's base64 data - downscale it
-      try { previewUrl = await downscaleDataURL(result.imageBase64, cw, ch, 'image/jpeg', 0.9); } catch {}
-    }
     stopTimer(targetSel, 'total', 'completed');
-    setCanvasImage(targetSel, previewUrl);
+    // URLs load directly; data URLs become a Blob once and show via an object URL
+    setCanvasImage(targetSel, result.imageBase64);
     // remember original full-res for step3
     try {
       lastStep2ImageBase64 = result.imageBase64;
       window.lastStep2ImageBase64 = result.imageBase64;
-      // Save to localStorage for persistence across page refreshes
-      try { localStorage.setItem('lastStep2ImageBase64', result.imageBase64); } catch (e) { console.warn('[localStorage] Failed to save step2 image:', e); }
+      // Persist across page refreshes (async, IndexedDB)
+      resultBlob(result.imageBase64).then((blob) => resultStore.save('step2', blob || result.imageBase64)).catch((e) => console.warn('[result store] Failed to save step2 image:', e));
     } catch {}
     // update step3 buttons
     try { if (window.updateStep3Buttons) window.updateStep3Buttons(); } catch {}
-    try { const old = panel2.querySelector('.dl-btn'); if (old) old.remove(); const btn = document.createElement('button'); btn.type='button'; btn.className='dl-btn'; btn.title='Download original'; const icon=document.createElement('img'); icon.src=DOWNLOAD_ICON; icon.alt='download'; btn.appendChild(icon); btn.onclick=async()=>{try{let blobUrl=result.imageBase64;if(!result.imageBase64.startsWith('data:')){const response=await fetch(result.imageBase64);const blob=await response.blob();blobUrl=URL.createObjectURL(blob);}const a=document.createElement('a');a.href=blobUrl;const ts=new Date().toISOString().replace(/[:.]/g,'-');a.download=`refined-${ts}.png`;document.body.appendChild(a);a.click();a.remove();if(!result.imageBase64.startsWith('data:')){setTimeout(()=>URL.revokeObjectURL(blobUrl),100);}}catch(error){console.error('[download] Failed:',error);alert('Download failed. Please try again.');}}; panel2.appendChild(btn);} catch {}
-    const totalMs = performance.now() - tStart; logStatus(targetSel, `refine: ${(totalMs/1000).toFixed(2)} s`, { withTime:false });
+    try { const old = panel2.querySelector('.dl-btn'); if (old) old.remove(); const btn = document.createElement('button'); btn.type='button'; btn.className='dl-btn'; btn.title='Download original'; const icon=document.createElement('img'); icon.src=DOWNLOAD_ICON; icon.alt='download'; btn.appendChild(icon); btn.onclick=()=>downloadResult(result.imageBase64,timestampedName('refined')); panel2.appendChild(btn);} catch {}
+    const totalMs = performance.now() - tStart; log.info(targetSel, `refine: ${(totalMs/1000).toFixed(2)} s`);
   } catch (e) { const msg = e?.message || String(e); stopTimer(targetSel, 'flux', 'failed'); stopTimer(targetSel, 'total', 'failed'); setCanvasError(targetSel, `Refine failed: ${msg}`); }
 }
 
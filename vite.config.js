@@ -1,7 +1,61 @@
 import { defineConfig } from 'vite';
 import { resolve } from 'path';
+import { readFileSync } from 'fs';
+
+const IMAGE_MANIFEST = resolve(__dirname, 'public/img/manifest.json');
+
+const attr = (value) => String(value).replace(/&/g, '&amp;').replace(/"/g, '&quot;');
+
+// Hero slides from the build_images.py manifest: the first one is a <picture>
+// with AVIF/WebP srcsets, fetchpriority=high and a preload; the others carry
+// data-srcset / data-src, which hero-carousel.js fills in shortly before they
+// show. Without a manifest (Pillow missing, dev before a build) the original
+// markup between the hero-images comments is kept.
+function heroImages() {
+  return {
+    name: 'hero-images',
+    transformIndexHtml: {
+      order: 'pre',
+      handler(html) {
+        const block = /<!-- hero-images[^>]*-->([\s\S]*?)<!-- \/hero-images -->/;
+        const match = html.match(block);
+        if (!match) return html;
+        let manifest;
+        try {
+          manifest = JSON.parse(readFileSync(IMAGE_MANIFEST, 'utf8'));
+        } catch (_) {
+          return html;
+        }
+        const slides = [...match[1].matchAll(/<img class="([^"]*)" src="\.\/([^"]+)"/g)]
+          .map(([, cls, src]) => ({ cls, entry: manifest.images?.[src] }));
+        if (!slides.length || slides.some((s) => !s.entry)) return html;
+
+        const indent = '\n            ';
+        const markup = slides.map(({ cls, entry }, i) => {
+          const lazy = i > 0;
+          const sources = Object.entries(entry.sources).map(([type, srcset]) =>
+            `<source type="${type}" ${lazy ? 'data-srcset' : 'srcset'}="${attr(srcset)}" sizes="${attr(entry.sizes)}">`);
+          const img = `<img class="${cls}" ${lazy ? 'data-src' : 'src'}="${attr(entry.fallback)}" width="${entry.width}" height="${entry.height}" alt="" decoding="async"${lazy ? '' : ' fetchpriority="high"'}>`;
+          return `<picture>${[...sources, img].map((tag) => `${indent}  ${tag}`).join('')}${indent}</picture>`;
+        }).join(indent);
+
+        const first = slides[0].entry;
+        const [type, srcset] = Object.entries(first.sources)[0];
+        return {
+          html: html.replace(block, markup),
+          tags: [{
+            tag: 'link',
+            attrs: { rel: 'preload', as: 'image', type, imagesrcset: srcset, imagesizes: first.sizes, fetchpriority: 'high' },
+            injectTo: 'head',
+          }],
+        };
+      },
+    },
+  };
+}
 
 export default defineConfig({
+  plugins: [heroImages()],
   server: {
     host: '127.0.0.1',
     port: 5175,
@@ -24,5 +78,3 @@ export default defineConfig({
   // 定义环境变量前缀，允许 VITE_ 开头的变量被注入
   envPrefix: 'VITE_',
 });
-
-